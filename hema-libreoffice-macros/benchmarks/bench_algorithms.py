@@ -0,0 +1,245 @@
+# coding: utf-8
+"""Benchmarks the scheduling functions in ``algorithms.py`` and checks their invariants.
+
+Runs without LibreOffice, e.g.
+
+    python benchmarks/bench_algorithms.py --output algorithms.json
+    python benchmarks/bench_algorithms.py --compare algorithms.json
+
+Exits with a non-zero status if an invariant is violated, or, with ``--compare``, if a case got
+slower than the given factor.
+"""
+import argparse
+import collections
+import datetime
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'pythonpath'))
+
+import algorithms
+
+PARTICIPANT_COUNTS = [10, 23, 57, 100, 250, 1000, 10000]
+QUICK_PARTICIPANT_COUNTS = [10, 23, 57, 100]
+MAX_GROUP_SIZES = list(range(3, 16))
+GROUP_SIZES = list(range(3, 16))
+# round robins of whole leagues
+LEAGUE_SIZES = [51, 101]
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float = 0.02) -> float:
+    """Returns the best time of a single call of ``func`` in seconds.
+
+    Every measurement calls ``func`` often enough to take at least ``min_time`` seconds.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def checkGroupSizes(sizes: List[int], n: int, max_group_size: int) -> List[str]:
+    problems = []
+    if sum(sizes) != n:
+        problems.append('group sizes sum to {}, not {}'.format(sum(sizes), n))
+    if any(size > max_group_size for size in sizes):
+        problems.append('a group is larger than {}'.format(max_group_size))
+    return problems
+
+
+def checkAssignment(groups: List[List[int]], sizes: List[int], n: int) -> List[str]:
+    problems = []
+    if [len(group) for group in groups] != sizes:
+        problems.append('groups have sizes {}, not {}'.format([len(group) for group in groups], sizes))
+    if sorted(p for group in groups for p in group) != list(range(n)):
+        problems.append('groups are not a partition of the participants')
+    return problems
+
+
+def checkSchedule(schedule: List[tuple], size: int) -> List[str]:
+    problems = []
+    pairs = collections.Counter(frozenset(bout) for bout in schedule)
+    if any(len(pair) != 2 for pair in pairs):
+        problems.append('a participant fights themselves')
+    expected = {frozenset((a, b)) for a in range(size) for b in range(a + 1, size)}
+    if set(pairs) != expected or any(count != 1 for count in pairs.values()):
+        problems.append('not every pair meets exactly once')
+    return problems
+
+
+def checkBalance(schedule: List[tuple], size: int) -> List[str]:
+    if firstImbalance(schedule, size) > 1:
+        return ['a participant is first more than once more often than another']
+    return []
+
+
+def firstImbalance(schedule: List[tuple], size: int) -> int:
+    """Difference between the most and the least times a participant is the first of a bout."""
+    firsts = collections.Counter(a for a, _ in schedule)
+    return max(firsts[p] for p in range(size)) - min(firsts[p] for p in range(size))
+
+
+def checkRings(schedules: List[List[tuple]], assigned: List[List[tuple]], num_rings: int, rest_slots: int) -> List[str]:
+    problems = []
+    positions = [pos for group in assigned for pos in group]
+    if len(set(positions)) != len(positions) or any(not 0 <= ring < num_rings for ring, _ in positions):
+        problems.append('a ring has two bouts at once')
+    slots = collections.defaultdict(list)
+    for g, (schedule, group) in enumerate(zip(schedules, assigned)):
+        for bout, (_, slot) in zip(schedule, group):
+            for p in bout:
+                slots[(g, p)].append(slot)
+    if any(b - a - 1 < rest_slots for fighter_slots in slots.values()
+           for a, b in zip(sorted(fighter_slots), sorted(fighter_slots)[1:])):
+        problems.append('a participant does not get enough rest')
+    return problems
+
+
+def checkElimination(layer: List[tuple], num_layers: int, n: int) -> List[str]:
+    problems = []
+    if len(layer) != 2 ** (num_layers - 1):
+        problems.append('first round has {} bouts, not {}'.format(len(layer), 2 ** (num_layers - 1)))
+    seeded = [p for bout in layer for p in bout]
+    if sorted(p for p in seeded if p is not None) != list(range(n)):
+        problems.append('bracket is not a permutation of the participants')
+    if any(a is None and b is None for a, b in layer):
+        problems.append('two byes meet')
+    return problems
+
+
+def run(counts: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+
+    def record(function: str, params: Dict[str, Any], call: Callable[[], Any], check: Callable[[Any], List[str]],
+               **metrics: Any) -> Optional[Any]:
+        entry = dict(function=function, params=params)
+        try:
+            output = call()
+        except ValueError as e:
+            # e.g. participants that cannot be split into groups of the given maximum size
+            entry.update(status='infeasible', message=str(e))
+            results.append(entry)
+            return None
+        problems = check(output)
+        entry.update(status='ok' if not problems else 'failed', seconds=measure(call, repeat))
+        if problems:
+            entry['problems'] = problems
+        for name, metric in metrics.items():
+            entry[name] = metric(output)
+        results.append(entry)
+        return output
+
+    for n in counts:
+        for max_group_size in MAX_GROUP_SIZES:
+            params = dict(n=n, max_group_size=max_group_size)
+            sizes = record('findGroupSizes', params,
+                           lambda: algorithms.findGroupSizes(n, max_group_size),
+                           lambda sizes: checkGroupSizes(sizes, n, max_group_size))
+            if sizes is None:
+                continue
+            record('solveGroupSizes', dict(params, min_group_size=3),
+                   lambda: algorithms.solveGroupSizes(n, 3, max_group_size),
+                   lambda sizes: checkGroupSizes(sizes, n, max_group_size))
+            participants = list(range(n))
+            record('assignGroups', params,
+                   lambda: algorithms.assignGroups(sizes, participants),
+                   lambda groups: checkAssignment(groups, sizes, n))
+            # about one club per eight participants, a few of them big
+            record('assignGroups', dict(params, clubs=True),
+                   lambda: algorithms.assignGroups(sizes, participants, club=lambda p: (p * p) % (n // 8 + 1)),
+                   lambda groups: checkAssignment(groups, sizes, n))
+
+    for size in GROUP_SIZES + LEAGUE_SIZES:
+        group = list(range(size))
+        record('makeGroupSchedule', dict(size=size),
+               lambda: algorithms.makeGroupSchedule(group),
+               lambda schedule: checkSchedule(schedule, size),
+               first_imbalance=lambda schedule: firstImbalance(schedule, size))
+        if size % 2 == 0:
+            record('makeGroupCircle', dict(size=size),
+                   lambda: algorithms.makeGroupCircle(group),
+                   lambda schedule: checkSchedule(schedule, size))
+        else:
+            record('makeGroupOdd', dict(size=size),
+                   lambda: algorithms.makeGroupOdd(group),
+                   lambda schedule: checkSchedule(schedule, size) + checkBalance(schedule, size))
+
+    for size in GROUP_SIZES + LEAGUE_SIZES + [1001]:
+        record('iterGroupSchedule', dict(size=size),
+               lambda: [bout for rnd in algorithms.iterGroupSchedule(size) for bout in rnd],
+               lambda schedule: checkSchedule(schedule, size) + (checkBalance(schedule, size) if size % 2 else []))
+
+    for num_groups, num_rings in [(4, 4), (25, 6), (80, 6)]:
+        schedules = [algorithms.makeGroupSchedule(list(range(7 - g % 2))) for g in range(num_groups)]
+        record('scheduleRings', dict(groups=num_groups, rings=num_rings, bout_duration=3, min_rest=6),
+               lambda: algorithms.scheduleRings(schedules, num_rings, 3, 6),
+               lambda assigned: checkRings(schedules, assigned, num_rings, 2),
+               slots=lambda assigned: 1 + max(slot for group in assigned for _, slot in group))
+
+    for n in sorted(set(counts + [3, 5, 8, 16, 17, 33])):
+        participants = list(range(n))
+        record('makeElimination', dict(n=n),
+               lambda: algorithms.makeElimination(participants),
+               lambda output: checkElimination(output[0], output[1], n))
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], factor: float) -> List[str]:
+    """Returns descriptions of the cases that got slower than ``factor`` times the baseline."""
+    def key(entry):
+        return entry['function'], json.dumps(entry['params'], sort_keys=True)
+    before = {key(entry): entry for entry in baseline if 'seconds' in entry}
+    slower = []
+    for entry in results:
+        old = before.get(key(entry))
+        if old is None or 'seconds' not in entry:
+            continue
+        if entry['seconds'] > factor * old['seconds']:
+            slower.append('{} {}: {:.3g} s -> {:.3g} s'.format(entry['function'], entry['params'],
+                                                              old['seconds'], entry['seconds']))
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks the scheduling algorithms and checks their invariants.')
+    parser.add_argument('-o', '--output', help='file to write the results into as JSON (default: standard output)')
+    parser.add_argument('--compare', help='results of an earlier run to compare the timings with')
+    parser.add_argument('--factor', type=float, default=1.5, help='how many times slower a case may get (default: 1.5)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help='skip the stress sizes')
+    args = parser.parse_args(argv)
+
+    results = run(QUICK_PARTICIPANT_COUNTS if args.quick else PARTICIPANT_COUNTS, args.repeat)
+    report = dict(
+        created=datetime.datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results=results,
+    )
+    text = json.dumps(report, indent=1)
+    if args.output is None:
+        print(text)
+    else:
+        Path(args.output).write_text(text + '\n')
+
+    status = 0
+    for entry in results:
+        if entry['status'] == 'failed':
+            print('{} {}: {}'.format(entry['function'], entry['params'], '; '.join(entry['problems'])), file=sys.stderr)
+            status = 1
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text())['results']
+        for line in compare(results, baseline, args.factor):
+            print('slower: ' + line, file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# coding: utf-8
+"""Benchmarks generating and evaluating whole tournaments with the macros of ``main.py``.
+
+Runs without LibreOffice: the macros work on the in-memory document of ``fakeoffice.py``, which
+counts every call into the document, e.g.
+
+    python benchmarks/bench_generation.py --output generation.json
+    python benchmarks/bench_generation.py --compare generation.json
+
+Exits with a non-zero status if a macro fails, or, with ``--compare``, if a case got slower than
+the given factor or makes more calls than before.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'pythonpath'))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fakeoffice
+
+fakeoffice.install()
+
+import constants
+import helpers
+import main as macros
+from bench_algorithms import compare
+
+PARTICIPANT_COUNTS = [50, 100, 250, 500, 1000, 2000]
+QUICK_PARTICIPANT_COUNTS = [50, 100, 250]
+# macros run one after the other on the same document, after the scores of the groups are entered
+MACROS = ['schedule', 'evalGroupsStatic', 'evalGroups', 'evalFinalStatic', 'evalFinal']
+
+
+def createDocument(num_participants: int, seed: int) -> fakeoffice.Document:
+    """Returns an initialized document with the given number of present participants from a few clubs."""
+    rng = random.Random(seed)
+    doc = fakeoffice.Document()
+    macros.CTX = fakeoffice.ScriptContext(doc)
+    macros.init()
+    clubs = ['Club {}'.format(i + 1) for i in range(max(2, num_participants // 6))]
+    rows = [('Fencer {}'.format(i + 1), rng.choice(clubs), rng.randint(1, 100), 'y') for i in range(num_participants)]
+    doc.Sheets[constants.PARTICIPANT_LIST].getCellRangeByPosition(0, 1, 3, num_participants).setDataArray(tuple(rows))
+    return doc
+
+
+def enterGroupScores(doc: fakeoffice.Document, seed: int) -> None:
+    """Enters random scores of all bouts into the schedules of the group sheets."""
+    rng = random.Random(seed)
+    for i, rows in enumerate(helpers._readGroups(doc)):
+        sheet = doc.Sheets['Group {}'.format(i + 1)]
+        for _, _, col, row in helpers._groupBouts(len(rows)):
+            sheet.getCellRangeByPosition(col + 2, row, col + 2, row + 1).setDataArray(
+                ((rng.randint(0, 5),), (rng.randint(0, 5),)))
+
+
+def runMacros(num_participants: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Runs all macros on a new document and returns the time and the calls of each."""
+    doc = createDocument(num_participants, seed)
+    measured = dict()
+    for macro in MACROS:
+        if macro == 'evalGroupsStatic':
+            enterGroupScores(doc, seed)
+        doc.calls.clear()
+        start = time.perf_counter()
+        getattr(macros, macro)()
+        measured[macro] = dict(seconds=time.perf_counter() - start, calls=sum(doc.calls.values()),
+                               methods=dict(doc.calls.most_common(10)))
+    return measured
+
+
+def run(counts: List[int], repeat: int, seed: int) -> List[Dict[str, Any]]:
+    results = []
+    for num_participants in counts:
+        params = dict(participants=num_participants)
+        try:
+            runs = [runMacros(num_participants, seed) for _ in range(repeat)]
+        except Exception as e:
+            results.append(dict(function='tournament', params=params, status='failed',
+                                problems=['{}: {}'.format(type(e).__name__, e)]))
+            continue
+        for macro in MACROS:
+            best = min((measured[macro] for measured in runs), key=lambda measured: measured['seconds'])
+            results.append(dict(function=macro, params=params, status='ok', **best))
+    return results
+
+
+def moreCalls(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[str]:
+    """Returns descriptions of the cases that make more calls into the document than in the baseline."""
+    def key(entry):
+        return entry['function'], json.dumps(entry['params'], sort_keys=True)
+    before = {key(entry): entry for entry in baseline if 'calls' in entry}
+    more = []
+    for entry in results:
+        old = before.get(key(entry))
+        if old is not None and 'calls' in entry and entry['calls'] > old['calls']:
+            more.append('{} {}: {} calls -> {} calls'.format(entry['function'], entry['params'], old['calls'], entry['calls']))
+    return more
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks generating and evaluating tournaments on an in-memory document.')
+    parser.add_argument('-o', '--output', help='file to write the results into as JSON (default: standard output)')
+    parser.add_argument('--compare', help='results of an earlier run to compare the timings and call counts with')
+    parser.add_argument('--factor', type=float, default=1.5, help='how many times slower a case may get (default: 1.5)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--participants', type=int, nargs='+', help='numbers of participants (default: 50 to 2000)')
+    parser.add_argument('--quick', action='store_true', help='skip the large tournaments')
+    args = parser.parse_args(argv)
+
+    counts = args.participants or (QUICK_PARTICIPANT_COUNTS if args.quick else PARTICIPANT_COUNTS)
+    results = run(counts, args.repeat, args.seed)
+    report = dict(
+        created=datetime.datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results=results,
+    )
+    text = json.dumps(report, indent=1)
+    if args.output is None:
+        print(text)
+    else:
+        Path(args.output).write_text(text + '\n')
+
+    status = 0
+    for entry in results:
+        if entry['status'] == 'failed':
+            print('{} {}: {}'.format(entry['function'], entry['params'], '; '.join(entry['problems'])), file=sys.stderr)
+            status = 1
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text())['results']
+        for line in compare(results, baseline, args.factor):
+            print('slower: ' + line, file=sys.stderr)
+            status = 1
+        for line in moreCalls(results, baseline):
+            print('more calls: ' + line, file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
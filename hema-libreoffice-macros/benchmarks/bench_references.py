@@ -0,0 +1,140 @@
+# coding: utf-8
+"""Benchmarks building the cell addresses and formulas of group sheets with ``references.py``.
+
+Runs without LibreOffice and compares the precomputed tables and per-size formulas with building
+every string on the spot, the way the group sheets used to be written, e.g.
+
+    python benchmarks/bench_references.py --groups 200 --group-size 7
+
+Exits with a non-zero status if both ways do not give the same formulas.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'pythonpath'))
+
+import algorithms
+import constants
+import references
+from bench_algorithms import measure
+
+# layout of a group sheet, as in helpers._GROUP_TABLE, _groupSchedule and _SCHEDULE_COLUMNS
+GROUP_TABLE = (0, 5)
+SCHEDULE_COLUMNS = 2
+
+
+def groupBouts(group_size: int) -> Tuple[Tuple[int, int, int, int], ...]:
+    left, top = group_size + 7, 0
+    return tuple((a, b, left + 3 * (j % SCHEDULE_COLUMNS), top + 2 * (j // SCHEDULE_COLUMNS))
+                 for j, (a, b) in enumerate(algorithms.scheduleTemplate(group_size)))
+
+
+def legacyAddress(col: int, row: int) -> str:
+    column = ""
+    rem = col % 26
+    div = col // 26
+    column = chr(ord('A') + rem) + column
+    while div > 0:
+        rem = div % 26
+        div = div // 26
+        column = chr(ord('A') + rem) + column
+    return column + str(row + 1)
+
+
+def legacyGroup(group_name: str, rows: List[int]) -> List[str]:
+    """Builds the formulas of a group sheet and its results rows the way every cell used to be built."""
+    size = len(rows)
+    left, top = GROUP_TABLE
+    formulas = []
+    for j, row in enumerate(rows):
+        formulas.append('={}'.format("$'{}'.{}".format(constants.PARTICIPANT_LIST, legacyAddress(0, row))))
+        dealt_cells = '{}:{}'.format(legacyAddress(left + 2, top + 1 + j), legacyAddress(left + 2 + size - 1, top + 1 + j))
+        received_cells = '{}:{}'.format(legacyAddress(left + 2 + j, top + 1), legacyAddress(left + 2 + j, top + 1 + size - 1))
+        formulas.append('=SUMPRODUCT({} > TRANSPOSE({})) / {}'.format(dealt_cells, received_cells, size - 1))
+        formulas.append('=SUM({})'.format(dealt_cells))
+        formulas.append('=SUM({})'.format(received_cells))
+        for k in range(3):
+            formulas.append("=$'{}'.{}".format(group_name, legacyAddress(left + 2 + size + k, top + 1 + j)))
+    for a, b, col, row in groupBouts(size):
+        formulas.append('={}'.format("$'{}'.{}".format(constants.PARTICIPANT_LIST, legacyAddress(0, rows[a]))))
+        formulas.append('={}'.format("$'{}'.{}".format(constants.PARTICIPANT_LIST, legacyAddress(0, rows[b]))))
+        formulas.append('=IF(ISBLANK({0}); ""; {0})'.format(legacyAddress(col + 2, row)))
+        formulas.append('=IF(ISBLANK({0}); ""; {0})'.format(legacyAddress(col + 2, row + 1)))
+    return formulas
+
+
+def cachedGroup(group_name: str, rows: List[int]) -> List[str]:
+    """Builds the same formulas as :func:`legacyGroup` with ``references.py``."""
+    size = len(rows)
+    bouts = groupBouts(size)
+    group_formulas = references.groupFormulas(size, GROUP_TABLE, bouts)
+    names = ['=' + references.participantName(row) for row in rows]
+    prefix = '=' + references.sheetPrefix(group_name)
+    formulas = []
+    for j in range(size):
+        formulas.append(names[j])
+        formulas.append(group_formulas.ratio[j])
+        formulas.append(group_formulas.dealt[j])
+        formulas.append(group_formulas.received[j])
+        for cell in group_formulas.results[j]:
+            formulas.append(prefix + cell)
+    for (a, b, _, _), (top_binding, bottom_binding) in zip(bouts, group_formulas.bindings):
+        formulas.append(names[a])
+        formulas.append(names[b])
+        formulas.append(top_binding)
+        formulas.append(bottom_binding)
+    return formulas
+
+
+def run(num_groups: int, group_size: int, repeat: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    groups = [('Group {}'.format(i + 1), list(range(1 + i * group_size, 1 + (i + 1) * group_size))) for i in range(num_groups)]
+    problems = []
+    for group_name, rows in groups:
+        if legacyGroup(group_name, rows) != cachedGroup(group_name, rows):
+            problems.append('{}: formulas differ'.format(group_name))
+    num_formulas = sum(len(legacyGroup(group_name, rows)) for group_name, rows in groups)
+
+    def cold() -> None:
+        references.groupFormulas.cache_clear()
+        for group_name, rows in groups:
+            cachedGroup(group_name, rows)
+
+    cases: List[Tuple[str, Callable[[], Any], int]] = [
+        ('legacy address', lambda: [legacyAddress(col, row) for col in range(64) for row in range(16)], 64 * 16),
+        ('address', lambda: [references.address(col, row) for col in range(64) for row in range(16)], 64 * 16),
+        ('legacy group sheets', lambda: [legacyGroup(group_name, rows) for group_name, rows in groups], num_formulas),
+        ('group sheets, formulas cached', lambda: [cachedGroup(group_name, rows) for group_name, rows in groups], num_formulas),
+        ('group sheets, cache cleared', cold, num_formulas),
+    ]
+    results = []
+    for name, call, count in cases:
+        seconds = measure(call, repeat)
+        results.append(dict(case=name, strings=count, seconds=seconds, per_second=count / seconds))
+    return results, problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks building cell addresses and formulas of group sheets.')
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--group-size', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results, problems = run(args.groups, args.group_size, args.repeat)
+    if args.json:
+        print(json.dumps(dict(groups=args.groups, group_size=args.group_size, results=results), indent=1))
+    else:
+        for entry in results:
+            print('{:<32} {:>10.0f} strings/s  ({:.3g} s for {})'.format(
+                entry['case'], entry['per_second'], entry['seconds'], entry['strings']))
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,568 @@
+# coding: utf-8
+"""An in-memory stand-in for the parts of the LibreOffice API that the macros use, e.g.
+
+    fakeoffice.install()
+    import main
+    doc = fakeoffice.Document()
+    main.CTX = fakeoffice.ScriptContext(doc)
+    main.init()
+
+Every call is counted in ``doc.calls``. Formulas are stored but not calculated.
+"""
+import re
+import sys
+import types
+from collections import Counter
+
+# properties of cells and ranges that are stored, everything else is refused like a misspelled UNO property
+CELL_PROPERTIES = {'CellStyle', 'TopBorder2', 'BottomBorder2', 'LeftBorder2', 'RightBorder2', 'TableBorder2',
+                   'HoriJustify', 'VertJustify', 'CharColor', 'CellBackColor', 'IsCellBackgroundTransparent',
+                   'CharHeight', 'CharWeight'}
+
+_STRUCT_DEFAULTS = {
+    'com.sun.star.table.BorderLine2': dict(Color=0, InnerLineWidth=0, OuterLineWidth=0, LineDistance=0, LineStyle=0, LineWidth=0),
+    'com.sun.star.table.TableBorder2': dict(TopLine=None, IsTopLineValid=False, BottomLine=None, IsBottomLineValid=False,
+                                            LeftLine=None, IsLeftLineValid=False, RightLine=None, IsRightLineValid=False,
+                                            HorizontalLine=None, IsHorizontalLineValid=False, VerticalLine=None,
+                                            IsVerticalLineValid=False, Distance=0, IsDistanceValid=False),
+    'com.sun.star.table.TableSortField': dict(Field=0, IsAscending=True, IsCaseSensitive=False, FieldType=0),
+    'com.sun.star.table.CellRangeAddress': dict(Sheet=0, StartColumn=0, StartRow=0, EndColumn=0, EndRow=0),
+    'com.sun.star.table.CellAddress': dict(Sheet=0, Column=0, Row=0),
+    'com.sun.star.beans.PropertyValue': dict(Name='', Value=None),
+}
+
+_NUMBER = re.compile(r'^\s*[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?\s*$')
+
+
+class Struct:
+    """A UNO struct: a bag of fields with the defaults of its type."""
+
+    def __init__(self, typeName, **fields):
+        self.typeName = typeName
+        self.__dict__.update(_STRUCT_DEFAULTS.get(typeName, {}))
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(k, v) for k, v in self.__dict__.items() if k != 'typeName')
+        return '{}({})'.format(self.typeName.rsplit('.', 1)[-1], fields)
+
+
+class Any:
+    def __init__(self, typeName, value):
+        self.typeName = typeName
+        self.value = value
+
+
+def install():
+    """Makes ``import uno`` give a module backed by this file, unless the real one can be imported."""
+    try:
+        import uno  # noqa: F401
+        return False
+    except ImportError:
+        pass
+    module = types.ModuleType('uno')
+    module.createUnoStruct = lambda typeName, **fields: Struct(typeName, **fields)
+    module.Any = Any
+    module.systemPathToFileUrl = lambda path: 'file://' + path
+    module.fileUrlToSystemPath = lambda url: url[len('file://'):]
+    sys.modules['uno'] = module
+    return True
+
+
+def parseContent(text):
+    """Parses a string in the notation of ``setFormulaArray`` into a (kind, value) pair, or ``None`` if empty."""
+    if text == '':
+        return None
+    if len(text) > 1 and text[0] == '=':
+        return ('formula', text)
+    if text[0] == "'":
+        return ('text', text[1:])
+    if _NUMBER.match(text):
+        return ('value', float(text))
+    return ('text', text)
+
+
+def formatNumber(value):
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Object:
+    _kind = 'Object'
+
+    def _count(self, method):
+        self._doc().calls['{}.{}'.format(self._kind, method)] += 1
+
+    def _doc(self):
+        return self.__dict__['doc']
+
+
+class CellStyle(_Object):
+    _kind = 'CellStyle'
+
+    def __init__(self, doc):
+        self.__dict__.update(doc=doc, properties=dict(), parent=None)
+
+    def setPropertyValues(self, names, values):
+        self._count('setPropertyValues')
+        self.properties.update(zip(names, values))
+
+    def setPropertyValue(self, name, value):
+        self._count('setPropertyValue')
+        self.properties[name] = value
+
+    def setParentStyle(self, name):
+        self._count('setParentStyle')
+        self.__dict__['parent'] = name
+
+    def __setattr__(self, name, value):
+        self._count('set ' + name)
+        self.properties[name] = value
+
+
+class StyleFamily(_Object):
+    _kind = 'StyleFamily'
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.styles = {'Default': CellStyle(doc)}
+
+    def hasByName(self, name):
+        self._count('hasByName')
+        return name in self.styles
+
+    def insertByName(self, name, style):
+        self._count('insertByName')
+        self.styles[name] = style
+
+    def removeByName(self, name):
+        self._count('removeByName')
+        del self.styles[name]
+
+    def getByName(self, name):
+        self._count('getByName')
+        return self.styles[name]
+
+    __getitem__ = getByName
+
+    def __contains__(self, name):
+        self._count('hasByName')
+        return name in self.styles
+
+
+class Column(_Object):
+    _kind = 'Column'
+
+    def __init__(self, sheet, index):
+        self.__dict__.update(doc=sheet.doc, sheet=sheet, index=index)
+
+    def __setattr__(self, name, value):
+        self._count('set ' + name)
+        properties = self.sheet.columns.setdefault(self.index, dict())
+        properties[name] = value
+        if name == 'OptimalWidth' and value:
+            # the width would depend on the font, any plausible number does
+            properties['Width'] = 2000
+
+    def __getattr__(self, name):
+        self._count('get ' + name)
+        return self.sheet.columns.get(self.index, dict()).get(name, dict(Width=2258, IsVisible=True).get(name))
+
+
+class Columns(_Object):
+    _kind = 'Columns'
+
+    def __init__(self, sheet, start):
+        self.doc = sheet.doc
+        self.sheet = sheet
+        self.start = start
+
+    def getByIndex(self, index):
+        self._count('getByIndex')
+        return Column(self.sheet, self.start + index)
+
+    __getitem__ = getByIndex
+
+
+class CellRange(_Object):
+    _kind = 'CellRange'
+
+    def __init__(self, sheet, left, top, right, bottom):
+        self.__dict__.update(doc=sheet.doc if sheet is not None else None, sheet=sheet,
+                             left=left, top=top, right=right, bottom=bottom)
+
+    def __setattr__(self, name, value):
+        self._count('set ' + name)
+        if name not in CELL_PROPERTIES:
+            raise AttributeError(name)
+        self.sheet.operations.append(((self.left, self.top, self.right, self.bottom), name, value))
+
+    def __getattr__(self, name):
+        if name == 'RangeAddress':
+            self._count('get RangeAddress')
+            return Struct('com.sun.star.table.CellRangeAddress', Sheet=self.sheet.index(), StartColumn=self.left,
+                          StartRow=self.top, EndColumn=self.right, EndRow=self.bottom)
+        if name == 'Columns':
+            self._count('get Columns')
+            return Columns(self.sheet, self.left)
+        if name in CELL_PROPERTIES:
+            self._count('get ' + name)
+            return self.sheet.cellProperty(self.left, self.top, name)
+        raise AttributeError(name)
+
+    def getCellByPosition(self, col, row):
+        self._count('getCellByPosition')
+        return Cell(self.sheet, self.left + col, self.top + row)
+
+    def getCellRangeByPosition(self, left, top, right, bottom):
+        self._count('getCellRangeByPosition')
+        return CellRange(self.sheet, self.left + left, self.top + top, self.left + right, self.top + bottom)
+
+    def merge(self, merge):
+        self._count('merge')
+        if merge:
+            self.sheet.merged.add((self.left, self.top, self.right, self.bottom))
+
+    def _put(self, rows, parse):
+        if len(rows) != self.bottom - self.top + 1 or any(len(row) != self.right - self.left + 1 for row in rows):
+            raise ValueError('array does not fit the range')
+        contents = self.sheet.contents
+        for row, items in enumerate(rows, self.top):
+            for col, item in enumerate(items, self.left):
+                content = parse(item)
+                if content is None:
+                    contents.pop((col, row), None)
+                else:
+                    contents[(col, row)] = content
+
+    def setFormulaArray(self, rows):
+        self._count('setFormulaArray')
+        self._put(rows, parseContent)
+
+    def setDataArray(self, rows):
+        self._count('setDataArray')
+        self._put(rows, lambda item: None if item == '' else ('text', item) if isinstance(item, str) else ('value', float(item)))
+
+    def getDataArray(self):
+        self._count('getDataArray')
+        return tuple(tuple(self.sheet.cellValue(col, row) for col in range(self.left, self.right + 1))
+                     for row in range(self.top, self.bottom + 1))
+
+    def getFormulaArray(self):
+        self._count('getFormulaArray')
+        return tuple(tuple(self.sheet.cellFormula(col, row) for col in range(self.left, self.right + 1))
+                     for row in range(self.top, self.bottom + 1))
+
+    def createSortDescriptor(self):
+        self._count('createSortDescriptor')
+        return tuple(Struct('com.sun.star.beans.PropertyValue', Name=name)
+                     for name in ('IsSortColumns', 'ContainsHeader', 'BindFormatsToContent', 'MaxFieldCount', 'SortFields'))
+
+    def sort(self, descriptor):
+        # sorting would need the values of the formulas, the call is only counted
+        self._count('sort')
+
+
+class Cell(CellRange):
+    _kind = 'Cell'
+
+    def __init__(self, sheet, col, row):
+        CellRange.__init__(self, sheet, col, row, col, row)
+
+    def setValue(self, value):
+        self._count('setValue')
+        self.sheet.contents[(self.left, self.top)] = ('value', float(value))
+
+    def setString(self, text):
+        self._count('setString')
+        if text:
+            self.sheet.contents[(self.left, self.top)] = ('text', text)
+        else:
+            self.sheet.contents.pop((self.left, self.top), None)
+
+    def setFormula(self, formula):
+        self._count('setFormula')
+        content = parseContent(formula)
+        if content is None:
+            self.sheet.contents.pop((self.left, self.top), None)
+        else:
+            self.sheet.contents[(self.left, self.top)] = content
+
+    def getValue(self):
+        self._count('getValue')
+        value = self.sheet.cellValue(self.left, self.top)
+        return value if isinstance(value, float) else 0.0
+
+    def getString(self):
+        self._count('getString')
+        value = self.sheet.cellValue(self.left, self.top)
+        return formatNumber(value) if isinstance(value, float) else value
+
+    def getFormula(self):
+        self._count('getFormula')
+        return self.sheet.cellFormula(self.left, self.top)
+
+    def getCellAddress(self):
+        self._count('getCellAddress')
+        return Struct('com.sun.star.table.CellAddress', Sheet=self.sheet.index(), Column=self.left, Row=self.top)
+
+
+class Cursor(_Object):
+    _kind = 'Cursor'
+
+    def __init__(self, sheet):
+        self.doc = sheet.doc
+        self.sheet = sheet
+        self.RangeAddress = Struct('com.sun.star.table.CellRangeAddress', Sheet=sheet.index())
+
+    def gotoEndOfUsedArea(self, expand):
+        self._count('gotoEndOfUsedArea')
+        self.RangeAddress.EndColumn = max((col for col, _ in self.sheet.contents), default=0)
+        self.RangeAddress.EndRow = max((row for _, row in self.sheet.contents), default=0)
+
+    def gotoStartOfUsedArea(self, expand):
+        self._count('gotoStartOfUsedArea')
+
+
+class Sheet(CellRange):
+    _kind = 'Sheet'
+
+    def __init__(self, doc, name):
+        CellRange.__init__(self, None, 0, 0, 16383, 1048575)
+        self.__dict__.update(doc=doc, sheet=self, name=name, contents=dict(), values=dict(), operations=[],
+                             merged=set(), columns=dict(), properties=dict())
+
+    def __setattr__(self, name, value):
+        if name in ('IsVisible', 'TabColor', 'Name'):
+            self._count('set ' + name)
+            if name == 'Name':
+                self.__dict__['name'] = value
+            else:
+                self.properties[name] = value
+            return
+        CellRange.__setattr__(self, name, value)
+
+    def __getattr__(self, name):
+        if name == 'Columns':
+            self._count('get Columns')
+            return Columns(self, 0)
+        if name in ('IsVisible', 'TabColor'):
+            self._count('get ' + name)
+            return self.properties.get(name, True if name == 'IsVisible' else -1)
+        return CellRange.__getattr__(self, name)
+
+    def index(self):
+        return self.doc.Sheets.sheets.index(self)
+
+    def getName(self):
+        self._count('getName')
+        return self.name
+
+    def setName(self, name):
+        self._count('setName')
+        self.__dict__['name'] = name
+
+    def createCursor(self):
+        self._count('createCursor')
+        return Cursor(self)
+
+    def cellValue(self, col, row):
+        """Returns what ``getDataArray`` gives for the cell."""
+        content = self.contents.get((col, row))
+        if content is None:
+            return ''
+        if content[0] == 'formula':
+            return self.values.get((col, row), '')
+        return content[1]
+
+    def cellFormula(self, col, row):
+        """Returns what ``getFormulaArray`` gives for the cell."""
+        content = self.contents.get((col, row))
+        if content is None:
+            return ''
+        if content[0] == 'value':
+            return formatNumber(content[1])
+        return content[1]
+
+    def cellProperty(self, col, row, name):
+        """Returns the property of the cell as last set on any range containing it, or ``None``."""
+        for (left, top, right, bottom), operation, value in reversed(self.operations):
+            if operation == name and left <= col <= right and top <= row <= bottom:
+                return value
+        return 'Default' if name == 'CellStyle' else None
+
+
+class Sheets(_Object):
+    _kind = 'Sheets'
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.sheets = []
+
+    def _find(self, name):
+        for sheet in self.sheets:
+            if sheet.name == name:
+                return sheet
+        raise KeyError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            self._count('getByIndex')
+            return self.sheets[key]
+        self._count('getByName')
+        return self._find(key)
+
+    def getByName(self, name):
+        return self[name]
+
+    def getByIndex(self, index):
+        return self[index]
+
+    def hasByName(self, name):
+        self._count('hasByName')
+        return any(sheet.name == name for sheet in self.sheets)
+
+    __contains__ = hasByName
+
+    def __len__(self):
+        self._count('getCount')
+        return len(self.sheets)
+
+    getCount = __len__
+
+    def __iter__(self):
+        self._count('createEnumeration')
+        return iter(list(self.sheets))
+
+    def getElementNames(self):
+        self._count('getElementNames')
+        return tuple(sheet.name for sheet in self.sheets)
+
+    def insertNewByName(self, name, position):
+        self._count('insertNewByName')
+        if any(sheet.name == name for sheet in self.sheets):
+            raise ValueError('sheet {} exists'.format(name))
+        self.sheets.insert(position, Sheet(self.doc, name))
+
+    def removeByName(self, name):
+        self._count('removeByName')
+        self.sheets.remove(self._find(name))
+
+    def moveByName(self, name, position):
+        self._count('moveByName')
+        sheet = self._find(name)
+        index = self.sheets.index(sheet)
+        self.sheets.insert(position, sheet)
+        del self.sheets[index if position > index else index + 1]
+
+
+class SheetCellRanges(_Object):
+    _kind = 'SheetCellRanges'
+
+    def __init__(self, doc):
+        self.__dict__.update(doc=doc, addresses=[])
+
+    def addRangeAddress(self, address, merge):
+        self._count('addRangeAddress')
+        self.addresses.append(address)
+
+    def addRangeAddresses(self, addresses, merge):
+        self._count('addRangeAddresses')
+        self.addresses.extend(addresses)
+
+    def setPropertyValue(self, name, value):
+        self._count('setPropertyValue')
+        if name not in CELL_PROPERTIES:
+            raise AttributeError(name)
+        for address in self.addresses:
+            self.doc.Sheets.sheets[address.Sheet].operations.append(
+                ((address.StartColumn, address.StartRow, address.EndColumn, address.EndRow), name, value))
+
+    def __setattr__(self, name, value):
+        self.setPropertyValue(name, value)
+
+
+class Controller(_Object):
+    _kind = 'Controller'
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.active_sheet = None
+
+    def setActiveSheet(self, sheet):
+        self._count('setActiveSheet')
+        self.active_sheet = sheet
+
+
+class Document(_Object):
+    """A spreadsheet document with a single empty sheet, like a new one."""
+    _kind = 'Document'
+
+    def __init__(self):
+        self.calls = Counter()
+        self.doc = self
+        self.Sheets = Sheets(self)
+        self.Sheets.sheets.append(Sheet(self, 'Sheet1'))
+        self.style_families = {'CellStyles': StyleFamily(self)}
+        self.controller = Controller(self)
+        self.controller_locks = 0
+        self.action_locks = 0
+        self.automatic_calculation = True
+
+    def getSheets(self):
+        return self.Sheets
+
+    def getStyleFamilies(self):
+        self._count('getStyleFamilies')
+        return self.style_families
+
+    def createInstance(self, service):
+        self._count('createInstance')
+        if service == 'com.sun.star.style.CellStyle':
+            return CellStyle(self)
+        if service == 'com.sun.star.sheet.SheetCellRanges':
+            return SheetCellRanges(self)
+        raise ValueError('unknown service {}'.format(service))
+
+    def getCurrentController(self):
+        self._count('getCurrentController')
+        return self.controller
+
+    def lockControllers(self):
+        self._count('lockControllers')
+        self.controller_locks += 1
+
+    def unlockControllers(self):
+        self._count('unlockControllers')
+        self.controller_locks -= 1
+
+    def addActionLock(self):
+        self._count('addActionLock')
+        self.action_locks += 1
+
+    def removeActionLock(self):
+        self._count('removeActionLock')
+        self.action_locks -= 1
+
+    def isAutomaticCalculationEnabled(self):
+        self._count('isAutomaticCalculationEnabled')
+        return self.automatic_calculation
+
+    def enableAutomaticCalculation(self, enable):
+        self._count('enableAutomaticCalculation')
+        self.automatic_calculation = enable
+
+    def calculateAll(self):
+        self._count('calculateAll')
+
+
+class ScriptContext:
+    """Stands in for ``XSCRIPTCONTEXT`` of a macro run on the given document."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def getDocument(self):
+        return self.doc
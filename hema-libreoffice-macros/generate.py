@@ -0,0 +1,129 @@
+# coding: utf-8
+"""Generates tournaments from the command line, without the LibreOffice user interface.
+
+Every input file has to contain the 'Participant list' and 'Settings' sheets (as created by
+``main.init``). The tournament is generated into it exactly as by ``main.schedule`` and the result
+is saved as a new .ods file. All files are processed over one connection to a headless office,
+which is started if none is listening on the given port, e.g.
+
+    python generate.py --output-dir out/ longsword.ods sabre.ods rapier.ods
+
+Needs a Python that can import ``uno``, i.e. usually the one that comes with LibreOffice.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pythonpath'))
+
+import uno
+from com.sun.star.connection import NoConnectException
+
+import helpers
+
+
+def connect(host, port, soffice=None, timeout=30):
+    """Connects to an office listening on the given socket and returns its desktop.
+
+    If no office is listening and ``soffice`` is given, starts it headless and waits for it up to
+    ``timeout`` seconds. Returns the desktop and the started process (or ``None``).
+    """
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local_ctx)
+    url = 'uno:socket,host={},port={};urp;StarOffice.ComponentContext'.format(host, port)
+    process = None
+    deadline = time.time() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve(url)
+            break
+        except NoConnectException:
+            if soffice is None or time.time() > deadline:
+                raise
+            if process is None:
+                process = subprocess.Popen([
+                    soffice, '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+                    '--accept=socket,host={},port={};urp;'.format(host, port),
+                ])
+            time.sleep(0.5)
+    desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+    return desktop, process
+
+
+def generate(desktop, input_path, output_path):
+    """Generates the tournament of a single participant file and saves it.
+
+    Returns ``False`` if the file has no present participants.
+    """
+    doc = desktop.loadComponentFromURL(uno.systemPathToFileUrl(os.path.abspath(input_path)), '_blank', 0,
+                                       _props(Hidden=True))
+    try:
+        with helpers.bulkUpdate(doc, input_path) as bulk_doc:
+            created = helpers.createTournament(bulk_doc)
+        if not created:
+            return False
+        doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                       _props(FilterName='calc8', Overwrite=True))
+        return True
+    finally:
+        doc.close(True)
+
+
+def _props(**kwargs):
+    props = []
+    for name, value in kwargs.items():
+        prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+def _outputPath(input_path, output_dir, suffix):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(input_path))
+    return os.path.join(output_dir, stem + suffix + '.ods')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates tournaments from participant files with a headless LibreOffice.')
+    parser.add_argument('inputs', nargs='+', help='files with the participant list and settings')
+    parser.add_argument('-o', '--output-dir', help='where to save the generated files (default: next to the inputs)')
+    parser.add_argument('--suffix', default='-tournament', help='appended to the name of every generated file')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=2002)
+    parser.add_argument('--soffice', default='soffice', help='office executable to start if none is listening')
+    parser.add_argument('--no-start', action='store_true', help='only connect to an already running office')
+    args = parser.parse_args(argv)
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    desktop, process = connect(args.host, args.port, None if args.no_start else args.soffice)
+    failed = 0
+    try:
+        for input_path in args.inputs:
+            output_path = _outputPath(input_path, args.output_dir, args.suffix)
+            start = time.time()
+            try:
+                ok = generate(desktop, input_path, output_path)
+            except Exception as e:
+                print('{}: failed: {}'.format(input_path, e), file=sys.stderr)
+                failed += 1
+                continue
+            if not ok:
+                print('{}: no present participants'.format(input_path), file=sys.stderr)
+                failed += 1
+                continue
+            print('{} -> {} ({:.1f} s)'.format(input_path, output_path, time.time() - start))
+    finally:
+        if process is not None:
+            desktop.terminate()
+            process.wait()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,9 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
+import logging
+import os
+
 import helpers
 import constants
 import uno
@@ -10,6 +13,10 @@ try:
 except NameError:
     CTX = None
 
+if CTX is not None:
+    # inside LibreOffice, the durations of the macros logged by helpers.bulkUpdate go to its standard error
+    logging.basicConfig(level=logging.INFO)
+
 def init():
     doc = CTX.getDocument()
     
@@ -50,54 +57,112 @@ def init():
     settings.getCellByPosition(1, 2).setValue(0.8)
     settings.getCellByPosition(0, 3).setString('Rating is rank')
     settings.getCellByPosition(1, 3).setValue(1)
+    settings.getCellByPosition(0, 4).setString('Min group size')
+    settings.getCellByPosition(0, 5).setString('Rings')
+    settings.getCellByPosition(0, 6).setString('Bout duration')
+    settings.getCellByPosition(0, 7).setString('Min rest')
+    settings.getCellByPosition(0, 8).setString('Profile')
     settings.Columns[0].OptimalWidth = True
 
     ## set focus to participant list
     doc.getCurrentController().setActiveSheet(plist)
 
 
-def schedule():
+def importParticipants():
     doc = CTX.getDocument()
-    for s in list(doc.Sheets):
-        if s.getName() not in [constants.PARTICIPANT_LIST, constants.SETTINGS]:
-            doc.Sheets.removeByName(s.getName())
+    smgr = CTX.getComponentContext().getServiceManager()
+    picker = smgr.createInstanceWithContext('com.sun.star.ui.dialogs.FilePicker', CTX.getComponentContext())
+    picker.setTitle('Import participants')
+    picker.appendFilter('Participants (CSV, JSON)', '*.csv;*.json')
+    if picker.execute() != 1:
+        return
+    path = uno.fileUrlToSystemPath(picker.getFiles()[0])
+    try:
+        with helpers.bulkUpdate(doc, 'importParticipants') as doc:
+            helpers.importParticipants(doc, path)
+    except (ValueError, OSError) as e:
+        _showError('Import failed', str(e))
 
-    participants = helpers.loadParticipants(doc)
-    if not participants:
+def groupSizes():
+    doc = CTX.getDocument()
+    snapshot = helpers.loadSnapshot(doc)
+    helpers.showGroupSizes(doc, snapshot)
+
+def schedule():
+    doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'schedule') as doc:
+        created = helpers.createTournament(doc)
+    if not created:
         toolkit = CTX.getComponentContext().getServiceManager().createInstance('com.sun.star.awt.Toolkit')
         parent = toolkit.getDesktopWindow()
         from com.sun.star.awt import MessageBoxButtons
         mb = toolkit.createMessageBox(parent, 'errorbox', MessageBoxButtons.BUTTONS_OK, 'No participants', 'No participants were loaded. Are present participants marked as such?')
         mb.execute()
-        return
-    # create final ranking sheet
-    final_ranking = helpers.addSheet(doc, constants.FINAL_RANKING, 2)
-    final_ranking.getCellByPosition(0, 0).setString('Final rank')
-    final_ranking.getCellByPosition(1, 0).setString('Name')
-    final_ranking.getCellByPosition(2, 0).setString('Club')
-    final_ranking.getCellByPosition(3, 0).setString('Elim. round')
-    final_ranking.getCellByPosition(4, 0).setString('Quali')
-    for i, _ in enumerate(participants):
-        final_ranking.getCellByPosition(0, i + 1).setValue(i + 1)
-    
-    # create list of fights sheet
-    list_of_fights = helpers.addSheet(doc, constants.LIST_OF_FIGHTS, 3)
-    list_of_fights.getCellByPosition(0, 0).setString('Phase')
-    list_of_fights.getCellByPosition(1, 0).setString('Fighter 1')
-    list_of_fights.getCellByPosition(2, 0).setString('Fighter 2')
-    list_of_fights.getCellByPosition(3, 0).setString('Fighter 1 score')
-    list_of_fights.getCellByPosition(4, 0).setString('Fighter 2 score')
-    list_of_fights.getCellByPosition(5, 0).setString('Result')
-
-    helpers.createGroups(doc, participants)
-    helpers.createElimination(doc, participants)
+
+def reschedule():
+    doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'reschedule') as doc:
+        updated = helpers.updateTournament(doc)
+    if not updated:
+        toolkit = CTX.getComponentContext().getServiceManager().createInstance('com.sun.star.awt.Toolkit')
+        parent = toolkit.getDesktopWindow()
+        from com.sun.star.awt import MessageBoxButtons
+        mb = toolkit.createMessageBox(parent, 'errorbox', MessageBoxButtons.BUTTONS_OK, 'Groups cannot be kept', 'The present participants do not fit into the existing groups. Use schedule to generate the whole tournament again.')
+        mb.execute()
 
 def evalGroups():
     doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'evalGroups') as doc:
+        snapshot = helpers.loadSnapshot(doc)
 
-    helpers.sortGroupRanking(doc)
+        helpers.sortGroupRanking(doc, snapshot)
+
+def evalGroupsStatic():
+    doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'evalGroupsStatic') as doc:
+        snapshot = helpers.loadSnapshot(doc)
+
+        incomplete = helpers.writeGroupResults(doc)
+        if not incomplete:
+            helpers.sortGroupRanking(doc, snapshot)
+    if incomplete:
+        _showError('Groups not finished', 'Scores are missing in {}. Use evalGroups to rank unfinished groups.'.format(', '.join(incomplete)))
 
 def evalFinal():
     doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'evalFinal') as doc:
+        snapshot = helpers.loadSnapshot(doc)
+
+        helpers.sortFinalRanking(doc, snapshot)
+
+def evalFinalStatic():
+    doc = CTX.getDocument()
+    with helpers.bulkUpdate(doc, 'evalFinalStatic') as doc:
+        snapshot = helpers.loadSnapshot(doc)
+
+        helpers.resolveElimination(doc, snapshot)
+        helpers.sortFinalRanking(doc, snapshot)
+
+def exportCsv():
+    _exportResults('.csv')
+
+def exportJson():
+    _exportResults('.json')
+
+def _exportResults(extension):
+    doc = CTX.getDocument()
+    if not doc.getURL():
+        _showError('Document not saved', 'The results are exported next to the document. Save it first.')
+        return
+    stem = os.path.splitext(uno.fileUrlToSystemPath(doc.getURL()))[0]
+    try:
+        helpers.exportResults(doc, stem, extension)
+    except OSError as e:
+        _showError('Export failed', str(e))
 
-    helpers.sortFinalRanking(doc)
\ No newline at end of file
+def _showError(title, message):
+    toolkit = CTX.getComponentContext().getServiceManager().createInstance('com.sun.star.awt.Toolkit')
+    parent = toolkit.getDesktopWindow()
+    from com.sun.star.awt import MessageBoxButtons
+    mb = toolkit.createMessageBox(parent, 'errorbox', MessageBoxButtons.BUTTONS_OK, title, message)
+    mb.execute()
\ No newline at end of file
@@ -1,7 +1,10 @@
 # coding: utf-8
 
+import array
+import collections
+import functools
 import math
-from typing import List, Optional, Tuple, Union
+from typing import Callable, Hashable, Iterator, List, Optional, Tuple, Union
 import typing
 
 T = typing.TypeVar('T')
@@ -11,29 +14,73 @@ def findGroupSizes(n_total: int, max_group_size: int) -> List[int]:
     """Based on the total number of participants and maximum allowed size of a group,
     determines sizes of individual groups.
     """
-    rem = n_total % max_group_size
-    n = n_total // max_group_size
-    if rem == 0:
-        return [max_group_size] * n
-    if max_group_size <= 4:
-        raise ValueError('Cannot arrange groups - largest group would be smaller than 4.')
-    if n + 1 >= max_group_size - rem:
-        groups = [max_group_size] * (n + 1 - (max_group_size - rem))
-        groups += [max_group_size - 1] * (max_group_size - rem)
-        return groups
-    return findGroupSizes(n_total, max_group_size - 1)
+    while True:
+        rem = n_total % max_group_size
+        n = n_total // max_group_size
+        if rem == 0:
+            return [max_group_size] * n
+        if max_group_size <= 4:
+            raise ValueError('Cannot arrange groups - largest group would be smaller than 4.')
+        if n + 1 >= max_group_size - rem:
+            groups = [max_group_size] * (n + 1 - (max_group_size - rem))
+            groups += [max_group_size - 1] * (max_group_size - rem)
+            return groups
+        max_group_size -= 1
+
+
+def solveGroupSizes(n_total: int, min_group_size: int, max_group_size: int) -> List[int]:
+    """Determines sizes of groups between the given minimum and maximum size (inclusive).
+
+    Of all feasible splits, returns the one with the smallest difference between the largest and the smallest
+    group, and then with the fewest matches in total. Raises ``ValueError`` if there is no feasible split.
+    """
+    alternatives = groupSizeAlternatives(n_total, min_group_size, max_group_size, 1)
+    if not alternatives:
+        raise ValueError('Cannot arrange {} participants into groups of {} to {}.'.format(n_total, min_group_size, max_group_size))
+    return alternatives[0]
+
+
+def groupSizeAlternatives(n_total: int, min_group_size: int, max_group_size: int, count: int) -> List[List[int]]:
+    """Returns up to ``count`` splits into groups between the given minimum and maximum size, best first.
+
+    Splits are ordered as in :func:`solveGroupSizes`. For every number of groups only the most even split is
+    considered, as any other has both a larger spread and more matches.
+    """
+    min_group_size = max(min_group_size, 2)
+    if n_total <= 0 or max_group_size < min_group_size:
+        return []
+    candidates = []
+    for num_groups in range(-(-n_total // max_group_size), n_total // min_group_size + 1):
+        size, rem = divmod(n_total, num_groups)
+        if size < min_group_size or size + (rem > 0) > max_group_size:
+            continue
+        spread = 1 if rem > 0 else 0
+        matches = rem * (size + 1) * size // 2 + (num_groups - rem) * size * (size - 1) // 2
+        candidates.append((spread, matches, num_groups, size, rem))
+    candidates.sort()
+    return [[size + 1] * rem + [size] * (num_groups - rem) for _, _, num_groups, size, rem in candidates[:count]]
 
 
-def assignGroups(group_sizes: List[int], participants: List[T]) -> List[List[T]]:
+def countMatches(group_sizes: List[int]) -> int:
+    """Returns the number of matches of round robins in groups of the given sizes."""
+    return sum(size * (size - 1) // 2 for size in group_sizes)
+
+
+def assignGroups(group_sizes: List[int], participants: List[T],
+                 club: Optional[Callable[[T], Hashable]] = None) -> List[List[T]]:
     """Assigns participants into groups of the given sizes.
 
     Uses the 'snake' algorithm, assuming that participants are already sorted by the desired ranking.
+    If ``club`` is given, clubmates are separated by :func:`separateClubs`.
     """
     min_size = min(group_sizes)
     groups = [[] for _ in range(len(group_sizes))]
+    # positions (group, index in the group) of the participants of every round of the snake
+    rounds = [[] for _ in range(-(-len(participants) // len(groups)))]
     g = 0
     d = 0
     for i, p in enumerate(participants):
+        rounds[i // len(groups)].append((g, len(groups[g])))
         groups[g].append(p)
         if g == 0 or g == len(groups) - 1:
             if g != 0:
@@ -44,45 +91,154 @@ def assignGroups(group_sizes: List[int], participants: List[T]) -> List[List[T]]
         if (i + 1) / len(group_sizes) == min_size and min_size % 2 == 1:
             g = group_sizes.index(min_size) - 1
             d -= 1
+    if club is not None:
+        separateClubs(groups, rounds, club)
     return groups
 
 
-def makeGroupSchedule(group: List[T]):
+def separateClubs(groups: List[List[T]], rounds: List[List[Tuple[int, int]]],
+                  club: Callable[[T], Hashable]) -> int:
+    """Swaps participants of the same snake round between groups in place to reduce the pairs of clubmates in a group.
+
+    Returns the number of remaining pairs.
+    """
+    clubs = [[club(p) for p in group] for group in groups]
+    counts = [collections.Counter(c for c in group_clubs if c) for group_clubs in clubs]
+    # the number of groups every round has positions in, the rounds every group has positions in, and for
+    # every round and club how many of the groups of the round have the club how many times (but not zero times)
+    round_sizes = []
+    group_rounds = [[] for _ in groups]
+    levels = []
+    for r, positions in enumerate(rounds):
+        round_groups = {a for a, _ in positions}
+        round_sizes.append(len(round_groups))
+        round_levels = collections.defaultdict(collections.Counter)
+        for a in round_groups:
+            group_rounds[a].append(r)
+            for c, n in counts[a].items():
+                round_levels[c][n] += 1
+        levels.append(round_levels)
+
+    def gain(a, i, b, j):
+        """How many pairs less there are after swapping the participants at the two positions."""
+        club_a, club_b = clubs[a][i], clubs[b][j]
+        if a == b or club_a == club_b:
+            return 0
+        before = after = 0
+        if club_a:
+            before += counts[a][club_a] - 1
+            after += counts[b][club_a]
+        if club_b:
+            before += counts[b][club_b] - 1
+            after += counts[a][club_b]
+        return before - after
+
+    def move(c, a, b):
+        """Moves a participant of club ``c`` from group ``a`` to group ``b``, keeping the levels up to date."""
+        for g, d in ((a, -1), (b, 1)):
+            n = counts[g][c]
+            for r in group_rounds[g]:
+                if n:
+                    levels[r][c][n] -= 1
+                if n + d:
+                    levels[r][c][n + d] += 1
+            counts[g][c] = n + d
+
+    improved = True
+    while improved:
+        improved = False
+        for r, positions in enumerate(rounds):
+            for a, i in positions:
+                club_a = clubs[a][i]
+                if not club_a or counts[a][club_a] < 2:
+                    continue
+                # only a group of the round with at least two clubmates less can take the participant; the swaps
+                # that help through the other participant alone are found when it is their turn
+                n = counts[a][club_a]
+                club_levels = levels[r][club_a]
+                if sum(club_levels.values()) == round_sizes[r] and not any(club_levels[k] for k in range(1, n - 1)):
+                    continue
+                # the first swap that separates the participant from all their clubmates is good enough
+                best, best_gain = None, 0
+                for b, j in positions:
+                    if counts[b][club_a] > n - 2:
+                        continue
+                    pos_gain = gain(a, i, b, j)
+                    if pos_gain > best_gain:
+                        best, best_gain = (b, j), pos_gain
+                        if pos_gain >= n - 1:
+                            break
+                if best is None:
+                    continue
+                b, j = best
+                club_b = clubs[b][j]
+                move(club_a, a, b)
+                if club_b:
+                    move(club_b, b, a)
+                groups[a][i], groups[b][j] = groups[b][j], groups[a][i]
+                clubs[a][i], clubs[b][j] = clubs[b][j], clubs[a][i]
+                improved = True
+    return sum(n * (n - 1) // 2 for group_counts in counts for n in group_counts.values())
+
+
+def makeGroupSchedule(group: List[T]) -> List[Tuple[T, T]]:
     """Given a group, returns a list of pairs representing the individual matches in the group.
 
     For groups of even-numbered size, uses the 'circle' algorithm, and for groups of odd-numbered size uses the algorithm from https://arxiv.org/abs/1804.04504v1.
     """
-    if len(group) % 2 == 0:
-        return makeGroupCircle(group)
+    return [(group[a], group[b]) for a, b in scheduleTemplate(len(group))]
+
+
+@functools.lru_cache(maxsize=64)
+def scheduleTemplate(group_size: int) -> Tuple[Tuple[int, int], ...]:
+    """Returns the matches of a group of the given size as pairs of indices into the group.
+
+    The templates are cached per size, so scheduling many groups of the same size computes the schedule only once.
+    """
+    group = list(range(group_size))
+    if group_size % 2 == 0:
+        return tuple(makeGroupCircle(group))
+    else:
+        return tuple(makeGroupOdd(group))
+
+
+def iterGroupSchedule(group_size: int) -> Iterator[List[Tuple[int, int]]]:
+    """Yields the rounds of a group of the given size one at a time, as pairs of indices into the group.
+
+    Uses :func:`iterGroupCircle` for groups of even-numbered size and :func:`iterGroupOdd` otherwise.
+    """
+    if group_size % 2 == 0:
+        return iterGroupCircle(group_size)
     else:
-        return makeGroupOdd(group)
+        return iterGroupOdd(group_size)
 
 
 def makeGroupCircle(group: List[T]) -> List[Tuple[T, T]]:
     """Schedules matches in group according to the 'circle' algorithm.
     """
-    if len(group) % 2 == 1:
-        group = [None] + group
-    schedule = []
-    circle = list(group)
-    schedule.extend([(circle[i], circle[len(circle) - i - 1])
-                     for i in range(len(group) // 2)
-                     if circle[i] is not None and circle[len(circle) - i - 1] is not None
-                    ])
-    for k in range(len(group) - 2):
-        tmp = circle[-1]
-        circle[2:] = circle[1:-1]
-        circle[1] = tmp
+    return [(group[a], group[b]) for rnd in iterGroupCircle(len(group)) for a, b in rnd]
+
+
+def iterGroupCircle(group_size: int) -> Iterator[List[Tuple[int, int]]]:
+    """Yields the rounds of :func:`makeGroupCircle` one at a time, as pairs of indices into the group.
+    """
+    circle = list(range(group_size))
+    if group_size % 2 == 1:
+        circle = [None] + circle
+    half = len(circle) // 2
+
+    def pairs():
+        return [(circle[i], circle[-i - 1]) for i in range(half)
+                if circle[i] is not None and circle[-i - 1] is not None]
+
+    yield pairs()
+    for k in range(len(circle) - 2):
+        circle.insert(1, circle.pop())
         if k % 2 == 0:
             circle[0], circle[-1] = circle[-1], circle[0]
-        schedule.extend([(circle[i], circle[len(circle) - i - 1])
-                         for i in range(len(group) // 2)
-                         if circle[i] is not None and circle[len(circle) - i - 1] is not None
-                        ])
+        yield pairs()
         if k % 2 == 0:
             circle[0], circle[-1] = circle[-1], circle[0]
-            
-    return schedule
 
 
 def makeGroupOdd(group):
@@ -141,26 +297,218 @@ def makeGroupOdd(group):
         putToSlot(j, slot, team, flip)
         flip = not flip
     
-    group = [(a, b) for rnd in rounds for a, b in rnd]
-    nums_first = dict()
-    for a, _ in group:
-        if a not in nums_first:
-            nums_first[a] = 0
-        nums_first[a] += 1
-    while True:
-        most = max(nums_first.items(), key=lambda x: x[1])[0]
-        least = min(nums_first.items(), key=lambda x: x[1])[0]
-        if nums_first[most] - nums_first[least] > 1:
-            for i, (a, b) in enumerate(group):
-                if a == most and b == least:
-                    group[i] = (b, a)
-                    nums_first[a] -= 1
-                    nums_first[b] += 1
-                    break
-        else:
+    schedule = [(a, b) for rnd in rounds for a, b in rnd]
+    balanceFirsts(schedule, group)
+    return schedule
+
+
+def iterGroupOdd(group_size: int) -> Iterator[List[Tuple[int, int]]]:
+    """Yields the rounds of a group of odd-numbered size one at a time, as pairs of indices into the group.
+
+    The rounds hold the same pairs as those of :func:`makeGroupOdd`, but who is first may differ:
+    everybody is first in exactly half of their matches.
+    """
+    assert group_size % 2 == 1
+    n = group_size
+    k = n // 2
+    # slots (from 1, 0 meaning a bye) of participants 2i - 1 and 2i in the paper's numbering
+    slots = [i for i in range(1, k + 1) for _ in range(2)]
+    for rnd in range(1, n + 1):
+        if rnd > 1:
+            for i in range(1, k + 1):
+                # the odd one stays in its slot for the first 2i rounds, then moves on
+                if rnd > 2 * i:
+                    slots[2 * i - 2] = (slots[2 * i - 2] + 1) % (k + 1)
+                # the even one moves on up to round 2k + 3 - 2i, then stays
+                if rnd <= 2 * k + 3 - 2 * i:
+                    slots[2 * i - 1] = (slots[2 * i - 1] + 1) % (k + 1)
+        matches = [[] for _ in range(k + 1)]
+        for t, slot in enumerate(slots + [rnd // 2]):
+            matches[slot].append(t)
+        yield [(a, b) if (b - a) % n <= k else (b, a) for a, b in matches[1:]]
+
+
+def balanceFirsts(schedule: List[Tuple[T, T]], group: List[T]) -> None:
+    """Swaps the participants of matches in place so that no participant is the first of a match
+    more than once more often than any other participant.
+    """
+    # ties are broken by the order in which participants are first for the first time
+    order = {p: i for i, p in enumerate(dict.fromkeys([a for a, _ in schedule] + list(group)))}
+    firsts = {p: set() for p in order}
+    for i, (a, _) in enumerate(schedule):
+        firsts[a].add(i)
+    # participants by the number of matches in which they are first
+    buckets = [set() for _ in range(len(schedule) + 1)]
+    for p, matches in firsts.items():
+        buckets[len(matches)].add(p)
+    low = min(len(matches) for matches in firsts.values())
+    high = max(len(matches) for matches in firsts.values())
+
+    def flip(i):
+        a, b = schedule[i]
+        buckets[len(firsts[a])].remove(a)
+        buckets[len(firsts[b])].remove(b)
+        firsts[a].remove(i)
+        firsts[b].add(i)
+        buckets[len(firsts[a])].add(a)
+        buckets[len(firsts[b])].add(b)
+        schedule[i] = (b, a)
+
+    while high - low > 1:
+        most = min(buckets[high], key=order.get)
+        least = min(buckets[low], key=order.get)
+        path = [i for i in sorted(firsts[most]) if schedule[i][1] == least][:1]
+        if not path:
+            path = _findFlipPath(schedule, firsts, most, high - 2)
+        if not path:
             break
-    
-    return group
+        for i in path:
+            flip(i)
+        while not buckets[high]:
+            high -= 1
+        while not buckets[low]:
+            low += 1
+
+
+def _findFlipPath(schedule, firsts, start, max_firsts):
+    """Returns indices of matches forming a chain from ``start`` to a participant who is first at most
+    ``max_firsts`` times, with the first of each match being the second of the previous one, or an empty
+    list if there is no such chain.
+    """
+    # match through which every reached participant was reached
+    reached_by = {start: None}
+    queue = collections.deque([start])
+    while queue:
+        p = queue.popleft()
+        for i in sorted(firsts[p]):
+            q = schedule[i][1]
+            if q in reached_by:
+                continue
+            reached_by[q] = i
+            if len(firsts[q]) <= max_firsts:
+                path = []
+                while reached_by[q] is not None:
+                    path.append(reached_by[q])
+                    q = schedule[reached_by[q]][0]
+                return path
+            queue.append(q)
+    return []
+
+
+def scheduleRings(schedules: List[List[Tuple[T, T]]], num_rings: int, bout_duration: float = 1,
+                  min_rest: float = 0) -> List[List[Tuple[int, int]]]:
+    """Assigns the bouts of several group schedules to rings and time slots, with at least ``min_rest`` between bouts.
+
+    Returns the ring and the slot (both counted from 0) of every bout, in the shape of ``schedules``.
+    """
+    assert num_rings > 0
+    rest_slots = math.ceil(min_rest / bout_duration) if min_rest > 0 else 0
+    pending = [list(range(len(schedule))) for schedule in schedules]
+    assigned = [[None] * len(schedule) for schedule in schedules]
+    # first slot in which a participant (identified together with their group) may fight again
+    ready = dict()
+    last_ring = [None] * len(schedules)
+    remaining = sum(len(schedule) for schedule in schedules)
+    slot = 0
+    while remaining > 0:
+        chosen = []
+        busy = set()
+        for g in sorted(range(len(schedules)), key=lambda g: -len(pending[g])):
+            if len(chosen) == num_rings:
+                break
+            for k, b in enumerate(pending[g]):
+                fighters = [(g, p) for p in schedules[g][b]]
+                if all(f not in busy and ready.get(f, 0) <= slot for f in fighters):
+                    chosen.append((g, b))
+                    busy.update(fighters)
+                    del pending[g][k]
+                    break
+        free_rings = set(range(num_rings))
+        keeping = []
+        for g, b in chosen:
+            if last_ring[g] in free_rings and last_ring[g] not in keeping:
+                keeping.append(last_ring[g])
+            else:
+                keeping.append(None)
+        free_rings.difference_update(keeping)
+        free_rings = sorted(free_rings)
+        for (g, b), ring in zip(chosen, keeping):
+            if ring is None:
+                ring = free_rings.pop(0)
+            assigned[g][b] = (ring, slot)
+            last_ring[g] = ring
+            for p in schedules[g][b]:
+                ready[(g, p)] = slot + 1 + rest_slots
+        remaining -= len(chosen)
+        slot += 1
+    return assigned
+
+
+# values of bracket slots that do not hold a seed
+BYE = -2
+UNDECIDED = -1
+
+
+class Bracket:
+    """A single elimination bracket with a small final, stored in flat arrays.
+
+    Match ``i`` of round ``r`` is ``offset(r) + i`` and its slots hold a seed, :data:`BYE` or :data:`UNDECIDED`.
+    """
+
+    def __init__(self, num_participants: int):
+        assert num_participants > 2
+        self.num_participants = num_participants
+        self.num_rounds = (num_participants - 1).bit_length()
+        self.size = 1 << self.num_rounds
+        self.num_matches = self.size - 1 + self.hasSmallFinal()
+        self.slots = array.array('i', [UNDECIDED]) * (2 * self.num_matches)
+
+        # seed 2 * reversed bits of i meets its counterpart from the end in match i of the first round
+        bits = self.num_rounds - 1
+        reversed_bits = array.array('i', [0]) * (self.size // 2)
+        for i in range(1, self.size // 2):
+            reversed_bits[i] = (reversed_bits[i >> 1] >> 1) | ((i & 1) << (bits - 1))
+        for i in range(self.size // 2):
+            top = 2 * reversed_bits[i]
+            bottom = self.size - 1 - top
+            self.slots[2 * i] = top if top < num_participants else BYE
+            self.slots[2 * i + 1] = bottom if bottom < num_participants else BYE
+
+        for i in range(self.size // 2):
+            top, bottom = self.slots[2 * i], self.slots[2 * i + 1]
+            if top == BYE or bottom == BYE:
+                winner = bottom if top == BYE else top
+                self.slots[2 * (self.offset(1) + i // 2) + i % 2] = winner
+
+    def offset(self, rnd: int) -> int:
+        """Returns the number of the first match of the given round."""
+        return self.size - (self.size >> rnd)
+
+    def numMatches(self, rnd: int) -> int:
+        return self.size >> (rnd + 1)
+
+    def numFighters(self, rnd: int) -> int:
+        """Returns the number of participants the given round is for, e.g. 8 for the quarter-finals."""
+        return self.size >> rnd
+
+    def slot(self, rnd: int, i: int, side: int) -> int:
+        return self.slots[2 * (self.offset(rnd) + i) + side]
+
+    def isBye(self, rnd: int, i: int) -> bool:
+        """Tells whether one of the sides of the match is a bye, so that the match is not fought."""
+        return self.slot(rnd, i, 0) == BYE or self.slot(rnd, i, 1) == BYE
+
+    def hasSmallFinal(self) -> bool:
+        return self.num_rounds >= 2
+
+    def smallFinal(self) -> Optional[int]:
+        """Returns the number of the small final match, fought by the losers of the semi-finals."""
+        return self.size - 1 if self.hasSmallFinal() else None
+
+    def firstRound(self) -> List[Tuple[Optional[int], Optional[int]]]:
+        """Returns the pairs of seeds of the first round, ``None`` standing for a bye."""
+        seeds = [None if seed == BYE else seed for seed in self.slots[:self.size]]
+        return list(zip(seeds[::2], seeds[1::2]))
 
 
 def makeElimination(participants: List[T]) -> List[Tuple[Optional[T], Optional[T]]]:
@@ -169,21 +517,7 @@ def makeElimination(participants: List[T]) -> List[Tuple[Optional[T], Optional[T
     If the number of participants is not a power of 2, the 'extra' participants will be paired with None.
     It is assumed that the participants are already sorted by the desired ranking.
     """
-    n = len(participants)
-    n2log = math.ceil(math.log2(n))
-
-    assert n > 2
-
-    layer = [(0, 1)]
-    for lvl in range(1, n2log):
-        max_n = 2 ** (lvl + 1) - 1
-
-        layer2 = []
-        for a, b in layer:
-            layer2.append((a, max_n - a))
-            layer2.append((max_n - b, b))
-        layer = layer2
-    
-    participants = participants + [None] * (2 ** n2log - n)
-    res = [(participants[a], participants[b]) for a, b in layer]
-    return res, n2log
+    bracket = Bracket(len(participants))
+    res = [(None if a is None else participants[a], None if b is None else participants[b])
+           for a, b in bracket.firstRound()]
+    return res, bracket.num_rounds
@@ -0,0 +1,93 @@
+# coding: utf-8
+from __future__ import unicode_literals
+
+
+class SheetBuffer:
+    """Collects contents of cells of a sheet and writes them in rectangular blocks by :meth:`flush`.
+
+    Cells inside a block that were not written are left empty.
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.cells = dict()
+
+    def setValue(self, col, row, value):
+        self.cells[(col, row)] = _formatNumber(value)
+
+    def setString(self, col, row, text):
+        if text:
+            # the apostrophe makes LibreOffice store the rest as text, even if it looks like a number
+            self.cells[(col, row)] = "'" + text
+        else:
+            self.cells.pop((col, row), None)
+
+    def setFormula(self, col, row, formula):
+        self.cells[(col, row)] = formula
+
+    def get(self, col, row):
+        """Returns the buffered content of the given cell in the notation of ``setFormulaArray``,
+        or ``None`` if nothing was written into it.
+        """
+        return self.cells.get((col, row))
+
+    def flush(self):
+        """Writes all buffered cells into the sheet and empties the buffer.
+
+        Returns the number of blocks that were written.
+        """
+        rows = dict()
+        for (col, row), content in self.cells.items():
+            rows.setdefault(row, dict())[col] = content
+        blocks = 0
+        for top, bottom in _consecutiveRuns(sorted(rows)):
+            left = min(min(rows[row]) for row in range(top, bottom + 1))
+            right = max(max(rows[row]) for row in range(top, bottom + 1))
+            data = tuple(tuple(rows[row].get(col, '') for col in range(left, right + 1))
+                         for row in range(top, bottom + 1))
+            self.sheet.getCellRangeByPosition(left, top, right, bottom).setFormulaArray(data)
+            blocks += 1
+        self.cells.clear()
+        return blocks
+
+
+class DocumentBuffer:
+    """Holds a :class:`SheetBuffer` for every sheet of a document that is written into.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.sheets = dict()
+
+    def __getitem__(self, name):
+        if name not in self.sheets:
+            self.sheets[name] = SheetBuffer(self.doc.Sheets[name])
+        return self.sheets[name]
+
+    def flush(self, name=None):
+        """Flushes the buffer of the sheet with the given name, or of all sheets if no name is given.
+        """
+        if name is not None:
+            if name in self.sheets:
+                self.sheets.pop(name).flush()
+            return
+        for sheet_buffer in self.sheets.values():
+            sheet_buffer.flush()
+        self.sheets.clear()
+
+
+def _formatNumber(value):
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _consecutiveRuns(numbers):
+    runs = []
+    for n in numbers:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return runs
@@ -7,4 +7,5 @@ FINAL_RANKING = 'Final ranking'
 GROUP_LIST = 'Group list'
 GROUPS_RESULTS = 'Groups - results'
 ELIMINATION = 'Elimination'
-LIST_OF_FIGHTS = 'List of fights'
\ No newline at end of file
+LIST_OF_FIGHTS = 'List of fights'
+DIAGNOSTICS = 'Diagnostics'
\ No newline at end of file
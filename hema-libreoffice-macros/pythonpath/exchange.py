@@ -0,0 +1,138 @@
+# coding: utf-8
+
+import csv
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# columns of the participant list, with the names they may have in an imported file (compared
+# case-insensitively, without spaces and punctuation)
+PARTICIPANT_COLUMNS = (
+    ('name', ('name', 'fencer', 'participant', 'fighter')),
+    ('club', ('club', 'school', 'team')),
+    ('rating', ('rating', 'rank', 'ratingrank', 'seed')),
+    ('present', ('present', 'checkedin', 'attending')),
+)
+# values of the present column that mean yes, the rest means no
+_PRESENT = {'y', 'yes', '1', 'true', 'x'}
+
+# a row of the participant list: name, club, rating (number or text) and 'y' or 'n'
+ParticipantRow = Tuple[str, str, Any, str]
+
+
+def _key(name: str) -> str:
+    return re.sub(r'[\W_]+', '', str(name)).casefold()
+
+
+def _column(name: str) -> Optional[str]:
+    key = _key(name)
+    for column, aliases in PARTICIPANT_COLUMNS:
+        if key in aliases:
+            return column
+    return None
+
+
+def _rating(value: Any) -> Any:
+    if isinstance(value, bool):
+        return ''
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = (value or '').strip()
+    try:
+        return float(value.replace(',', '.'))
+    except ValueError:
+        return value
+
+
+def _present(value: Any) -> str:
+    if value is None:
+        return 'y'
+    if isinstance(value, bool):
+        return 'y' if value else 'n'
+    return 'y' if str(value).strip().casefold() in _PRESENT else 'n'
+
+
+def _acceptedNames() -> str:
+    return ', '.join(alias for _, aliases in PARTICIPANT_COLUMNS for alias in aliases)
+
+
+def _participant(record: Dict[str, Any]) -> ParticipantRow:
+    return (str(record.get('name') or '').strip(), str(record.get('club') or '').strip(),
+            _rating(record.get('rating')), _present(record.get('present')))
+
+
+def readParticipants(path: str) -> List[ParticipantRow]:
+    """Reads participants from a registration file in CSV (with a header row) or JSON (a list of objects).
+
+    Columns are recognized by the names in :data:`PARTICIPANT_COLUMNS`; without a present column, everybody
+    is present. Raises ``ValueError`` if the file cannot be understood.
+    """
+    if os.path.splitext(path)[1].lower() == '.json':
+        records = _readJsonRecords(path)
+    else:
+        records = _readCsvRecords(path)
+    return [participant for participant in map(_participant, records) if participant[0]]
+
+
+def _readJsonRecords(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8-sig') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('participants')
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise ValueError('{}: expected a list of participants'.format(path))
+    records = []
+    for item in data:
+        record = dict()
+        for name, value in item.items():
+            column = _column(name)
+            if column is not None:
+                record[column] = value
+        records.append(record)
+    if records and not any('name' in record for record in records):
+        raise ValueError('{}: the participants have no name; the recognized keys are {}'.format(path, _acceptedNames()))
+    return records
+
+
+def _readCsvRecords(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        text = f.read()
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    rows = [row for row in csv.reader(text.splitlines(), dialect) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [_column(cell) for cell in rows[0]]
+    if 'name' not in header:
+        raise ValueError('{}: the first row has to name the columns, including the name; the recognized names are {}'.format(
+            path, _acceptedNames()))
+    return [{column: cell for column, cell in zip(header, row) if column is not None} for row in rows[1:]]
+
+
+def cellValue(value: Any) -> Any:
+    """Converts a value from ``getDataArray`` for export: whole numbers become ints, empty cells ``None``."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == '':
+        return None
+    return value
+
+
+def writeTable(path: str, header: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+    """Writes a table read from a sheet into a CSV or JSON file (told apart by the extension).
+
+    In JSON, every row becomes an object keyed by the header.
+    """
+    rows = [[cellValue(value) for value in row] for row in rows]
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([dict(zip(header, row)) for row in rows], f, ensure_ascii=False, indent=1)
+            f.write('\n')
+        return
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(['' if value is None else value for value in row] for row in rows)
@@ -1,17 +1,67 @@
 # coding: utf-8
 from __future__ import unicode_literals
-from typing_extensions import final
 
 import uno
 import sys
 import re
+import time
+import functools
 from collections import namedtuple
+from contextlib import contextmanager
 
 import algorithms
+import buffers
 import constants
+import exchange
+import profiling
+import ranking
+import references
+import results
 
 
 Participant = namedtuple('Participant', ['row', 'name', 'club', 'rating'])
+Settings = namedtuple('Settings', ['max_group_size', 'groups_per_row', 'to_elimination', 'rating_is_rank', 'min_group_size',
+                                   'rings', 'bout_duration', 'min_rest'])
+Snapshot = namedtuple('Snapshot', ['participants', 'settings'])
+
+
+class FightLedger:
+    """Collects the rows of the list of fights in memory and writes them in one block by :meth:`flush`."""
+
+    def __init__(self, sheet):
+        self.buffer = buffers.SheetBuffer(sheet)
+        self.next_row = 1
+        self.has_rings = False
+        self.buffer.setString(0, 0, 'Phase')
+        self.buffer.setString(1, 0, 'Fighter 1')
+        self.buffer.setString(2, 0, 'Fighter 2')
+        self.buffer.setString(3, 0, 'Fighter 1 score')
+        self.buffer.setString(4, 0, 'Fighter 2 score')
+        self.buffer.setString(5, 0, 'Result')
+
+    def add(self, phase, fighter1, fighter2, score1_ref, score2_ref, ring=None, slot=None):
+        """Adds a fight given by formulas of the names and sheet-qualified references to the scores.
+
+        The ring and the time slot (both counted from 0) are listed if given.
+        """
+        row = self.next_row
+        if ring is not None:
+            self.has_rings = True
+            self.buffer.setValue(6, row, ring + 1)
+            self.buffer.setValue(7, row, slot + 1)
+        self.buffer.setString(0, row, phase)
+        self.buffer.setFormula(1, row, fighter1)
+        self.buffer.setFormula(2, row, fighter2)
+        self.buffer.setFormula(3, row, '=IF(ISBLANK({0}); ""; {0})'.format(score1_ref))
+        self.buffer.setFormula(4, row, '=IF(ISBLANK({0}); ""; {0})'.format(score2_ref))
+        self.buffer.setFormula(5, row, '=IF({} < {}; "LOSS"; "WIN")'.format(score1_ref, score2_ref))
+        self.next_row += 1
+
+    def flush(self):
+        if self.has_rings:
+            self.buffer.setString(6, 0, 'Ring')
+            self.buffer.setString(7, 0, 'Slot')
+        self.buffer.flush()
 
 
 def _printDir(x, grep='.*'):
@@ -30,22 +80,124 @@ def _printDir(x, grep='.*'):
 
 
 def loadParticipants(doc):
-    plist = doc.Sheets[constants.PARTICIPANT_LIST]
+    return loadSnapshot(doc).participants
+
+
+def loadSnapshot(doc):
+    """Reads the participant list and the settings, each with a single bulk read.
+
+    The returned snapshot is meant to be shared by everything a macro does, so that the sheets
+    are not read again.
+    """
+    plist = _readUsedArea(doc.Sheets[constants.PARTICIPANT_LIST], 4)
     participants = []
-    i = 0
-    while True:
-        row = i + 1
-        name = plist.getCellByPosition(0, row).getString()
-        club = plist.getCellByPosition(1, row).getString()
-        rating = plist.getCellByPosition(2, row).getValue()
-        present = plist.getCellByPosition(3, row).getString()
-        
-        if present == 'y':
-            participants.append(Participant(row, name, club, rating))
+    for row in range(1, len(plist) + 1):
+        name, club, rating, present = plist[row] if row < len(plist) else ('', '', '', '')
+        name = _cellString(name)
+        if _cellString(present) == 'y':
+            participants.append(Participant(row, name, _cellString(club), _cellValue(rating)))
         if not name:
-                break
-        i += 1
-    return participants
+            break
+
+    settings = _readUsedArea(doc.Sheets[constants.SETTINGS], 2)
+    def setting(row):
+        return _cellValue(settings[row][1]) if row < len(settings) else 0.0
+    return Snapshot(participants, Settings(
+        max_group_size=int(setting(0)),
+        groups_per_row=int(setting(1)),
+        to_elimination=setting(2),
+        rating_is_rank=setting(3) == 1,
+        min_group_size=int(setting(4)),
+        rings=int(setting(5)),
+        bout_duration=setting(6),
+        min_rest=setting(7),
+    ))
+
+
+def _readUsedArea(sheet, num_cols):
+    cursor = sheet.createCursor()
+    cursor.gotoEndOfUsedArea(False)
+    end_row = cursor.RangeAddress.EndRow
+    return sheet.getCellRangeByPosition(0, 0, num_cols - 1, end_row).getDataArray()
+
+
+def importParticipants(doc, path):
+    """Replaces the participants in the participant list by the ones in a CSV or JSON file, in one range write.
+
+    Returns the number of imported participants. Raises ``ValueError`` if the file cannot be understood.
+    """
+    participants = exchange.readParticipants(path)
+    sheet = doc.Sheets[constants.PARTICIPANT_LIST]
+    cursor = sheet.createCursor()
+    cursor.gotoEndOfUsedArea(False)
+    num_rows = max(len(participants), cursor.RangeAddress.EndRow)
+    if num_rows == 0:
+        return 0
+    block = [tuple(_cellContent(value) for value in participant) for participant in participants]
+    block.extend(('', '', '', '') for _ in range(num_rows - len(participants)))
+    with profiling.phase('participant list'):
+        sheet.getCellRangeByPosition(0, 1, 3, num_rows).setFormulaArray(tuple(block))
+    return len(participants)
+
+
+def exportResults(doc, stem, extension):
+    """Writes the list of fights and the final ranking into ``stem`` files with the extension ``'.csv'`` or ``'.json'``.
+
+    Returns the paths of the written files.
+    """
+    paths = []
+    for name in (constants.LIST_OF_FIGHTS, constants.FINAL_RANKING):
+        if name not in doc.Sheets:
+            continue
+        with profiling.phase('read ' + name.lower()):
+            table = _readTable(doc.Sheets[name])
+        if not table:
+            continue
+        path = '{} - {}{}'.format(stem, name, extension)
+        exchange.writeTable(path, [_cellString(value) for value in table[0]], table[1:])
+        paths.append(path)
+    return paths
+
+
+def _readTable(sheet):
+    """Reads the used area of a sheet at once, without the empty rows at its end."""
+    cursor = sheet.createCursor()
+    cursor.gotoEndOfUsedArea(False)
+    address = cursor.RangeAddress
+    rows = list(sheet.getCellRangeByPosition(0, 0, address.EndColumn, address.EndRow).getDataArray())
+    while rows and all(value == '' for value in rows[-1]):
+        rows.pop()
+    return rows
+
+
+def _cellString(value):
+    """Converts a value from ``getDataArray`` into what ``getString`` would return."""
+    if isinstance(value, float):
+        return buffers._formatNumber(value)
+    return value
+
+
+def _cellValue(value):
+    """Converts a value from ``getDataArray`` into what ``getValue`` would return."""
+    if isinstance(value, float):
+        return value
+    return 0.0
+
+
+def _cellContent(value):
+    """Converts a value from ``getDataArray`` into the notation of ``setFormulaArray``."""
+    if isinstance(value, float):
+        return buffers._formatNumber(value)
+    if value:
+        return "'" + value
+    return value
+
+
+def _eliminationSize(settings, num_participants):
+    cut_n = settings.to_elimination
+    if cut_n <= 1:
+        cut_n = cut_n * num_participants
+    return round(cut_n)
 
 
 def addSheet(doc, name, position=None):
@@ -61,7 +213,253 @@ def addSheet(doc, name, position=None):
     return sheet
 
 
-def createGroups(doc, participants):
+@contextmanager
+def bulkUpdate(doc, name):
+    """Suspends repainting and automatic recalculation of the document while the block runs, and logs its duration.
+
+    Yields the document to work on, a call-counting stand-in if profiling is enabled (see :mod:`profiling`).
+    """
+    start = time.perf_counter()
+    profile = profiling.start(doc, name)
+    try:
+        doc.lockControllers()
+        try:
+            doc.addActionLock()
+            try:
+                autocalc = doc.isAutomaticCalculationEnabled()
+                doc.enableAutomaticCalculation(False)
+                try:
+                    yield doc if profile is None else profile.doc
+                finally:
+                    doc.enableAutomaticCalculation(autocalc)
+                    with profiling.phase('recalculation'):
+                        doc.calculateAll()
+            finally:
+                doc.removeActionLock()
+        finally:
+            doc.unlockControllers()
+    finally:
+        if profile is not None:
+            profiling.finish(doc, profile)
+        profiling.logDuration(name, time.perf_counter() - start)
+
+
+def createTournament(doc):
+    """Removes everything but the participant list and the settings, and generates all sheets of the tournament.
+
+    Returns ``False`` if there are no present participants.
+    """
+    for s in list(doc.Sheets):
+        if s.getName() not in [constants.PARTICIPANT_LIST, constants.SETTINGS]:
+            doc.Sheets.removeByName(s.getName())
+
+    snapshot = loadSnapshot(doc)
+    if not snapshot.participants:
+        return False
+    with profiling.phase('final ranking'):
+        createFinalRanking(doc, snapshot)
+    
+    # create list of fights sheet
+    list_of_fights = _recreateSheet(doc, constants.LIST_OF_FIGHTS, 3)
+    ledger = FightLedger(list_of_fights)
+
+    createGroups(doc, snapshot, ledger)
+    createElimination(doc, snapshot, ledger)
+    with profiling.phase('list of fights'):
+        ledger.flush()
+    return True
+
+
+def updateTournament(doc):
+    """Brings the groups of an already generated tournament in line with the present participants.
+
+    Participants who are no longer present leave their groups. Late arrivals join the smallest group,
+    then the one with the fewest clubmates, then the weakest one by average seed, so only the sheets of
+    these groups are generated again. Scores of bouts between participants who stay in such a group are
+    kept. The group list, results, final ranking, list of fights and elimination are rewritten in bulk.
+
+    Returns ``False`` and changes nothing if there are no groups yet, or if a group would end up with
+    fewer than two or more than the maximum number of participants.
+    """
+    snapshot = loadSnapshot(doc)
+    old_groups = _readGroups(doc)
+    if not old_groups:
+        return False
+
+    present = {p.row: p for p in snapshot.participants}
+    groups = [[present[row] for row in rows if row in present] for rows in old_groups]
+    changed = {i for i, group in enumerate(groups) if len(group) != len(old_groups[i])}
+    placed = {row for rows in old_groups for row in rows}
+    ordered = sorted(snapshot.participants, key=_ratingKey(snapshot.settings))
+    seed = {p.row: i for i, p in enumerate(ordered)}
+    def weakness(group):
+        return sum(seed[q.row] for q in group) / len(group) if group else len(ordered)
+    for p in ordered:
+        if p.row not in placed:
+            # the smallest group, with the fewest clubmates, and the weakest one if there are more; as the
+            # strongest arrive first, they join the weakest groups, like the snake does
+            i = min(range(len(groups)), key=lambda i: (len(groups[i]), sum(_clubKey(q) == _clubKey(p) for q in groups[i] if _clubKey(q)),
+                                                       -weakness(groups[i])))
+            groups[i].append(p)
+            changed.add(i)
+    if any(len(group) < 2 or len(group) > snapshot.settings.max_group_size for group in groups):
+        return False
+    if not changed:
+        return True
+
+    scores = dict()
+    with profiling.phase('read scores'):
+        for i in changed:
+            scores.update(_readGroupScores(doc.Sheets['Group {}'.format(i + 1)], len(old_groups[i])))
+
+    with profiling.phase('final ranking'):
+        createFinalRanking(doc, snapshot)
+    ledger = FightLedger(_recreateSheet(doc, constants.LIST_OF_FIGHTS, 3))
+    with profiling.phase('group sheets'):
+        writeGroups(doc, snapshot, ledger, groups, changed, scores)
+    createElimination(doc, snapshot, ledger)
+    with profiling.phase('list of fights'):
+        ledger.flush()
+    return True
+
+
+def createFinalRanking(doc, snapshot):
+    final_ranking = buffers.SheetBuffer(_recreateSheet(doc, constants.FINAL_RANKING, 2))
+    final_ranking.setString(0, 0, 'Final rank')
+    final_ranking.setString(1, 0, 'Name')
+    final_ranking.setString(2, 0, 'Club')
+    final_ranking.setString(3, 0, 'Elim. round')
+    final_ranking.setString(4, 0, 'Quali')
+    for i, _ in enumerate(snapshot.participants):
+        final_ranking.setValue(0, i + 1, i + 1)
+    final_ranking.flush()
+
+
+def _recreateSheet(doc, name, position):
+    """Adds an empty sheet with the given name, replacing (and taking the position of) an existing one."""
+    if name in doc.Sheets:
+        position = doc.Sheets.getElementNames().index(name)
+        doc.Sheets.removeByName(name)
+    return addSheet(doc, name, position)
+
+
+def _readGroups(doc):
+    """Returns the participant list rows of the members of every existing group, in the group order."""
+    groups = []
+    while 'Group {}'.format(len(groups) + 1) in doc.Sheets:
+        sheet = doc.Sheets['Group {}'.format(len(groups) + 1)]
+        cursor = sheet.createCursor()
+        cursor.gotoEndOfUsedArea(False)
+        top = _GROUP_TABLE[1] + 1
+        names = sheet.getCellRangeByPosition(1, top, 1, max(top, cursor.RangeAddress.EndRow)).getFormulaArray()
+        rows = []
+        for (formula,) in names:
+            participant_row = _participantRow(formula)
+            if participant_row is None:
+                break
+            rows.append(participant_row)
+        groups.append(rows)
+    return groups
+
+
+def _readGroupScores(sheet, group_size):
+    """Returns the scores entered in the schedule of a group sheet, keyed by both orders of the participant list rows."""
+    bouts = _groupBouts(group_size)
+    if not bouts:
+        return dict()
+    left, top = _groupSchedule(group_size)
+    bottom = max(row for _, _, _, row in bouts) + 1
+    rng = sheet.getCellRangeByPosition(left, top, left + 3 * _SCHEDULE_COLUMNS - 1, bottom)
+    formulas = rng.getFormulaArray()
+    values = rng.getDataArray()
+    scores = dict()
+    for _, _, col, row in bouts:
+        col, row = col - left, row - top
+        a = _participantRow(formulas[row][col + 1])
+        b = _participantRow(formulas[row + 1][col + 1])
+        score_a, score_b = values[row][col + 2], values[row + 1][col + 2]
+        if a is None or b is None or not isinstance(score_a, float) or not isinstance(score_b, float):
+            continue
+        scores[(a, b)] = (score_a, score_b)
+        scores[(b, a)] = (score_b, score_a)
+    return scores
+
+
+def _readScoreMatrix(sheet, group_size):
+    """Returns the scores entered in the schedule of a group sheet as a matrix for :func:`results.groupResults`.
+
+    The whole schedule is read at once, without relying on the formulas of the scoring table.
+    """
+    matrix = [[None] * group_size for _ in range(group_size)]
+    bouts = _groupBouts(group_size)
+    if not bouts:
+        return matrix
+    left, top = _groupSchedule(group_size)
+    bottom = max(row for _, _, _, row in bouts) + 1
+    values = sheet.getCellRangeByPosition(left, top, left + 3 * _SCHEDULE_COLUMNS - 1, bottom).getDataArray()
+    for a, b, col, row in bouts:
+        col, row = col - left, row - top
+        score_a, score_b = values[row][col + 2], values[row + 1][col + 2]
+        matrix[a][b] = score_a if isinstance(score_a, float) else None
+        matrix[b][a] = score_b if isinstance(score_b, float) else None
+    return matrix
+
+
+def _participantRow(formula):
+    """Returns the participant list row referenced by a formula written by :func:`_getParticipantReference`."""
+    match = _PARTICIPANT_REFERENCE.match(formula)
+    if match is None:
+        return None
+    return int(match.group(1)) - 1
+
+
+_PARTICIPANT_REFERENCE = re.compile(r"^=\$'{}'\.\$?A\$?(\d+)$".format(re.escape(constants.PARTICIPANT_LIST)))
+
+
+def createGroups(doc, snapshot, ledger):
+    with profiling.phase('styles'):
+        _makeGroupStyles(doc)
+
+    participants = snapshot.participants
+    with profiling.phase('group assignment'):
+        if snapshot.settings.min_group_size > 0:
+            group_sizes = algorithms.solveGroupSizes(len(participants), snapshot.settings.min_group_size, snapshot.settings.max_group_size)
+        else:
+            group_sizes = algorithms.findGroupSizes(len(participants), snapshot.settings.max_group_size)
+        groups = algorithms.assignGroups(group_sizes, sorted(participants, key=_ratingKey(snapshot.settings)), club=_clubKey)
+    with profiling.phase('group sheets'):
+        writeGroups(doc, snapshot, ledger, groups)
+
+
+def showGroupSizes(doc, snapshot, count=5):
+    """Lists the best ways to split the present participants into groups next to the settings.
+
+    Groups are between the minimum (3 if not set) and the maximum group size, see
+    :func:`algorithms.groupSizeAlternatives`.
+    """
+    settings = snapshot.settings
+    alternatives = algorithms.groupSizeAlternatives(len(snapshot.participants), settings.min_group_size or 3,
+                                                    settings.max_group_size, count)
+    rows = [("'Group sizes", "'Groups", "'Matches")]
+    for sizes in alternatives:
+        rows.append(("'" + _describeGroupSizes(sizes), str(len(sizes)), str(algorithms.countMatches(sizes))))
+    # clear alternatives shown before
+    rows += [('', '', '')] * (count + 1 - len(rows))
+    sheet = doc.Sheets[constants.SETTINGS]
+    sheet.getCellRangeByPosition(3, 0, 5, count).setFormulaArray(tuple(rows))
+    for col in range(3, 6):
+        sheet.Columns[col].OptimalWidth = True
+
+
+def _describeGroupSizes(sizes):
+    """Returns e.g. '3 × 5 + 2 × 4' for groups of sizes [5, 5, 5, 4, 4]."""
+    counts = dict()
+    for size in sizes:
+        counts[size] = counts.get(size, 0) + 1
+    return ' + '.join('{} × {}'.format(n, size) for size, n in sorted(counts.items(), reverse=True))
+
+
+def _makeGroupStyles(doc):
     ## prepare cell styles
     thin_border = _makeBorderLine2(0, 35 // 2)
     medium_border = _makeBorderLine2(0, 35)
@@ -72,6 +470,36 @@ def createGroups(doc, participants):
         ParaBottomMargin=150,
         ParaRightMargin=150,
     ), 'Default')
+    # borders of the two rows of a bout in the schedule, for the number, name and score column
+    _makeCellStyle(doc, 'scoring_schedule_number_top', dict(
+        TopBorder2=thick_border,
+        BottomBorder2=thin_border,
+        LeftBorder2=thick_border,
+        RightBorder2=thin_border
+    ), 'scoring_table_default')
+    _makeCellStyle(doc, 'scoring_schedule_name_top', dict(
+        TopBorder2=thick_border,
+        BottomBorder2=thin_border
+    ), 'scoring_table_default')
+    _makeCellStyle(doc, 'scoring_schedule_score_top', dict(
+        TopBorder2=thick_border,
+        BottomBorder2=thin_border,
+        LeftBorder2=thin_border,
+        RightBorder2=thick_border
+    ), 'scoring_table_default')
+    _makeCellStyle(doc, 'scoring_schedule_number_bottom', dict(
+        BottomBorder2=thick_border,
+        LeftBorder2=thick_border,
+        RightBorder2=thin_border
+    ), 'scoring_table_default')
+    _makeCellStyle(doc, 'scoring_schedule_name_bottom', dict(
+        BottomBorder2=thick_border
+    ), 'scoring_table_default')
+    _makeCellStyle(doc, 'scoring_schedule_score_bottom', dict(
+        BottomBorder2=thick_border,
+        LeftBorder2=thin_border,
+        RightBorder2=thick_border
+    ), 'scoring_table_default')
     _makeCellStyle(doc, 'scoring_table_number', dict(
         VertJustify=2,
         HoriJustify=2,
@@ -119,44 +547,50 @@ def createGroups(doc, participants):
         IsCellBackgroundTransparent=False,
         CellBackColor=0x00CCCCCC,
     ), 'Default')
-    
-    
-    max_group_size = int(doc.Sheets[constants.SETTINGS].getCellByPosition(1, 0).getValue())
-    groups_per_row = int(doc.Sheets[constants.SETTINGS].getCellByPosition(1, 1).getValue())
-    cut_n = doc.Sheets[constants.SETTINGS].getCellByPosition(1, 2).getValue()
-    if cut_n <= 1:
-        cut_n = cut_n * len(participants)
-    cut_n = round(cut_n)
-    rating_is_rank = doc.Sheets[constants.SETTINGS].getCellByPosition(1, 3).getValue() == 1
-    if rating_is_rank:
-        sort_key = lambda x: x.rating
-    else:
-        sort_key = lambda x: -x.rating
-    
-    group_sizes = algorithms.findGroupSizes(len(participants), max_group_size)
-    groups = algorithms.assignGroups(group_sizes, sorted(participants, key=sort_key))
+
+
+def writeGroups(doc, snapshot, ledger, groups, rebuild=None, scores=None):
+    """Writes the given groups into the group list, results, final ranking and list of fights.
+
+    Only the sheets of the groups in ``rebuild`` (all by default) are generated anew, with the ``scores``
+    returned by :func:`_readGroupScores`.
+    """
+    thick_border = _makeBorderLine2(0, 2 * 35)
+    medium_border = _makeBorderLine2(0, 35)
+    participants = snapshot.participants
+    groups_per_row = snapshot.settings.groups_per_row
+    cut_n = _eliminationSize(snapshot.settings, len(participants))
+    group_sizes = [len(group) for group in groups]
     max_group_size = max(group_sizes)
+    if rebuild is None:
+        rebuild = range(len(groups))
+    if scores is None:
+        scores = dict()
     
-    group_list_sheet = addSheet(doc, constants.GROUP_LIST, 2)
+    buffer = buffers.DocumentBuffer(doc)
+
+    group_list_sheet = _recreateSheet(doc, constants.GROUP_LIST, 2)
+    group_list = buffer[constants.GROUP_LIST]
     
-    group_results_sheet = addSheet(doc, constants.GROUPS_RESULTS, 3)
-    group_results_sheet.getCellByPosition(0, 0).setString('Rank')
-    group_results_sheet.getCellByPosition(1, 0).setString('Name')
-    group_results_sheet.getCellByPosition(2, 0).setString('Club')
-    group_results_sheet.getCellByPosition(3, 0).setString('V/M (↓)')
-    group_results_sheet.getCellByPosition(4, 0).setString('D-R (↓)')
-    group_results_sheet.getCellByPosition(5, 0).setString('D (↓)')
-    group_results_sheet.getCellByPosition(6, 0).setString('R (↑)')
-    group_results_sheet.getCellByPosition(7, 0).setString('RND')
+    group_results_sheet = _recreateSheet(doc, constants.GROUPS_RESULTS, 3)
+    group_results = buffer[constants.GROUPS_RESULTS]
+    group_results.setString(0, 0, 'Rank')
+    group_results.setString(1, 0, 'Name')
+    group_results.setString(2, 0, 'Club')
+    group_results.setString(3, 0, 'V/M (↓)')
+    group_results.setString(4, 0, 'D-R (↓)')
+    group_results.setString(5, 0, 'D (↓)')
+    group_results.setString(6, 0, 'R (↑)')
+    group_results.setString(7, 0, 'RND')
     group_results_sheet.getCellRangeByPosition(0, 0, 7, 0).HoriJustify = 3
     group_results_sheet.getCellByPosition(1, 0).HoriJustify = 0
 
-    final_ranking_sheet = doc.Sheets[constants.FINAL_RANKING]
-    list_of_fights = doc.Sheets[constants.LIST_OF_FIGHTS]
+    final_ranking = buffer[constants.FINAL_RANKING]
 
     for i, group in enumerate(groups):
-        schedule = algorithms.makeGroupSchedule(list(range(len(group))))
         group_name = 'Group {}'.format(i + 1)
+        if i in rebuild:
+            _writeGroupSheet(doc, buffer, group_name, 3 + i, group, scores)
 
         # write group into summary of all groups
         group_row = (i // groups_per_row) * (1 + max_group_size)
@@ -164,150 +598,47 @@ def createGroups(doc, participants):
         header_range = group_list_sheet.getCellRangeByPosition(group_col, group_row, group_col + 1, group_row)
         header_range.merge(True)
         header_range.TopBorder2 = header_range.RightBorder2 = header_range.BottomBorder2 = header_range.LeftBorder2 = medium_border
-        group_list_sheet.getCellByPosition(group_col, group_row).setString(group_name)
-        
-        # create sheet for the group
-        grp_sheet = addSheet(doc, group_name, 3 + i)
-        grp_sheet.getCellRangeByPosition(0, 0, 1000, 1000).CellStyle = 'scoring_table_default'
-        # sheet header
-        grp_sheet.getCellByPosition(0, 0).setString(group_name)
-        grp_sheet.getCellRangeByPosition(0, 0, len(group) + 5, 4).merge(True)
-        grp_sheet.getCellByPosition(0, 0).CellStyle = 'scoring_sheet_header'
-        
-        # top-left coords for the two parts of the sheet
-        schedule_coords = (len(group) + 7, 0) #(0, 1)
-        table_coords = (0, 5) #(3 * (len(group) // 2) + 1, 1)
-        
-        # table header
-        grp_sheet.getCellByPosition(*_add(table_coords, 1, 0)).setString('Name')
-        grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 0, 0)).setString('V/M')
-        grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 1, 0)).setString('D')
-        grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 2, 0)).setString('R')
-        grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 3, 0)).setString('Signature')
-        # inner cells style
-        grp_sheet.getCellRangeByPosition(*_add(table_coords, 0, 0), *_add(table_coords, 0, 1 + len(group) - 1)).CellStyle = 'scoring_table_number'
-        grp_sheet.getCellRangeByPosition(*_add(table_coords, 1, 0), *_add(table_coords, 1, 1 + len(group) - 1)).CellStyle = 'scoring_table_name'
-        grp_sheet.getCellRangeByPosition(*_add(table_coords, 2, 0), *_add(table_coords, 2 + len(group) - 1 + 4, 1 + len(group) - 1)).CellStyle = 'scoring_table_inner'
+        group_list.setString(group_col, group_row, group_name)
+        # borders of the group in summary group list
+        num_cells = group_list_sheet.getCellRangeByPosition(group_col, group_row + 1, group_col, group_row + len(group))
+        name_cells = group_list_sheet.getCellRangeByPosition(group_col + 1, group_row + 1, group_col + 1, group_row + len(group))
+        num_cells.LeftBorder2 = medium_border
+        name_cells.RightBorder2 = medium_border
+        group_list_sheet.getCellRangeByPosition(group_col, group_row + len(group), group_col + 1, group_row + len(group)).BottomBorder2 = medium_border
+
+        # group results refer to the scoring table of the group sheet
+        formulas = references.groupFormulas(len(group), _GROUP_TABLE, _groupBouts(len(group)))
+        group_prefix = '=' + references.sheetPrefix(group_name)
+        first_row = sum(group_sizes[:i]) + 1
         for j, p in enumerate(group):
             # write into summary group list
-            num_cell = group_list_sheet.getCellByPosition(group_col, group_row + 1 + j)
-            num_cell.setValue(j + 1)
-            num_cell.LeftBorder2 = medium_border
-            name_cell = group_list_sheet.getCellByPosition(group_col + 1, group_row + 1 + j)
-            participant_ref = _getParticipantReference(p)
-            club_ref = _getParticipantClubReference(p)
-            name_cell.setFormula('={}'.format(participant_ref))
-            name_cell.RightBorder2 = medium_border
-            
-            # write into scoring table
-            # number column
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + j, 0)).setValue(j + 1)
-            # number row
-            grp_sheet.getCellByPosition(*_add(table_coords, 0, 1 + j)).setValue(j + 1)
-            # name
-            grp_sheet.getCellByPosition(*_add(table_coords, 1, 1 + j)).setFormula('={}'.format(participant_ref))
-            # victories / matches
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 0, 1 + j)).setFormula('=({1}) / {0}'.format(len(group) - 1, '+'.join(['IF({} > {}; 1; 0)'.format(_c2s(*_add(table_coords, 2 + k, 1 + j)), _c2s(*_add(table_coords, 2 + j, 1 + k))) for k in range(len(group)) if k != j])))
-            # dealt
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 1, 1 + j)).setFormula('={0}'.format('+'.join([_c2s(*_add(table_coords, 2 + k, 1 + j)) for k in range(len(group)) if k != j])))
-            # received
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + len(group) + 2, 1 + j)).setFormula('={0}'.format('+'.join([_c2s(*_add(table_coords, 2 + j, 1 + k)) for k in range(len(group)) if k != j])))
-            # self-match cell style
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + j, 1 + j)).CellStyle = 'scoring_table_inner_self'
+            group_list.setValue(group_col, group_row + 1 + j, j + 1)
+            participant_ref = '=' + _getParticipantReference(p)
+            group_list.setFormula(group_col + 1, group_row + 1 + j, participant_ref)
 
             # write into results table
-            res_row = sum(group_sizes[:i]) + j + 1
-            group_results_sheet.getCellByPosition(0, res_row).setValue(res_row)
-            group_results_sheet.getCellByPosition(1, res_row).setFormula("={}".format(participant_ref))
-            group_results_sheet.getCellByPosition(2, res_row).setFormula("={}".format(club_ref))
-            group_results_sheet.getCellByPosition(3, res_row).setFormula("=$'{}'.{}".format(group_name, _c2s(*_add(table_coords, 2 + len(group) + 0, 1 + j))))
-            group_results_sheet.getCellByPosition(4, res_row).setFormula('={} - {}'.format(_c2s(5, res_row), _c2s(6, res_row)))
-            group_results_sheet.getCellByPosition(5, res_row).setFormula("=$'{}'.{}".format(group_name, _c2s(*_add(table_coords, 2 + len(group) + 1, 1 + j))))
-            group_results_sheet.getCellByPosition(6, res_row).setFormula("=$'{}'.{}".format(group_name, _c2s(*_add(table_coords, 2 + len(group) + 2, 1 + j))))
+            res_row = first_row + j
+            ratio_cell, dealt_cell, received_cell = formulas.results[j]
+            group_results.setValue(0, res_row, res_row)
+            group_results.setFormula(1, res_row, participant_ref)
+            group_results.setFormula(2, res_row, '=' + _getParticipantClubReference(p))
+            group_results.setFormula(3, res_row, group_prefix + ratio_cell)
+            group_results.setFormula(4, res_row, '=' + _c2s(5, res_row) + ' - ' + _c2s(6, res_row))
+            group_results.setFormula(5, res_row, group_prefix + dealt_cell)
+            group_results.setFormula(6, res_row, group_prefix + received_cell)
             if res_row > cut_n:
                 rng = group_results_sheet.getCellRangeByPosition(0, res_row, 7, res_row)
                 rng.CellStyle = 'group_results_eliminated'
                 if res_row == cut_n + 1:
                     rng.TopBorder2 = thick_border
-                final_ranking_sheet.getCellByPosition(1, res_row).setFormula("=$'{}'.{}".format(constants.GROUPS_RESULTS, _c2s(1, res_row)))
-                final_ranking_sheet.getCellByPosition(2, res_row).setFormula("=$'{}'.{}".format(constants.GROUPS_RESULTS, _c2s(2, res_row)))
-                final_ranking_sheet.getCellByPosition(4, res_row).setValue(res_row)
-            
-            # when we are done
-            if j == len(group) - 1:
-                # close off bottom border in summary group list
-                num_cell.BottomBorder2 = name_cell.BottomBorder2 = medium_border
-                
-                # set column widths in scoring table
-                for k in range(len(group) + 6):
-                    grp_sheet.Columns[_add(table_coords, k, 0)[0]].OptimalWidth = True
-                grp_sheet.Columns[_add(table_coords, len(group) + 6, 0)[0]].Width = 100_0
-        
-        # finalize styling
-        tb = uno.createUnoStruct('com.sun.star.table.TableBorder2')
-        tb.TopLine = thick_border
-        tb.IsTopLineValid = True
-        tb.LeftLine = thick_border
-        tb.IsLeftLineValid = True
-        tb.BottomLine = thick_border
-        tb.IsBottomLineValid = True
-        tb.RightLine = thick_border
-        tb.IsRightLineValid = True
-        grp_sheet.getCellRangeByPosition(*_add(table_coords, 2, 1), *_add(table_coords, 2 + len(group) - 1, 1 + len(group) - 1)).TableBorder2 = tb
-    
-        schedule_cols = 2
-        for j, (a, b) in enumerate(schedule):
-            row = 2 * (j // schedule_cols)
-            col = 3 * (j % schedule_cols)
-            # first participant header
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row)).setValue(a + 1)
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 1, row)).setFormula('={}'.format(_getParticipantReference(group[a])))
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row)).TopBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row)).BottomBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row)).LeftBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row)).RightBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 1, row)).TopBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 1, row)).BottomBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row)).TopBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row)).BottomBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row)).LeftBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row)).RightBorder2 = thick_border
-            # second participant header
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row + 1)).setValue(b + 1)
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 1, row + 1)).setFormula('={}'.format(_getParticipantReference(group[b])))
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row + 1)).BottomBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row + 1)).LeftBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col, row + 1)).RightBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 1, row + 1)).BottomBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row + 1)).BottomBorder2 = thick_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row + 1)).LeftBorder2 = thin_border
-            grp_sheet.getCellByPosition(*_add(schedule_coords, col + 2, row + 1)).RightBorder2 = thick_border
-            # first participant binding
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + b, 1 + a)).setFormula('=IF(ISBLANK({0}); ""; {0})'.format(_c2s(*_add(schedule_coords, col + 2, row))))
-            # second participant binding
-            grp_sheet.getCellByPosition(*_add(table_coords, 2 + a, 1 + b)).setFormula('=IF(ISBLANK({0}); ""; {0})'.format(_c2s(*_add(schedule_coords, col + 2, row + 1))))
-
-            # write into list of fights
-            k = 1
-            while True:
-                if list_of_fights.getCellByPosition(0, k).getString() == '':
-                    break
-                k += 1
-            list_of_fights.getCellByPosition(0, k).setString(group_name)
-            list_of_fights.getCellByPosition(1, k).setFormula('={}'.format(_getParticipantReference(group[a])))
-            list_of_fights.getCellByPosition(2, k).setFormula('={}'.format(_getParticipantReference(group[b])))
-            list_of_fights.getCellByPosition(3, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(group_name, _c2s(*_add(schedule_coords, col + 2, row))))
-            list_of_fights.getCellByPosition(4, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(group_name, _c2s(*_add(schedule_coords, col + 2, row + 1))))
-            list_of_fights.getCellByPosition(5, k).setFormula("=IF($'{0}'.{1} < $'{0}'.{2}; \"LOSS\"; \"WIN\")".format(group_name, _c2s(*_add(schedule_coords, col + 2, row)), _c2s(*_add(schedule_coords, col + 2, row + 1))))
-    
-        for j in range(schedule_cols):
-            grp_sheet.Columns[_add(schedule_coords, 3 * j + 0, 0)[0]].OptimalWidth = True
-            grp_sheet.Columns[_add(schedule_coords, 3 * j + 1, 0)[0]].OptimalWidth = True
-            grp_sheet.Columns[_add(schedule_coords, 3 * j + 2, 0)[0]].Width = 200_0
-        grp_sheet.Columns[table_coords[0] + 2 + len(group)].IsVisible = False
-        grp_sheet.Columns[table_coords[0] + 2 + len(group) + 1].IsVisible = False
-        grp_sheet.Columns[table_coords[0] + 2 + len(group) + 2].IsVisible = False
+                final_ranking.setFormula(1, res_row, '=' + references.qualified(constants.GROUPS_RESULTS, 1, res_row))
+                final_ranking.setFormula(2, res_row, '=' + references.qualified(constants.GROUPS_RESULTS, 2, res_row))
+                final_ranking.setValue(4, res_row, res_row)
+
+    _addGroupFights(ledger, groups, snapshot.settings)
     
+    buffer.flush()
+
     for i in range(len(groups)):
         group_col = (i % groups_per_row) * 2
         group_list_sheet.Columns[group_col].OptimalWidth = True
@@ -318,7 +649,161 @@ def createGroups(doc, participants):
     group_results_sheet.Columns[2].OptimalWidth = True
 
 
-def createElimination(doc, participants):
+def _writeGroupSheet(doc, buffer, group_name, position, group, scores):
+    thick_border = _makeBorderLine2(0, 2 * 35)
+
+    # create sheet for the group
+    grp_sheet = _recreateSheet(doc, group_name, position)
+    grp = buffer[group_name]
+    grp_sheet.getCellRangeByPosition(0, 0, 1000, 1000).CellStyle = 'scoring_table_default'
+    # sheet header
+    grp.setString(0, 0, group_name)
+    grp_sheet.getCellRangeByPosition(0, 0, len(group) + 5, 4).merge(True)
+    grp_sheet.getCellByPosition(0, 0).CellStyle = 'scoring_sheet_header'
+    
+    # top-left coords for the two parts of the sheet
+    schedule_coords = _groupSchedule(len(group))
+    table_coords = _GROUP_TABLE
+    bouts = _groupBouts(len(group))
+    formulas = references.groupFormulas(len(group), table_coords, bouts)
+    names = ['=' + _getParticipantReference(p) for p in group]
+    
+    # table header
+    grp.setString(*_add(table_coords, 1, 0), 'Name')
+    grp.setString(*_add(table_coords, 2 + len(group) + 0, 0), 'V/M')
+    grp.setString(*_add(table_coords, 2 + len(group) + 1, 0), 'D')
+    grp.setString(*_add(table_coords, 2 + len(group) + 2, 0), 'R')
+    grp.setString(*_add(table_coords, 2 + len(group) + 3, 0), 'Signature')
+    # inner cells style
+    grp_sheet.getCellRangeByPosition(*_add(table_coords, 0, 0), *_add(table_coords, 0, 1 + len(group) - 1)).CellStyle = 'scoring_table_number'
+    grp_sheet.getCellRangeByPosition(*_add(table_coords, 1, 0), *_add(table_coords, 1, 1 + len(group) - 1)).CellStyle = 'scoring_table_name'
+    grp_sheet.getCellRangeByPosition(*_add(table_coords, 2, 0), *_add(table_coords, 2 + len(group) - 1 + 4, 1 + len(group) - 1)).CellStyle = 'scoring_table_inner'
+    for j in range(len(group)):
+        # write into scoring table
+        # number column
+        grp.setValue(*_add(table_coords, 2 + j, 0), j + 1)
+        # number row
+        grp.setValue(*_add(table_coords, 0, 1 + j), j + 1)
+        # name
+        grp.setFormula(*_add(table_coords, 1, 1 + j), names[j])
+        # victories / matches, dealt and received
+        grp.setFormula(*_add(table_coords, 2 + len(group) + 0, 1 + j), formulas.ratio[j])
+        grp.setFormula(*_add(table_coords, 2 + len(group) + 1, 1 + j), formulas.dealt[j])
+        grp.setFormula(*_add(table_coords, 2 + len(group) + 2, 1 + j), formulas.received[j])
+
+    # self-match cells style
+    _setCellStyle(doc, grp_sheet, 'scoring_table_inner_self', [_add(table_coords, 2 + j, 1 + j) for j in range(len(group))])
+    
+    # finalize styling
+    tb = uno.createUnoStruct('com.sun.star.table.TableBorder2')
+    tb.TopLine = thick_border
+    tb.IsTopLineValid = True
+    tb.LeftLine = thick_border
+    tb.IsLeftLineValid = True
+    tb.BottomLine = thick_border
+    tb.IsBottomLineValid = True
+    tb.RightLine = thick_border
+    tb.IsRightLineValid = True
+    grp_sheet.getCellRangeByPosition(*_add(table_coords, 2, 1), *_add(table_coords, 2 + len(group) - 1, 1 + len(group) - 1)).TableBorder2 = tb
+
+    for k, part in enumerate(['number', 'name', 'score']):
+        _setCellStyle(doc, grp_sheet, 'scoring_schedule_{}_top'.format(part), [(col + k, row) for _, _, col, row in bouts])
+        _setCellStyle(doc, grp_sheet, 'scoring_schedule_{}_bottom'.format(part), [(col + k, row + 1) for _, _, col, row in bouts])
+    for (a, b, col, row), (top_binding, bottom_binding) in zip(bouts, formulas.bindings):
+        # first participant header
+        grp.setValue(col, row, a + 1)
+        grp.setFormula(col + 1, row, names[a])
+        # second participant header
+        grp.setValue(col, row + 1, b + 1)
+        grp.setFormula(col + 1, row + 1, names[b])
+        # first participant binding
+        grp.setFormula(*_add(table_coords, 2 + b, 1 + a), top_binding)
+        # second participant binding
+        grp.setFormula(*_add(table_coords, 2 + a, 1 + b), bottom_binding)
+        # scores kept from before the group was rebuilt
+        if (group[a].row, group[b].row) in scores:
+            score_a, score_b = scores[(group[a].row, group[b].row)]
+            grp.setValue(col + 2, row, score_a)
+            grp.setValue(col + 2, row + 1, score_b)
+
+    # the contents have to be in the sheet before the optimal column widths are computed
+    buffer.flush(group_name)
+    # set column widths in scoring table
+    for k in range(len(group) + 6):
+        grp_sheet.Columns[_add(table_coords, k, 0)[0]].OptimalWidth = True
+    grp_sheet.Columns[_add(table_coords, len(group) + 6, 0)[0]].Width = 100_0
+    for j in range(_SCHEDULE_COLUMNS):
+        grp_sheet.Columns[_add(schedule_coords, 3 * j + 0, 0)[0]].OptimalWidth = True
+        grp_sheet.Columns[_add(schedule_coords, 3 * j + 1, 0)[0]].OptimalWidth = True
+        grp_sheet.Columns[_add(schedule_coords, 3 * j + 2, 0)[0]].Width = 200_0
+    grp_sheet.Columns[table_coords[0] + 2 + len(group)].IsVisible = False
+    grp_sheet.Columns[table_coords[0] + 2 + len(group) + 1].IsVisible = False
+    grp_sheet.Columns[table_coords[0] + 2 + len(group) + 2].IsVisible = False
+
+
+def _addGroupFights(ledger, groups, settings):
+    """Adds the bouts of all groups into the list of fights, ordered by time slot if there are rings."""
+    fights = []
+    for i, group in enumerate(groups):
+        group_name = 'Group {}'.format(i + 1)
+        prefix = references.sheetPrefix(group_name)
+        bouts = _groupBouts(len(group))
+        names = ['=' + _getParticipantReference(p) for p in group]
+        for (a, b, _, _), (top_score, bottom_score) in zip(bouts, references.groupFormulas(len(group), _GROUP_TABLE, bouts).scores):
+            fights.append([group_name, names[a], names[b], prefix + top_score, prefix + bottom_score])
+    if settings.rings > 0:
+        schedules = [[(a, b) for a, b, _, _ in _groupBouts(len(group))] for group in groups]
+        assigned = algorithms.scheduleRings(schedules, settings.rings, settings.bout_duration or 1, settings.min_rest)
+        for fight, (ring, slot) in zip(fights, [pos for group_positions in assigned for pos in group_positions]):
+            fight += [ring, slot]
+        fights.sort(key=lambda fight: (fight[-1], fight[-2]))
+    for fight in fights:
+        ledger.add(*fight)
+
+
+# top-left corner of the scoring table in a group sheet
+_GROUP_TABLE = (0, 5)
+# number of bouts next to each other in the schedule of a group sheet
+_SCHEDULE_COLUMNS = 2
+
+
+def _groupSchedule(group_size):
+    """Returns the top-left corner of the schedule in the sheet of a group of the given size."""
+    return (group_size + 7, 0)
+
+
+@functools.lru_cache(maxsize=64)
+def _groupBouts(group_size):
+    """Returns the bouts of a group as a tuple of (first, second, column, row) tuples.
+
+    ``first`` and ``second`` are indices into the group, the column and row are the position of the
+    number of the first participant in the schedule of the group sheet.
+    """
+    schedule_coords = _groupSchedule(group_size)
+    bouts = []
+    for j, (a, b) in enumerate(algorithms.scheduleTemplate(group_size)):
+        col, row = _add(schedule_coords, 3 * (j % _SCHEDULE_COLUMNS), 2 * (j // _SCHEDULE_COLUMNS))
+        bouts.append((a, b, col, row))
+    return tuple(bouts)
+
+
+def _clubKey(participant):
+    return participant.club.strip().casefold()
+
+
+def _ratingKey(settings):
+    if settings.rating_is_rank:
+        return lambda x: x.rating
+    return lambda x: -x.rating
+
+def createElimination(doc, snapshot, ledger):
+    with profiling.phase('styles'):
+        _makeEliminationStyles(doc)
+    with profiling.phase('bracket'):
+        _writeElimination(doc, snapshot, ledger)
+
+
+def _makeEliminationStyles(doc):
     border = _makeBorderLine2(LineStyle=0, LineWidth=35)
     _makeCellStyle(doc, 'elimination_bracket_line', dict(
         LeftBorder2=border
@@ -337,308 +822,34 @@ def createElimination(doc, participants):
         HoriJustify=1
     ), 'elimination_cell')
 
+
+def _writeElimination(doc, snapshot, ledger):
     if constants.ELIMINATION in doc.Sheets:
         doc.Sheets.removeByName(constants.ELIMINATION)
     el = addSheet(doc, constants.ELIMINATION, len(doc.Sheets) - 2)
 
-    final_ranking_sheet = doc.Sheets[constants.FINAL_RANKING]
-    list_of_fights = doc.Sheets[constants.LIST_OF_FIGHTS]
+    cut_n = _eliminationSize(snapshot.settings, len(snapshot.participants))
+    bracket = algorithms.Bracket(cut_n)
+    layout = _layoutElimination(bracket)
 
-    cut_n = doc.Sheets[constants.SETTINGS].getCellByPosition(1, 2).getValue()
-    if cut_n <= 1:
-        cut_n = cut_n * len(participants)
-    cut_n = round(cut_n)
-    
-    el_participants = list(range(cut_n))
+    # one block per round column and one property set per style, however big the bracket is
+    for col, top, block in layout.rounds:
+        el.getCellRangeByPosition(col, top, col + 3, top + len(block) - 1).setFormulaArray(block)
+    for style, ranges in layout.styles.items():
+        _setRangesProperty(doc, el, 'CellStyle', style, ranges)
+    for fight in layout.fights:
+        ledger.add(*fight)
+    final_ranking = buffers.SheetBuffer(doc.Sheets[constants.FINAL_RANKING])
+    for row, contents in layout.ranking.items():
+        for col, content in enumerate(contents, 1):
+            final_ranking.setFormula(col, row, content)
+    final_ranking.flush()
 
-    layer, num_layers = algorithms.makeElimination(el_participants)
-    ln = 0
     number_width = None
     name_width = None
-    small_final = None
-    processed_fights = 0
-    while ln < num_layers:
-        next_layer = []
+    club_width = None
+    for ln in range(bracket.num_rounds):
         col = 4 * ln
-        finish = False
-        if small_final is not None:
-            finish = True
-        for i in range(len(layer)):
-            row = (4 * 2**ln) * i
-
-            if ln > 0:
-                row += sum([2**k for k in range(1, ln + 1)])
-
-            winner = '=IF({0} > {1}; {2}; IF({0} < {1}; {3}; ""))'
-            loser = '=IF({0} < {1}; {2}; IF({0} > {1}; {3}; ""))'
-            
-            top_number_cell = el.getCellByPosition(col, row)
-            top_name_cell = el.getCellByPosition(col + 1, row)
-            top_club_cell = el.getCellByPosition(col + 2, row)
-            top_score_cell = el.getCellByPosition(col + 3, row)
-            bottom_number_cell = el.getCellByPosition(col, row + 1)
-            bottom_name_cell = el.getCellByPosition(col + 1, row + 1)
-            bottom_club_cell = el.getCellByPosition(col + 2, row + 1)
-            bottom_score_cell = el.getCellByPosition(col + 3, row + 1)
-
-            top_number_cell_addr = _c2s(top_number_cell.getCellAddress().Column, top_number_cell.getCellAddress().Row)
-            top_name_cell_addr = _c2s(top_name_cell.getCellAddress().Column, top_name_cell.getCellAddress().Row)
-            top_club_cell_addr = _c2s(top_club_cell.getCellAddress().Column, top_club_cell.getCellAddress().Row)
-            top_score_cell_addr = _c2s(top_score_cell.getCellAddress().Column, top_score_cell.getCellAddress().Row)
-            bottom_number_cell_addr = _c2s(bottom_number_cell.getCellAddress().Column, bottom_number_cell.getCellAddress().Row)
-            bottom_name_cell_addr = _c2s(bottom_name_cell.getCellAddress().Column, bottom_name_cell.getCellAddress().Row)
-            bottom_club_cell_addr = _c2s(bottom_club_cell.getCellAddress().Column, bottom_club_cell.getCellAddress().Row)
-            bottom_score_cell_addr = _c2s(bottom_score_cell.getCellAddress().Column, bottom_score_cell.getCellAddress().Row)
-
-            el.getCellRangeByPosition(col, row, col, row + 1).CellStyle = 'elimination_number'
-            el.getCellRangeByPosition(col + 1, row, col + 1, row + 1).CellStyle = 'elimination_name'
-            el.getCellRangeByPosition(col + 2, row, col + 2, row + 1).CellStyle = 'elimination_name'
-            el.getCellRangeByPosition(col + 3, row, col + 3, row + 1).CellStyle = 'elimination_number'
-
-            if ln == 0:
-                if layer[i][0] is None:
-                    top_score_cell.setValue(0)
-                else:
-                    top_number_cell.setFormula("=$'{}'.A{}".format(constants.GROUPS_RESULTS, layer[i][0] + 2))
-                    top_name_cell.setFormula("=$'{}'.B{}".format(constants.GROUPS_RESULTS, layer[i][0] + 2))
-                    top_club_cell.setFormula("=$'{}'.C{}".format(constants.GROUPS_RESULTS, layer[i][0] + 2))
-                    if layer[i][1] is None:
-                        top_score_cell.setValue(1)
-                if layer[i][1] is None:
-                    bottom_score_cell.setValue(0)
-                else:
-                    bottom_number_cell.setFormula("=$'{}'.A{}".format(constants.GROUPS_RESULTS, layer[i][1] + 2))
-                    bottom_name_cell.setFormula("=$'{}'.B{}".format(constants.GROUPS_RESULTS, layer[i][1] + 2))
-                    bottom_club_cell.setFormula("=$'{}'.C{}".format(constants.GROUPS_RESULTS, layer[i][1] + 2))
-                    if layer[i][0] is None:
-                        bottom_score_cell.setValue(1)
-            else:
-                vert_bracket_len = 2 * (2**(ln - 1) - 1)
-                if vert_bracket_len > 0:
-                    c = top_number_cell.getCellAddress().Column
-                    r = top_number_cell.getCellAddress().Row
-                    el.getCellRangeByPosition(c, r - vert_bracket_len, c, r - 1).CellStyle = 'elimination_bracket_line'
-                    c = bottom_number_cell.getCellAddress().Column
-                    r = bottom_number_cell.getCellAddress().Row
-                    el.getCellRangeByPosition(c, r + 1, c, r + vert_bracket_len).CellStyle = 'elimination_bracket_line'
-                
-                top_number = layer[i][0][0]
-                top_name = layer[i][0][1]
-                top_club = layer[i][0][2]
-                bottom_number = layer[i][1][0]
-                bottom_name = layer[i][1][1]
-                bottom_club = layer[i][1][2]
-                top_number_cell.setFormula(top_number)
-                top_name_cell.setFormula(top_name)
-                top_club_cell.setFormula(top_club)
-                bottom_number_cell.setFormula(bottom_number)
-                bottom_name_cell.setFormula(bottom_name)
-                bottom_club_cell.setFormula(bottom_club)
-            
-            if layer[i][0] is not None and layer[i][1] is not None and not finish:
-                # write into list of fights
-                k = 1
-                while True:
-                    if list_of_fights.getCellByPosition(0, k).getString() == '':
-                        break
-                    k += 1
-                phase_n = 2**(num_layers - ln)
-                phase_name = 'Elimination {}'.format(phase_n)
-                if phase_n == 4:
-                    phase_name = 'Semi-finals'
-                elif phase_n == 8:
-                    phase_name = 'Quarter-finals'
-                else:
-                    phase_name = 'Elimination 1/{}'.format(phase_n // 2)
-                list_of_fights.getCellByPosition(0, k).setString(phase_name)
-                list_of_fights.getCellByPosition(1, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_name_cell_addr))
-                list_of_fights.getCellByPosition(2, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_name_cell_addr))
-                list_of_fights.getCellByPosition(3, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_score_cell_addr))
-                list_of_fights.getCellByPosition(4, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_score_cell_addr))
-                list_of_fights.getCellByPosition(5, k).setFormula("=IF($'{0}'.{1} < $'{0}'.{2}; \"LOSS\"; \"WIN\")".format(constants.ELIMINATION, top_score_cell_addr, bottom_score_cell_addr))
-            
-            refs = (winner.format(top_score_cell_addr, bottom_score_cell_addr, top_number_cell_addr, bottom_number_cell_addr),
-                    winner.format(top_score_cell_addr, bottom_score_cell_addr, top_name_cell_addr, bottom_name_cell_addr),
-                    winner.format(top_score_cell_addr, bottom_score_cell_addr, top_club_cell_addr, bottom_club_cell_addr))
-            if layer[i][0] is not None and layer[i][1] is not None and len(layer) > 2:
-                final_ranking_sheet.getCellByPosition(1, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_name_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_name_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(2, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_club_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_club_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(3, cut_n - processed_fights).setValue(2**(num_layers - ln))
-                final_ranking_sheet.getCellByPosition(4, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_number_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_number_cell_addr),
-                ))
-                processed_fights += 1
-            elif finish:
-                final_ranking_sheet.getCellByPosition(1, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_name_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_name_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(2, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_club_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_club_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(3, cut_n - processed_fights).setValue(2.2)
-                final_ranking_sheet.getCellByPosition(4, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_number_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_number_cell_addr),
-                ))
-                processed_fights += 1
-                final_ranking_sheet.getCellByPosition(1, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_name_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_name_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(2, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_club_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_club_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(3, cut_n - processed_fights).setValue(2.1)
-                final_ranking_sheet.getCellByPosition(4, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_number_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_number_cell_addr),
-                ))
-                processed_fights += 1
-
-                # write into list of fights
-                k = 1
-                while True:
-                    if list_of_fights.getCellByPosition(0, k).getString() == '':
-                        break
-                    k += 1
-                list_of_fights.getCellByPosition(0, k).setString('Final')
-                list_of_fights.getCellByPosition(1, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_name_cell_addr))
-                list_of_fights.getCellByPosition(2, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_name_cell_addr))
-                list_of_fights.getCellByPosition(3, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_score_cell_addr))
-                list_of_fights.getCellByPosition(4, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_score_cell_addr))
-                list_of_fights.getCellByPosition(5, k).setFormula("=IF($'{0}'.{1} < $'{0}'.{2}; \"LOSS\"; \"WIN\")".format(constants.ELIMINATION, top_score_cell_addr, bottom_score_cell_addr))
-            
-            if finish:
-                row += 2 + vert_bracket_len + 2 + 2
-                top_number_cell = el.getCellByPosition(col, row)
-                top_name_cell = el.getCellByPosition(col + 1, row)
-                top_club_cell = el.getCellByPosition(col + 2, row)
-                top_score_cell = el.getCellByPosition(col + 3, row)
-                bottom_number_cell = el.getCellByPosition(col, row + 1)
-                bottom_name_cell = el.getCellByPosition(col + 1, row + 1)
-                bottom_club_cell = el.getCellByPosition(col + 2, row + 1)
-                bottom_score_cell = el.getCellByPosition(col + 3, row + 1)
-                top_number_cell_addr = _c2s(top_number_cell.getCellAddress().Column, top_number_cell.getCellAddress().Row)
-                top_name_cell_addr = _c2s(top_name_cell.getCellAddress().Column, top_name_cell.getCellAddress().Row)
-                top_club_cell_addr = _c2s(top_club_cell.getCellAddress().Column, top_club_cell.getCellAddress().Row)
-                top_score_cell_addr = _c2s(top_score_cell.getCellAddress().Column, top_score_cell.getCellAddress().Row)
-                bottom_number_cell_addr = _c2s(bottom_number_cell.getCellAddress().Column, bottom_number_cell.getCellAddress().Row)
-                bottom_name_cell_addr = _c2s(bottom_name_cell.getCellAddress().Column, bottom_name_cell.getCellAddress().Row)
-                bottom_club_cell_addr = _c2s(bottom_club_cell.getCellAddress().Column, bottom_club_cell.getCellAddress().Row)
-                bottom_score_cell_addr = _c2s(bottom_score_cell.getCellAddress().Column, bottom_score_cell.getCellAddress().Row)
-                el.getCellRangeByPosition(col, row, col, row + 1).CellStyle = 'elimination_number'
-                el.getCellRangeByPosition(col + 1, row, col + 1, row + 1).CellStyle = 'elimination_name'
-                el.getCellRangeByPosition(col + 2, row, col + 2, row + 1).CellStyle = 'elimination_name'
-                el.getCellRangeByPosition(col + 3, row, col + 3, row + 1).CellStyle = 'elimination_number'
-                top_number = small_final[0][0]
-                top_name = small_final[0][1]
-                top_club = small_final[0][2]
-                bottom_number = small_final[1][0]
-                bottom_name = small_final[1][1]
-                bottom_club = small_final[1][2]
-                top_number_cell.setFormula(top_number)
-                top_name_cell.setFormula(top_name)
-                top_club_cell.setFormula(top_club)
-                bottom_number_cell.setFormula(bottom_number)
-                bottom_name_cell.setFormula(bottom_name)
-                bottom_club_cell.setFormula(bottom_club)
-
-                final_ranking_sheet.getCellByPosition(1, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_name_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_name_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(2, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_club_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_club_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(3, cut_n - processed_fights).setValue(2.4)
-                final_ranking_sheet.getCellByPosition(4, cut_n - processed_fights).setFormula(loser.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_number_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_number_cell_addr),
-                ))
-                processed_fights += 1
-
-                final_ranking_sheet.getCellByPosition(1, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_name_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_name_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(2, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_club_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_club_cell_addr),
-                ))
-                final_ranking_sheet.getCellByPosition(3, cut_n - processed_fights).setValue(2.3)
-                final_ranking_sheet.getCellByPosition(4, cut_n - processed_fights).setFormula(winner.format(
-                    "$'{}'.{}".format(constants.ELIMINATION, top_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_score_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, top_number_cell_addr),
-                    "$'{}'.{}".format(constants.ELIMINATION, bottom_number_cell_addr),
-                ))
-                processed_fights += 1
-
-                # write into list of fights
-                k = 1
-                while True:
-                    if list_of_fights.getCellByPosition(0, k).getString() == '':
-                        break
-                    k += 1
-                list_of_fights.getCellByPosition(0, k).setString('Small final')
-                list_of_fights.getCellByPosition(1, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_name_cell_addr))
-                list_of_fights.getCellByPosition(2, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_name_cell_addr))
-                list_of_fights.getCellByPosition(3, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, top_score_cell_addr))
-                list_of_fights.getCellByPosition(4, k).setFormula("=IF(ISBLANK($'{0}'.{1}); \"\"; $'{0}'.{1})".format(constants.ELIMINATION, bottom_score_cell_addr))
-                list_of_fights.getCellByPosition(5, k).setFormula("=IF($'{0}'.{1} < $'{0}'.{2}; \"LOSS\"; \"WIN\")".format(constants.ELIMINATION, top_score_cell_addr, bottom_score_cell_addr))
-            
-            if i % 2 == 0:
-                next_layer.append((refs, None))
-            else:
-                next_layer[-1] = (next_layer[-1][0], refs)
-            if len(layer) == 2:
-                refs = (loser.format(top_score_cell_addr, bottom_score_cell_addr, top_number_cell_addr, bottom_number_cell_addr),
-                        loser.format(top_score_cell_addr, bottom_score_cell_addr, top_name_cell_addr, bottom_name_cell_addr),
-                        loser.format(top_score_cell_addr, bottom_score_cell_addr, top_club_cell_addr, bottom_club_cell_addr))
-                if i % 2 == 0:
-                    small_final = (refs, None)
-                else:
-                    small_final = (small_final[0], refs)
-
         if ln == 0:
             el.Columns[col].OptimalWidth = True
             el.Columns[col + 1].OptimalWidth = True
@@ -652,18 +863,148 @@ def createElimination(doc, participants):
             el.Columns[col + 2].Width = club_width
         el.Columns[col + 2].IsVisible = False
         el.Columns[col + 3].Width = 100_0
-        if finish:
-            break
+
+
+# the elimination sheet: (column, top row, setFormulaArray block) of every round, the ranges of every cell
+# style, the arguments of FightLedger.add for every fought match, the final ranking rows, an EliminationMatch
+# for every match (the small final last), and the (match index, winner, round) deciding every final ranking row
+EliminationLayout = namedtuple('EliminationLayout', ['rounds', 'styles', 'fights', 'ranking', 'matches', 'places'])
+# a match of the elimination sheet; ``sources`` are the (match index, winner) pairs the top and bottom
+# participant come from, ``None`` in the first round
+EliminationMatch = namedtuple('EliminationMatch', ['round', 'col', 'row', 'sources'])
+
+_WINNER = '=IF({0} > {1}; {2}; IF({0} < {1}; {3}; ""))'
+_LOSER = '=IF({0} < {1}; {2}; IF({0} > {1}; {3}; ""))'
+
+
+def _layoutElimination(bracket):
+    """Lays out the whole elimination sheet in memory, without touching the document, as an :class:`EliminationLayout`."""
+    styles = dict(elimination_number=[], elimination_name=[], elimination_bracket_line=[])
+    rounds = []
+    fights = []
+    ranking = dict()
+    matches = []
+    places = dict()
+    # the final ranking is filled from the bottom, by the participants out first
+    rank_row = bracket.num_participants
+
+    def place(cells, ln, col, row, entrants, sources=None):
+        """Writes the match with the given (number, name, club) entrants and returns the addresses of its cells."""
+        for k, entrant in enumerate(entrants):
+            for j, content in enumerate(entrant):
+                cells[(j, row + k)] = content
+        styles['elimination_number'] += [(col, row, col, row + 1), (col + 3, row, col + 3, row + 1)]
+        styles['elimination_name'].append((col + 1, row, col + 2, row + 1))
+        matches.append(EliminationMatch(ln, col, row, sources))
+        return [_c2s(col + j, row) for j in range(4)], [_c2s(col + j, row + 1) for j in range(4)]
+
+    def rank(winner, top, bottom, elimination_round):
+        nonlocal rank_row
+        number, name, club = _matchResult(_WINNER if winner else _LOSER, top, bottom, constants.ELIMINATION)
+        ranking[rank_row] = (name, club, buffers._formatNumber(elimination_round), number)
+        places[rank_row] = (len(matches) - 1, winner, elimination_round)
+        rank_row -= 1
+
+    def addFight(phase, top, bottom):
+        prefix = references.sheetPrefix(constants.ELIMINATION)
+        fights.append((phase,
+                       '=IF(ISBLANK({0}); ""; {0})'.format(prefix + top[1]),
+                       '=IF(ISBLANK({0}); ""; {0})'.format(prefix + bottom[1]),
+                       prefix + top[3],
+                       prefix + bottom[3]))
+
+    # (number, name, club) formulas and sources of the participants in the matches of the current round,
+    # from the second round on
+    layer = None
+    small_final = None
+    for ln in range(bracket.num_rounds):
+        col = 4 * ln
+        cells = dict()
+        next_layer = []
+        finish = ln == bracket.num_rounds - 1
+        # length of the bracket lines leading into the matches
+        vert_bracket_len = 2 * (2**(ln - 1) - 1) if ln > 0 else 0
+        for i in range(bracket.numMatches(ln)):
+            row = (4 * 2**ln) * i + 2**(ln + 1) - 2
+            if ln == 0:
+                entrants = []
+                for side in (0, 1):
+                    seed = bracket.slot(ln, i, side)
+                    if seed == algorithms.BYE:
+                        entrants.append(('', '', ''))
+                    else:
+                        entrants.append(tuple('=' + references.qualified(constants.GROUPS_RESULTS, column, seed + 1) for column in range(3)))
+                top, bottom = place(cells, ln, col, row, entrants)
+                for side, other in [(0, 1), (1, 0)]:
+                    if bracket.slot(ln, i, side) == algorithms.BYE:
+                        cells[(3, row + side)] = '0'
+                    elif bracket.slot(ln, i, other) == algorithms.BYE:
+                        cells[(3, row + side)] = '1'
+            else:
+                if vert_bracket_len > 0:
+                    styles['elimination_bracket_line'] += [(col, row - vert_bracket_len, col, row - 1),
+                                                           (col, row + 2, col, row + 1 + vert_bracket_len)]
+                top, bottom = place(cells, ln, col, row, [entrant for entrant, _ in layer[i]],
+                                    tuple(source for _, source in layer[i]))
+
+            if finish:
+                rank(False, top, bottom, 2.2)
+                rank(True, top, bottom, 2.1)
+                addFight('Final', top, bottom)
+
+                row += 2 + vert_bracket_len + 2 + 2
+                top, bottom = place(cells, ln, col, row, [entrant for entrant, _ in small_final],
+                                    tuple(source for _, source in small_final))
+                rank(False, top, bottom, 2.4)
+                rank(True, top, bottom, 2.3)
+                addFight('Small final', top, bottom)
+                break
+
+            if not bracket.isBye(ln, i):
+                phase_n = bracket.numFighters(ln)
+                if phase_n == 4:
+                    phase_name = 'Semi-finals'
+                elif phase_n == 8:
+                    phase_name = 'Quarter-finals'
+                else:
+                    phase_name = 'Elimination 1/{}'.format(phase_n // 2)
+                addFight(phase_name, top, bottom)
+                if bracket.numMatches(ln) > 2:
+                    rank(False, top, bottom, phase_n)
+
+            if i % 2 == 0:
+                next_layer.append([])
+            next_layer[-1].append((_matchResult(_WINNER, top, bottom), (len(matches) - 1, True)))
+            if bracket.numMatches(ln) == 2:
+                if small_final is None:
+                    small_final = []
+                small_final.append((_matchResult(_LOSER, top, bottom), (len(matches) - 1, False)))
+
+        first = min(row for _, row in cells)
+        last = max(row for _, row in cells)
+        rounds.append((col, first, tuple(tuple(cells.get((j, row), '') for j in range(4)) for row in range(first, last + 1))))
         layer = next_layer
-        ln += 1
+    return EliminationLayout(rounds, styles, fights, ranking, matches, places)
+
+
+def _matchResult(template, top, bottom, sheet=None):
+    """Returns the (number, name, club) formulas of the winner or the loser of a match, depending on the template.
+
+    ``top`` and ``bottom`` are the addresses of the number, name, club and score cells of the two participants.
+    """
+    if sheet is not None:
+        prefix = references.sheetPrefix(sheet)
+        top = [prefix + address for address in top]
+        bottom = [prefix + address for address in bottom]
+    return tuple(template.format(top[3], bottom[3], top[k], bottom[k]) for k in range(3))
 
 
 def _getParticipantReference(participant):
-    return "$'{}'.{}".format(constants.PARTICIPANT_LIST, _c2s(0, participant.row))
+    return references.participantName(participant.row)
 
 
 def _getParticipantClubReference(participant):
-    return "$'{}'.{}".format(constants.PARTICIPANT_LIST, _c2s(1, participant.row))
+    return references.participantClub(participant.row)
 
 
 def _makeCellStyle(doc, name, props, parent=None):
@@ -677,6 +1018,32 @@ def _makeCellStyle(doc, name, props, parent=None):
         new_style.setParentStyle(parent)
 
 
+def _setCellStyle(doc, sheet, style, cells):
+    """Sets the cell style of all cells at the given (col, row) positions with a single property set.
+    """
+    _setRangesProperty(doc, sheet, 'CellStyle', style, [(col, row, col, row) for col, row in cells])
+
+
+def _setRangesProperty(doc, sheet, name, value, ranges):
+    """Sets a property of all the given (start col, start row, end col, end row) ranges with a single property set.
+    """
+    if not ranges:
+        return
+    sheet_index = sheet.RangeAddress.Sheet
+    addresses = []
+    for start_col, start_row, end_col, end_row in ranges:
+        address = uno.createUnoStruct('com.sun.star.table.CellRangeAddress')
+        address.Sheet = sheet_index
+        address.StartColumn = start_col
+        address.StartRow = start_row
+        address.EndColumn = end_col
+        address.EndRow = end_row
+        addresses.append(address)
+    container = doc.createInstance('com.sun.star.sheet.SheetCellRanges')
+    container.addRangeAddresses(tuple(addresses), False)
+    container.setPropertyValue(name, value)
+
+
 def _makeBorderLine2(LineStyle, LineWidth):
     brd = uno.createUnoStruct('com.sun.star.table.BorderLine2')
     brd.LineStyle = LineStyle
@@ -685,92 +1052,95 @@ def _makeBorderLine2(LineStyle, LineWidth):
 
 
 def _c2s(col, row):
-    column = ""
-    rem = col % 26
-    div = col // 26
-    column = chr(ord('A') + rem) + column
-    while div > 0:
-        rem = div % 26
-        div = div // 26
-        column = chr(ord('A') + rem) + column
-    return column + str(row + 1)
+    return references.address(col, row)
 
 
 def _add(coords, col, row):
     return (coords[0] + col, coords[1] + row)
 
 
-def sortGroupRanking(doc):
-    participants = loadParticipants(doc)
-    rng = doc.Sheets[constants.GROUPS_RESULTS].getCellRangeByPosition(1, 1, 7, len(participants))
-    
-    vm = uno.createUnoStruct('com.sun.star.table.TableSortField')
-    vm.Field = 2
-    vm.IsAscending = False
-    
-    dr = uno.createUnoStruct('com.sun.star.table.TableSortField')
-    dr.Field = 3
-    dr.IsAscending = False
+@profiling.phase('group results')
+def writeGroupResults(doc):
+    """Computes the results of all groups from their schedules and writes them into the group results as values.
 
-    d = uno.createUnoStruct('com.sun.star.table.TableSortField')
-    d.Field = 4
-    d.IsAscending = False
+    Writes nothing if a score is missing and returns the names of the groups that miss scores.
+    """
+    groups = _readGroups(doc)
+    matrices = [_readScoreMatrix(doc.Sheets['Group {}'.format(i + 1)], len(rows)) for i, rows in enumerate(groups)]
+    # the formulas count a missing score against an entered one as a victory, results.groupResults does not
+    incomplete = ['Group {}'.format(i + 1) for i in results.incompleteGroups(matrices)]
+    if incomplete:
+        return incomplete
+    computed = dict()
+    for rows, group_results in zip(groups, results.groupResults(matrices)):
+        computed.update(zip(rows, group_results))
 
-    r = uno.createUnoStruct('com.sun.star.table.TableSortField')
-    r.Field = 5
-    r.IsAscending = True
+    num_rows = sum(len(rows) for rows in groups)
+    if num_rows == 0:
+        return []
+    sheet = doc.Sheets[constants.GROUPS_RESULTS]
+    # the rows may have been sorted already, so they are matched by the participant they show
+    names = sheet.getCellRangeByPosition(1, 1, 1, num_rows).getFormulaArray()
+    columns = sheet.getCellRangeByPosition(3, 1, 6, num_rows)
+    block = []
+    for (formula,), old in zip(names, columns.getFormulaArray()):
+        result = computed.get(_participantRow(formula))
+        if result is None:
+            block.append(old)
+            continue
+        ratio, dealt, received = result
+        block.append(tuple(buffers._formatNumber(value) for value in (ratio, dealt - received, dealt, received)))
+    columns.setFormulaArray(tuple(block))
+    return []
 
-    rnd = uno.createUnoStruct('com.sun.star.table.TableSortField')
-    rnd.Field = 6
-    rnd.IsAscending = False
 
-    desc = rng.createSortDescriptor()
-    def set_val(name, value):
-        for prop in desc:
-            if prop.Name == name:
-                prop.Value = value
-                return
-    set_val('IsSortColumns', False)
-    set_val('BindFormatsToContent', False)
-    set_val('MaxSortFieldsCount', False)
-    # do it like this because LibreOffice, for some reason, does not add more than 3 sorting criteria, it overwrites the last one with whatever is set as last
-    set_val('SortFields', uno.Any('[]com.sun.star.table.TableSortField', [rnd]))
-    rng.sort(desc)
-    set_val('SortFields', uno.Any('[]com.sun.star.table.TableSortField', [r]))
-    rng.sort(desc)
-    set_val('SortFields', uno.Any('[]com.sun.star.table.TableSortField', [d]))
-    rng.sort(desc)
-    set_val('SortFields', uno.Any('[]com.sun.star.table.TableSortField', [dr]))
-    rng.sort(desc)
-    set_val('SortFields', uno.Any('[]com.sun.star.table.TableSortField', [vm]))
-    rng.sort(desc)
+@profiling.phase('group ranking')
+def sortGroupRanking(doc, snapshot):
+    participants = snapshot.participants
+    sheet = doc.Sheets[constants.GROUPS_RESULTS]
+    rng = sheet.getCellRangeByPosition(1, 1, 7, len(participants))
+
+    values = rng.getDataArray()
+    formulas = rng.getFormulaArray()
+    # V/M, D-R, D, R, RND
+    order, equals = ranking.rankRows(values, [(2, False), (3, False), (4, False), (5, True), (6, False)])
+
+    # rows are moved as a whole, references to cells in the same row have to follow them
+    sorted_formulas = []
+    for i, src in enumerate(order):
+        row = []
+        for formula, value in zip(formulas[src], values[src]):
+            if formula.startswith('='):
+                formula = _moveRelativeRows(formula, i - src)
+            elif isinstance(value, str) and value:
+                formula = "'" + value
+            row.append(formula)
+        sorted_formulas.append(tuple(row))
+    rng.setFormulaArray(tuple(sorted_formulas))
 
-    equals = []
-    for i in range(1, len(participants)):
-        prev_vm = rng.getCellByPosition(2, i - 1).getString()
-        prev_dr = rng.getCellByPosition(3, i - 1).getString()
-        prev_d = rng.getCellByPosition(4, i - 1).getString()
-        prev_r = rng.getCellByPosition(5, i - 1).getString()
-        prev_rnd = rng.getCellByPosition(6, i - 1).getString()
-
-        vm = rng.getCellByPosition(2, i).getString()
-        dr = rng.getCellByPosition(3, i).getString()
-        d = rng.getCellByPosition(4, i).getString()
-        r = rng.getCellByPosition(5, i).getString()
-        rnd = rng.getCellByPosition(6, i).getString()
-
-        if prev_vm == vm and prev_dr == dr and prev_d == d and prev_r == r and prev_rnd == rnd:
-            if equals and equals[-1][-1] == i - 1:
-                equals[-1][-1] = i
-            else:
-                equals.append([i - 1, i])
     rng.CharColor = -1
-    for a, b in equals:
-        rng.getCellRangeByPosition(0, a, 5, b).CharColor = 0x00FF0000
+    _setRangesProperty(doc, sheet, 'CharColor', 0x00FF0000, [(1, 1 + a, 6, 1 + b) for a, b in equals])
+
+
+def _moveRelativeRows(formula, delta):
+    """Shifts relative row references to cells of the same sheet in the formula by ``delta`` rows.
+    """
+    def move(match):
+        if match.group(3):
+            return match.group(0)
+        return '{}{}{}'.format(match.group(1), match.group(2), int(match.group(4)) + delta)
+    parts = formula.split('"')
+    # every odd part is inside a string literal
+    parts[::2] = [_RELATIVE_REFERENCE.sub(move, part) for part in parts[::2]]
+    return '"'.join(parts)
+
+
+_RELATIVE_REFERENCE = re.compile(r"(?<![\w.$'])(\$?)([A-Z]{1,3})(\$?)(\d+)(?![\w(])")
 
 
-def sortFinalRanking(doc):
-    participants = loadParticipants(doc)
+@profiling.phase('final ranking')
+def sortFinalRanking(doc, snapshot):
+    participants = snapshot.participants
     rng = doc.Sheets[constants.FINAL_RANKING].getCellRangeByPosition(1, 1, 4, len(participants))
     
     el = uno.createUnoStruct('com.sun.star.table.TableSortField')
@@ -793,3 +1163,82 @@ def sortFinalRanking(doc):
         if prop.Name == 'BindFormatsToContent':
             prop.Value = False
     rng.sort(desc)
+
+
+@profiling.phase('bracket')
+def resolveElimination(doc, snapshot):
+    """Resolves the elimination from one read of its sheet and writes the decided places of the final ranking as values.
+
+    Completed rounds are frozen into values in the Elimination sheet. Returns the number of decided places.
+    """
+    cut_n = _eliminationSize(snapshot.settings, len(snapshot.participants))
+    layout = _layoutElimination(algorithms.Bracket(cut_n))
+    sheet = doc.Sheets[constants.ELIMINATION]
+    right = max(col for col, _, _ in layout.rounds) + 3
+    bottom = max(top + len(block) - 1 for _, top, block in layout.rounds)
+    area = sheet.getCellRangeByPosition(0, 0, right, bottom)
+    values = area.getDataArray()
+    formulas = [list(row) for row in area.getFormulaArray()]
+
+    # (number, name, club) values of both participants of every match, None if not known yet
+    entrants = []
+    # side of the winner of every match, None if not decided yet
+    winners = []
+    for match in layout.matches:
+        if match.sources is None:
+            sides = [tuple(values[match.row + k][match.col:match.col + 3]) for k in (0, 1)]
+        else:
+            sides = [_advancing(entrants[index], winners[index], winner) for index, winner in match.sources]
+        scores = (values[match.row][match.col + 3], values[match.row + 1][match.col + 3])
+        decided = None not in sides and all(isinstance(score, float) for score in scores) and scores[0] != scores[1]
+        entrants.append(sides)
+        winners.append((0 if scores[0] > scores[1] else 1) if decided else None)
+
+    completed = dict()
+    for match, winner in zip(layout.matches, winners):
+        completed[match.round] = completed.get(match.round, True) and winner is not None
+    frozen_rounds = set()
+    for index, match in enumerate(layout.matches):
+        if match.sources is None:
+            frozen = completed[0]
+        else:
+            frozen = all(completed[layout.matches[source].round] for source, _ in match.sources)
+        if not frozen:
+            continue
+        for k, entrant in enumerate(entrants[index]):
+            formulas[match.row + k][match.col:match.col + 3] = [_cellContent(value) for value in entrant]
+        frozen_rounds.add(match.round)
+    for col, top, block in layout.rounds:
+        if col // 4 not in frozen_rounds:
+            continue
+        rows = []
+        for row in range(top, top + len(block)):
+            contents = []
+            for formula, value in zip(formulas[row][col:col + 4], values[row][col:col + 4]):
+                if not formula.startswith('=') and isinstance(value, str) and value and not formula.startswith("'"):
+                    formula = "'" + value
+                contents.append(formula)
+            rows.append(tuple(contents))
+        sheet.getCellRangeByPosition(col, top, col + 3, top + len(block) - 1).setFormulaArray(tuple(rows))
+
+    final_ranking = buffers.SheetBuffer(doc.Sheets[constants.FINAL_RANKING])
+    decided = 0
+    for row, (index, winner, elimination_round) in layout.places.items():
+        entrant = _advancing(entrants[index], winners[index], winner)
+        if entrant is None:
+            contents = layout.ranking[row]
+        else:
+            number, name, club = entrant
+            contents = (_cellContent(name), _cellContent(club), buffers._formatNumber(elimination_round), _cellContent(number))
+            decided += 1
+        for col, content in enumerate(contents, 1):
+            final_ranking.setFormula(col, row, content)
+    final_ranking.flush()
+    return decided
+
+
+def _advancing(sides, winner_side, winner):
+    """Returns the winner or the loser of a match with the given participants, or None if it is not decided."""
+    if sides is None or winner_side is None:
+        return None
+    return sides[winner_side] if winner else sides[1 - winner_side]
@@ -0,0 +1,224 @@
+# coding: utf-8
+from __future__ import unicode_literals
+
+import json
+import logging
+import os
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+import buffers
+import constants
+
+# setting (in the Settings sheet) that turns profiling on when it is 1
+PROFILE_ROW = 8
+# if this environment variable is set, every profile is also appended to the file it names, one JSON per line
+LOG_ENV = 'HEMA_PROFILE_LOG'
+
+Phase = namedtuple('Phase', ['name', 'seconds', 'calls'])
+
+# the profile of the macro that is running, if it is profiled
+_active = None
+
+# the duration of every macro is logged here, whether it is profiled or not
+_log = logging.getLogger(__name__)
+
+
+class Profile:
+    """Counts the UNO calls made through :attr:`doc` and the time and calls of the phases of a macro.
+
+    Calls are counted by method name, property sets as ``set <name>`` and property gets as
+    ``get <name>``.
+    """
+
+    def __init__(self, doc, name):
+        self.name = name
+        self.calls = Counter()
+        self.total = 0
+        self.phases = []
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.doc = _Proxy(doc, self)
+
+    def count(self, method):
+        self.calls[method] += 1
+        self.total += 1
+
+    def wrap(self, value):
+        if value is None or isinstance(value, (str, bytes, bool, int, float)):
+            return value
+        if isinstance(value, tuple):
+            return tuple(self.wrap(item) for item in value)
+        return _Proxy(value, self)
+
+    def addPhase(self, name, seconds, calls):
+        # phases that run several times (e.g. the styles of groups and elimination) are summed up
+        for i, phase in enumerate(self.phases):
+            if phase.name == name:
+                self.phases[i] = Phase(name, phase.seconds + seconds, phase.calls + calls)
+                return
+        self.phases.append(Phase(name, seconds, calls))
+
+    def report(self):
+        return dict(
+            macro=self.name,
+            time=time.strftime('%Y-%m-%d %H:%M:%S'),
+            seconds=self.seconds,
+            calls=self.total,
+            phases=[phase._asdict() for phase in self.phases],
+            methods=dict(self.calls.most_common()),
+        )
+
+
+class _Proxy:
+    """Stands in for a UNO object, counts what is done with it and wraps the objects it returns."""
+
+    __slots__ = ('_target', '_profile')
+
+    def __init__(self, target, profile):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_profile', profile)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if callable(value):
+            return _Method(value, name, self._profile)
+        self._profile.count('get ' + name)
+        return self._profile.wrap(value)
+
+    def __setattr__(self, name, value):
+        self._profile.count('set ' + name)
+        setattr(self._target, name, _unwrap(value))
+
+    def __getitem__(self, key):
+        self._profile.count('getByIndex' if isinstance(key, int) else 'getByName')
+        return self._profile.wrap(self._target[key])
+
+    def __contains__(self, name):
+        self._profile.count('hasByName')
+        return name in self._target
+
+    def __iter__(self):
+        self._profile.count('createEnumeration')
+        return (self._profile.wrap(item) for item in self._target)
+
+    def __len__(self):
+        self._profile.count('getCount')
+        return len(self._target)
+
+
+class _Method:
+    __slots__ = ('method', 'name', 'profile')
+
+    def __init__(self, method, name, profile):
+        self.method = method
+        self.name = name
+        self.profile = profile
+
+    def __call__(self, *args):
+        self.profile.count(self.name)
+        return self.profile.wrap(self.method(*[_unwrap(arg) for arg in args]))
+
+
+def _unwrap(value):
+    if isinstance(value, _Proxy):
+        return object.__getattribute__(value, '_target')
+    if isinstance(value, tuple):
+        return tuple(_unwrap(item) for item in value)
+    return value
+
+
+def isEnabled(doc):
+    """Tells whether the macros on the document should be profiled.
+
+    They are if the 'Profile' setting is 1, or if the :data:`LOG_ENV` environment variable is set.
+    """
+    return bool(os.environ.get(LOG_ENV)) or _profileSetting(doc)
+
+
+def _profileSetting(doc):
+    if constants.SETTINGS not in doc.Sheets:
+        return False
+    return doc.Sheets[constants.SETTINGS].getCellByPosition(1, PROFILE_ROW).getValue() == 1
+
+
+def start(doc, name):
+    """Starts profiling the macro with the given name, if profiling is enabled, and returns the profile.
+
+    The macro has to use ``profile.doc`` instead of the document for its calls to be counted.
+    Returns ``None`` if profiling is not enabled.
+    """
+    global _active
+    if not isEnabled(doc):
+        return None
+    # the sheet would get in the way of the sheet positions used by the macros
+    if constants.DIAGNOSTICS in doc.Sheets:
+        doc.Sheets.removeByName(constants.DIAGNOSTICS)
+    _active = Profile(doc, name)
+    return _active
+
+
+def finish(doc, profile):
+    """Stops the profile and writes it into the hidden Diagnostics sheet, and into the log file if there is one."""
+    global _active
+    _active = None
+    profile.seconds = time.perf_counter() - profile.start
+    report = profile.report()
+    if _profileSetting(doc):
+        writeDiagnostics(doc, report)
+    path = os.environ.get(LOG_ENV)
+    if path:
+        with open(path, 'a') as f:
+            f.write(json.dumps(report) + '\n')
+    return report
+
+
+def logDuration(name, seconds):
+    """Logs how long the macro with the given name took, at the ``INFO`` level."""
+    _log.info('%s took %.3f s', name, seconds)
+
+
+@contextmanager
+def phase(name):
+    """Measures the time and the UNO calls of a part of the running macro, if it is profiled."""
+    profile = _active
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    calls = profile.total
+    try:
+        yield
+    finally:
+        profile.addPhase(name, time.perf_counter() - start, profile.total - calls)
+
+
+def writeDiagnostics(doc, report):
+    """Writes a profile report into the hidden Diagnostics sheet, replacing what was there."""
+    if constants.DIAGNOSTICS in doc.Sheets:
+        doc.Sheets.removeByName(constants.DIAGNOSTICS)
+    doc.Sheets.insertNewByName(constants.DIAGNOSTICS, len(doc.Sheets))
+    sheet = doc.Sheets[constants.DIAGNOSTICS]
+    buffer = buffers.SheetBuffer(sheet)
+    buffer.setString(0, 0, 'Macro')
+    buffer.setString(1, 0, report['macro'])
+    buffer.setString(2, 0, report['time'])
+    buffer.setString(0, 2, 'Phase')
+    buffer.setString(1, 2, 'Seconds')
+    buffer.setString(2, 2, 'UNO calls')
+    row = 3
+    for entry in report['phases'] + [dict(name='Total', seconds=report['seconds'], calls=report['calls'])]:
+        buffer.setString(0, row, entry['name'])
+        buffer.setValue(1, row, round(entry['seconds'], 4))
+        buffer.setValue(2, row, entry['calls'])
+        row += 1
+    row += 1
+    buffer.setString(0, row, 'Method')
+    buffer.setString(2, row, 'UNO calls')
+    for method, calls in report['methods'].items():
+        row += 1
+        buffer.setString(0, row, method)
+        buffer.setValue(2, row, calls)
+    buffer.flush()
+    sheet.IsVisible = False
@@ -0,0 +1,47 @@
+# coding: utf-8
+
+import functools
+from typing import Any, List, Sequence, Tuple
+
+
+def compareCells(a: Any, b: Any, ascending: bool) -> int:
+    """Compares two values as returned by ``getDataArray`` the way LibreOffice sorts them.
+
+    Numbers go before text, and empty cells are always last, regardless of the direction.
+    """
+    if a == '' or b == '':
+        if a == b:
+            return 0
+        return 1 if a == '' else -1
+    a_text = isinstance(a, str)
+    b_text = isinstance(b, str)
+    if a_text != b_text:
+        res = 1 if a_text else -1
+    else:
+        if a_text:
+            a, b = a.casefold(), b.casefold()
+        res = (a > b) - (a < b)
+    return res if ascending else -res
+
+
+def rankRows(rows: Sequence[Sequence[Any]], fields: Sequence[Tuple[int, bool]]) -> Tuple[List[int], List[List[int]]]:
+    """Orders the rows by the (column index, ascending) fields, most significant first.
+
+    Returns the row indices in the new order, and the [first, last] positions of runs of equal rows.
+    """
+    def compare(i, j):
+        for col, ascending in fields:
+            res = compareCells(rows[i][col], rows[j][col], ascending)
+            if res != 0:
+                return res
+        return 0
+
+    order = sorted(range(len(rows)), key=functools.cmp_to_key(compare))
+    ties = []
+    for pos in range(1, len(order)):
+        if compare(order[pos - 1], order[pos]) == 0:
+            if ties and ties[-1][-1] == pos - 1:
+                ties[-1][-1] = pos
+            else:
+                ties.append([pos - 1, pos])
+    return order, ties
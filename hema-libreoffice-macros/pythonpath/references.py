@@ -0,0 +1,87 @@
+# coding: utf-8
+
+import functools
+from collections import namedtuple
+from typing import Sequence, Tuple
+
+import constants
+
+# number of columns of a sheet (LibreOffice 7.4 and newer; older versions have 1024)
+MAX_COLUMNS = 16384
+
+
+def _columnName(col: int) -> str:
+    name = ''
+    col += 1
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        name = chr(ord('A') + rem) + name
+    return name
+
+
+# names of all columns, indexed from 0: A, B, ..., Z, AA, AB, ...
+COLUMN_NAMES = tuple(_columnName(col) for col in range(MAX_COLUMNS))
+
+
+def address(col: int, row: int) -> str:
+    """Returns the relative address of a cell, e.g. ``B3`` for column 1 and row 2 (both counted from 0)."""
+    return COLUMN_NAMES[col] + str(row + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def sheetPrefix(sheet: str) -> str:
+    """Returns what is put before an address to refer to a cell of the given sheet from another one."""
+    return "$'" + sheet + "'."
+
+
+def qualified(sheet: str, col: int, row: int) -> str:
+    """Returns the address of a cell qualified by its sheet, e.g. ``$'Group 1'.H7``."""
+    return sheetPrefix(sheet) + COLUMN_NAMES[col] + str(row + 1)
+
+
+_PARTICIPANT_NAME = sheetPrefix(constants.PARTICIPANT_LIST) + COLUMN_NAMES[0]
+_PARTICIPANT_CLUB = sheetPrefix(constants.PARTICIPANT_LIST) + COLUMN_NAMES[1]
+
+
+def participantName(row: int) -> str:
+    """Returns the reference to the name of the participant in the given row of the participant list."""
+    return _PARTICIPANT_NAME + str(row + 1)
+
+
+def participantClub(row: int) -> str:
+    """Returns the reference to the club of the participant in the given row of the participant list."""
+    return _PARTICIPANT_CLUB + str(row + 1)
+
+
+# Formulas of a group sheet that depend only on the size of the group. The tuples ``ratio``, ``dealt``
+# and ``received`` hold the formulas of the scoring table for every participant, and ``results`` the
+# addresses of these cells (to be prefixed by the sheet). ``bindings`` holds the formulas copying the
+# two scores of every bout from the schedule into the scoring table, and ``scores`` the addresses of
+# the score cells in the schedule.
+GroupFormulas = namedtuple('GroupFormulas', ['ratio', 'dealt', 'received', 'results', 'bindings', 'scores'])
+
+
+@functools.lru_cache(maxsize=64)
+def groupFormulas(group_size: int, table: Tuple[int, int], bouts: Sequence[Tuple[int, int, int, int]]) -> GroupFormulas:
+    """Builds the formulas of a group sheet once for every group size.
+
+    ``table`` is the top-left corner of the scoring table and ``bouts`` are the (first, second,
+    column, row) tuples of the schedule, as returned by ``helpers._groupBouts`` (as a tuple).
+    """
+    left, top = table
+    ratio, dealt, received, results = [], [], [], []
+    for j in range(group_size):
+        # row of what the participant dealt and column of what they received in the score matrix
+        dealt_cells = address(left + 2, top + 1 + j) + ':' + address(left + 1 + group_size, top + 1 + j)
+        received_cells = address(left + 2 + j, top + 1) + ':' + address(left + 2 + j, top + group_size)
+        # victories / matches; the empty self-match cell compares as not greater than itself
+        ratio.append('=SUMPRODUCT({} > TRANSPOSE({})) / {}'.format(dealt_cells, received_cells, group_size - 1))
+        dealt.append('=SUM({})'.format(dealt_cells))
+        received.append('=SUM({})'.format(received_cells))
+        results.append(tuple(address(left + 2 + group_size + k, top + 1 + j) for k in range(3)))
+    bindings, scores = [], []
+    for _, _, col, row in bouts:
+        score_cells = (address(col + 2, row), address(col + 2, row + 1))
+        bindings.append(tuple('=IF(ISBLANK({0}); ""; {0})'.format(cell) for cell in score_cells))
+        scores.append(score_cells)
+    return GroupFormulas(tuple(ratio), tuple(dealt), tuple(received), tuple(results), tuple(bindings), tuple(scores))
@@ -0,0 +1,67 @@
+# coding: utf-8
+
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    # the Python bundled with LibreOffice usually comes without NumPy
+    numpy = None
+
+# a matrix of the scores of a group; the score of participant i against participant j is at [i][j],
+# ``None`` if the bout was not fought yet (and on the diagonal)
+ScoreMatrix = Sequence[Sequence[Optional[float]]]
+# V/M, D and R of a participant
+Result = Tuple[float, float, float]
+
+
+def groupResults(matrices: Sequence[ScoreMatrix]) -> List[List[Result]]:
+    """Computes the V/M, D and R of every participant of every group, in the order of the matrices.
+
+    Only bouts with both scores count as victories, unlike in the sheet formulas, which count a missing
+    score against an entered one as a victory; the results are the same for complete groups.
+    """
+    if numpy is not None and matrices:
+        return _groupResultsNumpy(matrices)
+    return [_groupResultsPython(matrix) for matrix in matrices]
+
+
+def incompleteGroups(matrices: Sequence[ScoreMatrix]) -> List[int]:
+    """Returns the indices of the groups with a bout that misses a score."""
+    return [g for g, matrix in enumerate(matrices)
+            if any(matrix[i][j] is None for i in range(len(matrix)) for j in range(len(matrix)) if i != j)]
+
+
+def _groupResultsPython(matrix: ScoreMatrix) -> List[Result]:
+    size = len(matrix)
+    results = []
+    for i in range(size):
+        victories = dealt = received = 0.0
+        for j in range(size):
+            if matrix[i][j] is not None:
+                dealt += matrix[i][j]
+            if matrix[j][i] is not None:
+                received += matrix[j][i]
+            if matrix[i][j] is not None and matrix[j][i] is not None and matrix[i][j] > matrix[j][i]:
+                victories += 1
+        results.append((victories / (size - 1) if size > 1 else 0.0, dealt, received))
+    return results
+
+
+def _groupResultsNumpy(matrices: Sequence[ScoreMatrix]) -> List[List[Result]]:
+    # all groups are padded to the largest one and computed at once
+    sizes = numpy.array([len(matrix) for matrix in matrices])
+    largest = sizes.max()
+    scores = numpy.full((len(matrices), largest, largest), numpy.nan)
+    for g, matrix in enumerate(matrices):
+        if len(matrix):
+            scores[g, :len(matrix), :len(matrix)] = numpy.array(matrix, dtype=float)
+    against = scores.transpose(0, 2, 1)
+    with numpy.errstate(invalid='ignore'):
+        # comparisons with NaN are false, so bouts without both scores are no victories
+        victories = (scores > against).sum(axis=2)
+    dealt = numpy.nansum(scores, axis=2)
+    received = numpy.nansum(scores, axis=1)
+    ratio = victories / numpy.maximum(sizes - 1, 1)[:, None]
+    return [list(zip(ratio[g, :size].tolist(), dealt[g, :size].tolist(), received[g, :size].tolist()))
+            for g, size in enumerate(sizes.tolist())]
@@ -0,0 +1,290 @@
+# coding: utf-8
+"""Simulates whole tournaments to compare settings before an event.
+
+Participants get a random true strength and a rating that estimates it with some noise. Groups are
+seeded and scheduled exactly like ``main.schedule`` does (without club separation), bouts are decided
+exchange by exchange with probabilities given by the strength difference, and the groups and the
+elimination are ranked like in the sheets. For every combination of the given settings the script
+reports how well the final ranking matches the true strength order and how long the event takes, e.g.
+
+    python simulate.py --participants 60 --max-group-size 5 6 7 8 --to-elimination 0.5 16 32
+
+Needs NumPy. The simulations are vectorized over many tournaments at once and spread over processes.
+"""
+import argparse
+import concurrent.futures
+import functools
+import itertools
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pythonpath'))
+
+import numpy as np
+
+import algorithms
+
+# number of exchanges simulated at once, limits the memory used by a worker (a few bytes each)
+CHUNK_ELEMENTS = 2 ** 23
+
+
+class Model:
+    """Parameters of the simulated event that are not swept."""
+
+    def __init__(self, participants, touches=5, rating_noise=0.5, exchange_scale=0.5, rings=4, bout_duration=3,
+                 min_rest=6):
+        self.participants = participants
+        self.touches = touches
+        self.rating_noise = rating_noise
+        self.exchange_scale = exchange_scale
+        self.rings = rings
+        self.bout_duration = bout_duration
+        self.min_rest = min_rest
+
+
+@functools.lru_cache(maxsize=None)
+def _groupLayout(num_participants, max_group_size):
+    """Returns the bouts of all groups as pairs of seeding positions, and the number of bouts of every
+    position, for the groups ``main.schedule`` would make.
+    """
+    group_sizes = algorithms.findGroupSizes(num_participants, max_group_size)
+    groups = algorithms.assignGroups(group_sizes, list(range(num_participants)))
+    pairs = [(group[a], group[b]) for group in groups for a, b in algorithms.scheduleTemplate(len(group))]
+    pairs = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+    bouts = np.bincount(pairs.ravel(), minlength=num_participants)
+    return groups, pairs, bouts
+
+
+def _eliminationSize(to_elimination, num_participants):
+    if to_elimination <= 1:
+        to_elimination = to_elimination * num_participants
+    return round(to_elimination)
+
+
+def simulateBouts(rng, strength_a, strength_b, touches, exchange_scale):
+    """Simulates bouts to the given number of touches between participants of the given strengths (arrays of any equal shape).
+
+    Returns the scores of both participants.
+    """
+    p = 1 / (1 + np.exp(exchange_scale * (strength_b - strength_a)))
+    exchanges = rng.random(p.shape + (2 * touches - 1,)) < p[..., None]
+    points_a = np.cumsum(exchanges, axis=-1, dtype=np.int16)
+    points_b = np.arange(1, 2 * touches, dtype=np.int16) - points_a
+    # one of them always has enough touches after the last possible exchange
+    end = np.argmax((points_a >= touches) | (points_b >= touches), axis=-1)
+    score_a = np.take_along_axis(points_a, end[..., None], axis=-1)[..., 0]
+    return score_a, end + 1 - score_a
+
+
+def simulateTournaments(rng, model, max_group_size, to_elimination, count):
+    """Simulates ``count`` tournaments and returns the final rankings as an array of participants, who are
+    numbered by their true strength (0 being the strongest).
+    """
+    n = model.participants
+    _, pairs, bouts = _groupLayout(n, max_group_size)
+
+    strength = -np.sort(-rng.standard_normal((count, n)), axis=1)
+    rating = strength + model.rating_noise * rng.standard_normal((count, n))
+    # participants at the seeding positions
+    seeding = np.argsort(-rating, axis=1)
+
+    ## groups, in terms of seeding positions
+    fighters = seeding[:, pairs]
+    score_a, score_b = simulateBouts(rng, np.take_along_axis(strength, fighters[..., 0], 1),
+                                     np.take_along_axis(strength, fighters[..., 1], 1), model.touches, model.exchange_scale)
+    # sums the values of the bouts of every position, for all tournaments at once
+    positions = (np.arange(count)[:, None] * n + pairs.T[:, None, :]).reshape(2, -1)
+    def addUp(values_a, values_b):
+        sums = np.bincount(positions[0], values_a.ravel(), count * n) + np.bincount(positions[1], values_b.ravel(), count * n)
+        return sums.reshape(count, n)
+    victories = addUp(score_a > score_b, score_b > score_a)
+    dealt = addUp(score_a, score_b)
+    received = addUp(score_b, score_a)
+    # V/M, D-R, D (all descending), R (ascending), then random
+    keys = (rng.random((count, n)), received, -dealt, -(dealt - received), -victories / bouts)
+    group_ranking = np.take_along_axis(seeding, np.lexsort(keys, axis=-1), axis=1)
+
+    ## elimination
+    cut_n = _eliminationSize(to_elimination, n)
+    bracket = algorithms.Bracket(cut_n)
+    seeds = np.array([bracket.slot(0, i, side) for i in range(bracket.numMatches(0)) for side in (0, 1)])
+    entrants = np.where(seeds >= 0, group_ranking[:, np.maximum(seeds, 0)], -1)
+    # how far everybody got, the higher the better; participants out after the groups stay at 0
+    reached = np.zeros((count, n), dtype=np.int16)
+    rows = np.arange(count)[:, None]
+    semi_final_losers = None
+    for rnd in range(bracket.num_rounds):
+        top, bottom = entrants[:, 0::2], entrants[:, 1::2]
+        score_top, score_bottom = simulateBouts(rng, strength[rows, np.maximum(top, 0)], strength[rows, np.maximum(bottom, 0)],
+                                                model.touches, model.exchange_scale)
+        top_wins = (bottom < 0) | ((top >= 0) & (score_top > score_bottom))
+        winners = np.where(top_wins, top, bottom)
+        losers = np.where(top_wins, bottom, top)
+        fought = losers >= 0
+        reached[np.broadcast_to(rows, losers.shape)[fought], losers[fought]] = 2 * rnd + 1
+        if rnd == bracket.num_rounds - 2:
+            semi_final_losers = losers
+        entrants = winners
+    reached[rows[:, 0], entrants[:, 0]] = 2 * bracket.num_rounds + 1
+    if semi_final_losers is not None:
+        top, bottom = semi_final_losers[:, 0], semi_final_losers[:, 1]
+        score_top, score_bottom = simulateBouts(rng, strength[rows[:, 0], top], strength[rows[:, 0], bottom],
+                                                model.touches, model.exchange_scale)
+        third = np.where(score_top > score_bottom, top, bottom)
+        reached[rows[:, 0], third] += 1
+
+    quali = np.empty_like(group_ranking)
+    np.put_along_axis(quali, group_ranking, np.arange(n)[None, :], axis=1)
+    return np.lexsort((quali, -reached), axis=-1)
+
+
+def summarize(final_ranking):
+    """Returns sums of the quality measures of the given final rankings."""
+    count, n = final_ranking.shape
+    position = np.empty_like(final_ranking)
+    np.put_along_axis(position, final_ranking, np.arange(n)[None, :], axis=1)
+    # Spearman's correlation of the final positions with the true strength order
+    d = position - np.arange(n)[None, :]
+    spearman = 1 - 6 * (d ** 2).sum(axis=1) / (n * (n * n - 1))
+    top = min(8, n)
+    top_found = (final_ranking[:, :top] < top).sum(axis=1) / top
+    winner_best = final_ranking[:, 0] == 0
+    measures = dict(spearman=spearman, top8=top_found, winner_is_best=winner_best)
+    return {name: (float(values.sum()), float((values.astype(float) ** 2).sum())) for name, values in measures.items()}
+
+
+def eventDuration(model, max_group_size, to_elimination):
+    """Returns the estimated durations of the groups and of the elimination, in the unit of the bout duration."""
+    groups, _, _ = _groupLayout(model.participants, max_group_size)
+    schedules = [list(algorithms.scheduleTemplate(len(group))) for group in groups]
+    assigned = algorithms.scheduleRings(schedules, model.rings, model.bout_duration, model.min_rest)
+    group_slots = 1 + max(slot for group in assigned for _, slot in group)
+
+    bracket = algorithms.Bracket(_eliminationSize(to_elimination, model.participants))
+    elimination_slots = 0
+    for rnd in range(bracket.num_rounds):
+        fought = sum(not bracket.isBye(rnd, i) for i in range(bracket.numMatches(rnd)))
+        if rnd == bracket.num_rounds - 1 and bracket.hasSmallFinal():
+            fought += 1
+        elimination_slots += math.ceil(fought / model.rings)
+    return group_slots * model.bout_duration, elimination_slots * model.bout_duration
+
+
+def chunkSize(model, max_group_size):
+    """Returns how many tournaments are simulated at once, so that a chunk holds about :data:`CHUNK_ELEMENTS` exchanges."""
+    _, pairs, _ = _groupLayout(model.participants, max_group_size)
+    per_tournament = max(len(pairs), model.participants) * (2 * model.touches - 1)
+    return max(1, CHUNK_ELEMENTS // per_tournament)
+
+
+def _simulateChunk(model, max_group_size, to_elimination, count, seed):
+    rng = np.random.default_rng(seed)
+    return summarize(simulateTournaments(rng, model, max_group_size, to_elimination, count))
+
+
+def sweep(model, max_group_sizes, to_eliminations, simulations, workers=None, seed=0):
+    """Simulates every combination of the settings and returns a list of results, one per combination.
+
+    The simulations of all combinations are split into chunks that run in a pool of processes.
+    """
+    combinations = []
+    for max_group_size, to_elimination in itertools.product(max_group_sizes, to_eliminations):
+        try:
+            _groupLayout(model.participants, max_group_size)
+        except ValueError as e:
+            combinations.append(dict(max_group_size=max_group_size, to_elimination=to_elimination, error=str(e)))
+            continue
+        cut_n = _eliminationSize(to_elimination, model.participants)
+        if not 2 < cut_n <= model.participants:
+            combinations.append(dict(max_group_size=max_group_size, to_elimination=to_elimination,
+                                     error='{} participants cannot go to the elimination'.format(cut_n)))
+            continue
+        combinations.append(dict(max_group_size=max_group_size, to_elimination=to_elimination))
+
+    seeds = np.random.SeedSequence(seed)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for combination in combinations:
+            if 'error' in combination:
+                continue
+            chunk_size = chunkSize(model, combination['max_group_size'])
+            chunks = [chunk_size] * (simulations // chunk_size)
+            if simulations % chunk_size:
+                chunks.append(simulations % chunk_size)
+            for count, chunk_seed in zip(chunks, seeds.spawn(len(chunks))):
+                futures.append((combination, count, pool.submit(_simulateChunk, model, combination['max_group_size'],
+                                                                combination['to_elimination'], count, chunk_seed)))
+        totals = dict()
+        for combination, count, future in futures:
+            total = totals.setdefault(id(combination), dict(count=0))
+            total['count'] += count
+            for name, (value_sum, square_sum) in future.result().items():
+                old_sum, old_square_sum = total.get(name, (0.0, 0.0))
+                total[name] = (old_sum + value_sum, old_square_sum + square_sum)
+
+    for combination in combinations:
+        if 'error' in combination:
+            continue
+        total = totals[id(combination)]
+        count = total.pop('count')
+        combination['simulations'] = count
+        for name, (value_sum, square_sum) in total.items():
+            mean = value_sum / count
+            variance = max(square_sum / count - mean ** 2, 0.0)
+            combination[name] = mean
+            combination[name + '_error'] = math.sqrt(variance / count)
+        groups, elimination = eventDuration(model, combination['max_group_size'], combination['to_elimination'])
+        combination['group_duration'] = groups
+        combination['elimination_duration'] = elimination
+    return combinations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulates tournaments to compare the max group size and elimination settings.')
+    parser.add_argument('-n', '--participants', type=int, required=True)
+    parser.add_argument('--max-group-size', type=int, nargs='+', default=[5, 6, 7, 8])
+    parser.add_argument('--to-elimination', type=float, nargs='+', default=[0.5, 0.8, 16, 32],
+                        help='fractions (up to 1) or numbers of participants that go to the elimination')
+    parser.add_argument('--simulations', type=int, default=20000, help='tournaments per combination of settings')
+    parser.add_argument('--touches', type=int, default=5, help='touches needed to win a bout')
+    parser.add_argument('--rating-noise', type=float, default=0.5, help='error of the ratings, relative to the spread of strengths')
+    parser.add_argument('--exchange-scale', type=float, default=0.5, help='how much a strength difference decides an exchange')
+    parser.add_argument('--rings', type=int, default=4)
+    parser.add_argument('--bout-duration', type=float, default=3, help='minutes')
+    parser.add_argument('--min-rest', type=float, default=6, help='minutes')
+    parser.add_argument('--workers', type=int, help='number of processes (default: number of CPUs)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='file to write the results into')
+    args = parser.parse_args(argv)
+
+    model = Model(args.participants, touches=args.touches, rating_noise=args.rating_noise,
+                  exchange_scale=args.exchange_scale, rings=args.rings, bout_duration=args.bout_duration,
+                  min_rest=args.min_rest)
+    start = time.time()
+    results = sweep(model, args.max_group_size, args.to_elimination, args.simulations, args.workers, args.seed)
+    elapsed = time.time() - start
+
+    print('{:>9} {:>8} {:>16} {:>16} {:>16} {:>8} {:>8}'.format(
+        'max group', 'to elim.', 'rank corr.', 'top 8 found', 'best wins', 'groups', 'elim.'))
+    for result in results:
+        if 'error' in result:
+            print('{:>9} {:>8g}  {}'.format(result['max_group_size'], result['to_elimination'], result['error']))
+            continue
+        print('{:>9} {:>8g} {:>8.3f} ±{:.4f} {:>8.3f} ±{:.4f} {:>8.3f} ±{:.4f} {:>6.0f} m {:>6.0f} m'.format(
+            result['max_group_size'], result['to_elimination'],
+            result['spearman'], result['spearman_error'], result['top8'], result['top8_error'],
+            result['winner_is_best'], result['winner_is_best_error'],
+            result['group_duration'], result['elimination_duration']))
+    total = sum(result.get('simulations', 0) for result in results)
+    print('{} tournaments in {:.1f} s'.format(total, elapsed))
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
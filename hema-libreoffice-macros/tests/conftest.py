@@ -0,0 +1,31 @@
+# coding: utf-8
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'pythonpath'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+sys.path.insert(0, str(ROOT))
+
+import fakeoffice
+
+fakeoffice.install()
+
+# rows of the Settings sheet, as written by main.init
+SETTING_ROWS = dict(max_group_size=0, groups_per_row=1, to_elimination=2, rating_is_rank=3, min_group_size=4,
+                    rings=5, bout_duration=6, min_rest=7, profile=8)
+
+
+def makeDocument(participants, **settings):
+    """Returns an initialized in-memory document with the given (name, club, rating, present) rows and settings."""
+    import constants
+    import main
+    doc = fakeoffice.Document()
+    main.CTX = fakeoffice.ScriptContext(doc)
+    main.init()
+    if participants:
+        doc.Sheets[constants.PARTICIPANT_LIST].getCellRangeByPosition(0, 1, 3, len(participants)).setDataArray(
+            tuple(tuple(row) for row in participants))
+    for name, value in settings.items():
+        doc.Sheets[constants.SETTINGS].getCellByPosition(1, SETTING_ROWS[name]).setValue(value)
+    return doc
@@ -0,0 +1,255 @@
+# coding: utf-8
+import math
+import random
+import time
+from collections import Counter
+
+import pytest
+
+import algorithms
+
+
+@pytest.mark.parametrize('group_size', [3, 5, 7, 9])
+def test_iter_group_odd_has_the_rounds_of_make_group_odd(group_size):
+    k = group_size // 2
+    schedule = algorithms.makeGroupOdd(list(range(group_size)))
+    rounds = [schedule[i * k:(i + 1) * k] for i in range(group_size)]
+    iterated = list(algorithms.iterGroupOdd(group_size))
+    assert [set(map(frozenset, rnd)) for rnd in iterated] == [set(map(frozenset, rnd)) for rnd in rounds]
+    pairs = [frozenset(pair) for rnd in iterated for pair in rnd]
+    assert len(pairs) == len(set(pairs)) == group_size * (group_size - 1) // 2
+
+
+@pytest.mark.parametrize('group_size', [3, 5, 7, 9])
+def test_iter_group_odd_balances_firsts(group_size):
+    firsts = Counter(a for rnd in algorithms.iterGroupOdd(group_size) for a, _ in rnd)
+    assert firsts == {t: group_size // 2 for t in range(group_size)}
+
+
+def firstCounts(schedule, group):
+    firsts = Counter({p: 0 for p in group})
+    firsts.update(a for a, _ in schedule)
+    return firsts
+
+
+@pytest.mark.parametrize('group_size', range(3, 32, 2))
+def test_balance_firsts_keeps_the_pairs(group_size):
+    group = list(range(group_size))
+    # everybody is first against all the participants after them, the most unbalanced orientation
+    schedule = [(a, b) for a in group for b in group if a < b]
+    pairs = [frozenset(pair) for pair in schedule]
+    algorithms.balanceFirsts(schedule, group)
+    assert [frozenset(pair) for pair in schedule] == pairs
+    firsts = firstCounts(schedule, group)
+    assert max(firsts.values()) - min(firsts.values()) <= 1
+
+
+@pytest.mark.parametrize('group_size', range(3, 32, 2))
+def test_balance_firsts_of_a_shuffled_orientation(group_size):
+    rng = random.Random(group_size)
+    group = ['P{}'.format(i) for i in range(group_size)]
+    schedule = [(a, b) if rng.random() < 0.5 else (b, a) for i, a in enumerate(group) for b in group[i + 1:]]
+    rng.shuffle(schedule)
+    pairs = [frozenset(pair) for pair in schedule]
+    algorithms.balanceFirsts(schedule, group)
+    assert [frozenset(pair) for pair in schedule] == pairs
+    firsts = firstCounts(schedule, group)
+    assert max(firsts.values()) - min(firsts.values()) <= 1
+
+
+@pytest.mark.parametrize('group_size', range(3, 32, 2))
+def test_make_group_odd_balances_firsts(group_size):
+    group = list(range(group_size))
+    schedule = algorithms.makeGroupOdd(group)
+    assert sorted(tuple(sorted(pair)) for pair in schedule) == [(a, b) for a in group for b in group if a < b]
+    firsts = firstCounts(schedule, group)
+    assert max(firsts.values()) - min(firsts.values()) <= 1
+
+
+@pytest.mark.parametrize('min_size, max_size', [(2, 2), (3, 5), (4, 4), (4, 7), (5, 6), (6, 10)])
+def test_solve_group_sizes_keeps_the_bounds(min_size, max_size):
+    for n in range(1, 120):
+        feasible = any(k * min_size <= n <= k * max_size for k in range(1, n + 1))
+        if not feasible:
+            with pytest.raises(ValueError):
+                algorithms.solveGroupSizes(n, min_size, max_size)
+            assert algorithms.groupSizeAlternatives(n, min_size, max_size, 3) == []
+            continue
+        sizes = algorithms.solveGroupSizes(n, min_size, max_size)
+        assert sum(sizes) == n
+        assert all(min_size <= size <= max_size for size in sizes)
+        assert max(sizes) - min(sizes) <= 1
+        alternatives = algorithms.groupSizeAlternatives(n, min_size, max_size, 3)
+        assert alternatives[0] == sizes
+        for alternative in alternatives:
+            assert sum(alternative) == n
+            assert all(min_size <= size <= max_size for size in alternative)
+
+
+def test_solve_group_sizes_without_a_split():
+    with pytest.raises(ValueError, match='Cannot arrange 5 participants into groups of 4 to 4'):
+        algorithms.solveGroupSizes(5, 4, 4)
+    assert algorithms.groupSizeAlternatives(5, 4, 4, 3) == []
+    assert algorithms.groupSizeAlternatives(10, 6, 5, 3) == []
+
+
+def test_group_size_alternatives_are_best_first():
+    assert algorithms.groupSizeAlternatives(20, 4, 7, 3) == [[4, 4, 4, 4, 4], [5, 5, 5, 5], [7, 7, 6]]
+
+
+def clubPairs(groups, club):
+    return sum(n * (n - 1) // 2 for group in groups for c, n in Counter(map(club, group)).items() if c)
+
+
+def snakeRounds(group_sizes, num_participants):
+    """Returns the groups and the rounds of the snake, as assignGroups passes them to separateClubs."""
+    captured = dict()
+
+    def capture(groups, rounds, club):
+        captured.update(groups=[list(group) for group in groups], rounds=rounds)
+        return 0
+    original = algorithms.separateClubs
+    algorithms.separateClubs = capture
+    try:
+        algorithms.assignGroups(group_sizes, list(range(num_participants)), club=lambda p: None)
+    finally:
+        algorithms.separateClubs = original
+    return captured['groups'], captured['rounds']
+
+
+@pytest.mark.parametrize('num_clubs', [1, 2, 3, 5, 40])
+def test_separate_clubs_leaves_no_improving_swap(num_clubs):
+    rng = random.Random(num_clubs)
+    clubs = [rng.choice(['', 'C{}'.format(rng.randrange(num_clubs))]) if rng.random() < 0.1
+             else 'C{}'.format(rng.randrange(num_clubs)) for _ in range(300)]
+    groups, rounds = snakeRounds(algorithms.findGroupSizes(300, 7), 300)
+    seeded = clubPairs(groups, clubs.__getitem__)
+    remaining = algorithms.separateClubs(groups, rounds, clubs.__getitem__)
+    assert remaining == clubPairs(groups, clubs.__getitem__) <= seeded
+    assert sorted(p for group in groups for p in group) == list(range(300))
+    for positions in rounds:
+        for a, i in positions:
+            for b, j in positions:
+                if a != b:
+                    pair = [groups[a], groups[b]]
+                    before = clubPairs(pair, clubs.__getitem__)
+                    groups[a][i], groups[b][j] = groups[b][j], groups[a][i]
+                    assert clubPairs(pair, clubs.__getitem__) >= before
+                    groups[a][i], groups[b][j] = groups[b][j], groups[a][i]
+
+
+def test_separate_clubs_with_a_few_big_clubs_is_fast():
+    # clubmates cannot all be separated, which used to make every pass rescan whole rounds (about 12 s)
+    rng = random.Random(3)
+    clubs = ['C{}'.format(rng.randrange(3)) for _ in range(10000)]
+    start = time.perf_counter()
+    groups = algorithms.assignGroups(algorithms.findGroupSizes(10000, 7), list(range(10000)), club=clubs.__getitem__)
+    assert time.perf_counter() - start < 3
+    # three clubs in a group of 7 make at least 3 + 1 + 1 pairs, in a group of 6 at least 1 + 1 + 1
+    assert clubPairs(groups, clubs.__getitem__) == sum(5 if len(group) == 7 else 3 for group in groups)
+
+
+def baselineElimination(participants):
+    """makeElimination as it was before the bracket was stored in flat arrays."""
+    n = len(participants)
+    n2log = math.ceil(math.log2(n))
+    assert n > 2
+    layer = [(0, 1)]
+    for lvl in range(1, n2log):
+        max_n = 2 ** (lvl + 1) - 1
+        layer2 = []
+        for a, b in layer:
+            layer2.append((a, max_n - a))
+            layer2.append((max_n - b, b))
+        layer = layer2
+    participants = participants + [None] * (2 ** n2log - n)
+    return [(participants[a], participants[b]) for a, b in layer], n2log
+
+
+@pytest.mark.parametrize('n', range(2, 71))
+def test_make_elimination_matches_the_baseline(n):
+    participants = ['P{}'.format(i) for i in range(n)]
+    if n == 2:
+        with pytest.raises(AssertionError):
+            baselineElimination(participants)
+        with pytest.raises(AssertionError):
+            algorithms.makeElimination(participants)
+        return
+    assert algorithms.makeElimination(participants) == baselineElimination(participants)
+
+
+@pytest.mark.parametrize('n', range(3, 71))
+def test_bracket_byes(n):
+    bracket = algorithms.Bracket(n)
+    num_byes = bracket.size - n
+    assert bracket.size // 2 < n <= bracket.size
+    first = bracket.firstRound()
+    assert sorted(seed for pair in first for seed in pair if seed is not None) == list(range(n))
+    # the best seeds get the byes, and go straight into the second round
+    byes = [i for i in range(bracket.numMatches(0)) if bracket.isBye(0, i)]
+    assert sorted(a if b is None else b for a, b in (first[i] for i in byes)) == list(range(num_byes))
+    assert all(None not in first[i] for i in range(bracket.numMatches(0)) if i not in byes)
+    for i in range(bracket.numMatches(0)):
+        winner = bracket.slot(1, i // 2, i % 2)
+        if i in byes:
+            assert winner == (first[i][0] if first[i][1] is None else first[i][1])
+        else:
+            assert winner == algorithms.UNDECIDED
+    later = [bracket.slot(rnd, i, side) for rnd in range(1, bracket.num_rounds)
+             for i in range(bracket.numMatches(rnd)) for side in range(2)]
+    assert algorithms.BYE not in later
+    # every match and the small final
+    assert bracket.num_matches == bracket.size
+
+
+def checkRings(schedules, assigned, num_rings, rest_slots):
+    assert [len(group) for group in assigned] == [len(schedule) for schedule in schedules]
+    # every bout gets its own ring and slot
+    positions = [pos for group in assigned for pos in group]
+    assert len(set(positions)) == len(positions)
+    assert all(0 <= ring < num_rings and slot >= 0 for ring, slot in positions)
+    slots = dict()
+    for g, (schedule, group) in enumerate(zip(schedules, assigned)):
+        for bout, (_, slot) in zip(schedule, group):
+            for p in bout:
+                slots.setdefault((g, p), []).append(slot)
+    for fighter_slots in slots.values():
+        fighter_slots.sort()
+        # nobody fights twice in a slot, and everybody rests between their bouts
+        assert all(b - a - 1 >= rest_slots for a, b in zip(fighter_slots, fighter_slots[1:]))
+
+
+@pytest.mark.parametrize('group_sizes, num_rings, bout_duration, min_rest', [
+    ([5, 5, 4], 2, 1, 0),
+    ([7, 7, 6, 6], 3, 3, 5),
+    ([4, 4], 1, 2, 2),
+    ([3], 4, 1, 0),
+    ([3, 3], 10, 1, 1),
+    ([6] * 8, 4, 2.5, 4),
+])
+def test_schedule_rings(group_sizes, num_rings, bout_duration, min_rest):
+    schedules = [algorithms.makeGroupSchedule(list(range(size))) for size in group_sizes]
+    assigned = algorithms.scheduleRings(schedules, num_rings, bout_duration, min_rest)
+    checkRings(schedules, assigned, num_rings, math.ceil(min_rest / bout_duration))
+
+
+def test_schedule_rings_without_rest_allows_consecutive_bouts():
+    # three participants fight each other, so every bout has someone who fought in the one before
+    schedules = [algorithms.makeGroupSchedule(list(range(3)))]
+    assigned = algorithms.scheduleRings(schedules, 2, min_rest=0)
+    checkRings(schedules, assigned, 2, 0)
+    assert [slot for _, slot in assigned[0]] == [0, 1, 2]
+
+
+def test_schedule_rings_with_more_rings_than_bouts():
+    schedules = [[('a', 'b')], [('c', 'd')]]
+    assigned = algorithms.scheduleRings(schedules, 5, min_rest=3)
+    checkRings(schedules, assigned, 5, 3)
+    assert sorted(assigned) == [[(0, 0)], [(1, 0)]]
+
+
+def test_schedule_rings_of_one_group_waits_for_the_rest():
+    schedules = [algorithms.makeGroupSchedule(list(range(3)))]
+    assigned = algorithms.scheduleRings(schedules, 3, bout_duration=1, min_rest=1)
+    checkRings(schedules, assigned, 3, 1)
+    assert [slot for _, slot in assigned[0]] == [0, 2, 4]
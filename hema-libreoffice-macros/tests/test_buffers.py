@@ -0,0 +1,76 @@
+# coding: utf-8
+import buffers
+
+
+class RecordingRange:
+    def __init__(self, writes, position):
+        self.writes = writes
+        self.position = position
+
+    def setFormulaArray(self, data):
+        self.writes.append((self.position, data))
+
+
+class RecordingSheet:
+    def __init__(self):
+        self.writes = []
+
+    def getCellRangeByPosition(self, left, top, right, bottom):
+        return RecordingRange(self.writes, (left, top, right, bottom))
+
+
+def test_consecutive_runs():
+    assert buffers._consecutiveRuns([]) == []
+    assert buffers._consecutiveRuns([3]) == [[3, 3]]
+    assert buffers._consecutiveRuns([0, 1, 2, 5, 6, 9]) == [[0, 2], [5, 6], [9, 9]]
+
+
+def test_format_number():
+    assert buffers._formatNumber(3) == '3'
+    assert buffers._formatNumber(3.0) == '3'
+    assert buffers._formatNumber(-4) == '-4'
+    assert buffers._formatNumber(-4.0) == '-4'
+    assert buffers._formatNumber(0.5) == '0.5'
+    assert buffers._formatNumber(-2.25) == '-2.25'
+    assert buffers._formatNumber(1 / 3) == repr(1 / 3)
+
+
+def test_flush_splits_rows_into_blocks_at_gaps():
+    sheet = RecordingSheet()
+    buffer = buffers.SheetBuffer(sheet)
+    buffer.setValue(0, 0, 1)
+    buffer.setValue(0, 1, 2)
+    buffer.setValue(0, 3, 3)
+    assert buffer.flush() == 2
+    assert sheet.writes == [((0, 0, 0, 1), (('1',), ('2',))), ((0, 3, 0, 3), (('3',),))]
+    assert buffer.flush() == 0
+
+
+def test_flush_fills_holes_of_a_block_with_empty_cells():
+    sheet = RecordingSheet()
+    buffer = buffers.SheetBuffer(sheet)
+    buffer.setString(1, 4, 'a')
+    buffer.setString(3, 5, 'b')
+    buffer.flush()
+    assert sheet.writes == [((1, 4, 3, 5), (("'a", '', ''), ('', '', "'b")))]
+
+
+def test_flush_mixes_formulas_values_and_text_in_one_block():
+    sheet = RecordingSheet()
+    buffer = buffers.SheetBuffer(sheet)
+    buffer.setFormula(0, 0, '=A2+1')
+    buffer.setValue(1, 0, -1.5)
+    buffer.setString(2, 0, '12')
+    assert buffer.get(0, 0) == '=A2+1'
+    assert buffer.get(5, 5) is None
+    buffer.flush()
+    assert sheet.writes == [((0, 0, 2, 0), (('=A2+1', '-1.5', "'12"),))]
+
+
+def test_empty_string_removes_the_cell():
+    sheet = RecordingSheet()
+    buffer = buffers.SheetBuffer(sheet)
+    buffer.setString(0, 0, 'a')
+    buffer.setString(0, 0, '')
+    assert buffer.flush() == 0
+    assert sheet.writes == []
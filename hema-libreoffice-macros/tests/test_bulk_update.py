@@ -0,0 +1,42 @@
+# coding: utf-8
+import logging
+
+import pytest
+
+import fakeoffice
+import helpers
+
+
+def test_locks_are_released_when_the_block_raises():
+    doc = fakeoffice.Document()
+    with pytest.raises(RuntimeError):
+        with helpers.bulkUpdate(doc, 'test'):
+            assert doc.controller_locks == 1 and doc.action_locks == 1
+            assert not doc.automatic_calculation
+            raise RuntimeError()
+    assert doc.controller_locks == 0 and doc.action_locks == 0
+    assert doc.automatic_calculation
+    assert doc.calls['Document.calculateAll'] == 1
+
+
+def test_locks_taken_are_released_when_taking_another_fails(monkeypatch):
+    doc = fakeoffice.Document()
+
+    def fail():
+        raise RuntimeError()
+    monkeypatch.setattr(doc, 'addActionLock', fail)
+    with pytest.raises(RuntimeError):
+        with helpers.bulkUpdate(doc, 'test'):
+            pass
+    assert doc.controller_locks == 0
+    assert doc.automatic_calculation
+
+
+def test_duration_is_logged_without_profiling(caplog):
+    doc = fakeoffice.Document()
+    with caplog.at_level(logging.INFO, logger='profiling'):
+        with pytest.raises(RuntimeError):
+            with helpers.bulkUpdate(doc, 'test') as bulk_doc:
+                assert bulk_doc is doc
+                raise RuntimeError()
+    assert [record.getMessage().startswith('test took ') for record in caplog.records] == [True]
@@ -0,0 +1,123 @@
+# coding: utf-8
+import algorithms
+import constants
+import helpers
+import main
+from conftest import makeDocument
+
+
+def startElimination(num_participants, cut):
+    """Schedules a tournament and fills in the first round as LibreOffice would show it, with seed ``k`` named 'Seed k'."""
+    participants = [('Fencer {}'.format(i), 'Club {}'.format(i), i, 'y') for i in range(1, num_participants + 1)]
+    doc = makeDocument(participants, max_group_size=5, to_elimination=cut)
+    main.schedule()
+    bracket = algorithms.Bracket(cut)
+    layout = helpers._layoutElimination(bracket)
+    sheet = doc.Sheets[constants.ELIMINATION]
+    first_round = [match for match in layout.matches if match.sources is None]
+    for i, match in enumerate(first_round):
+        for side in (0, 1):
+            seed = bracket.slot(0, i, side)
+            if seed != algorithms.BYE:
+                sheet.values[(match.col, match.row + side)] = float(seed + 1)
+                sheet.values[(match.col + 1, match.row + side)] = 'Seed {}'.format(seed)
+                sheet.values[(match.col + 2, match.row + side)] = ''
+    return doc, layout
+
+
+def play(doc, layout, rounds, scores=lambda index: (5, 3)):
+    """Enters the scores of the fought matches of the given rounds, the top participant winning by default."""
+    sheet = doc.Sheets[constants.ELIMINATION]
+    for index, match in enumerate(layout.matches):
+        # the scores of byes are already there
+        if match.round in rounds and sheet.cellFormula(match.col + 3, match.row) == '':
+            for side, score in enumerate(scores(index)):
+                if score is not None:
+                    sheet.getCellByPosition(match.col + 3, match.row + side).setValue(score)
+
+
+def entrantFormulas(doc, match):
+    sheet = doc.Sheets[constants.ELIMINATION]
+    return [sheet.cellFormula(match.col + j, match.row + k) for k in (0, 1) for j in range(3)]
+
+
+def isFormula(content):
+    return content.startswith('=')
+
+
+def rankingRows(doc, layout):
+    sheet = doc.Sheets[constants.FINAL_RANKING]
+    return {row: tuple(sheet.cellFormula(col, row) for col in range(1, 5)) for row in layout.places}
+
+
+def snapshot(doc):
+    return {name: dict(doc.Sheets[name].contents) for name in (constants.ELIMINATION, constants.FINAL_RANKING)}
+
+
+def test_fully_decided_bracket():
+    doc, layout = startElimination(10, 8)
+    play(doc, layout, range(3))
+    main.evalFinalStatic()
+    for match in layout.matches:
+        assert not any(isFormula(content) for content in entrantFormulas(doc, match))
+    rows = rankingRows(doc, layout)
+    assert not any(isFormula(content) for contents in rows.values() for content in contents)
+    assert sorted(name for name, _, _, _ in rows.values()) == sorted('Seed {}'.format(k) for k in range(8))
+    assert sorted(rnd for _, _, rnd, _ in rows.values()) == ['2.1', '2.2', '2.3', '2.4', '8', '8', '8', '8']
+    # the top participant always won, so the first seed won the final
+    assert [name for name, _, rnd, quali in rows.values() if rnd == '2.1'] == ['Seed 0']
+    assert [quali for name, _, rnd, quali in rows.values() if rnd == '2.1'] == ['1']
+
+
+def test_partly_decided_bracket_keeps_the_formulas_of_later_rounds():
+    # 6 of 10 in a bracket of 8: the first two seeds have byes
+    doc, layout = startElimination(10, 6)
+    before = rankingRows(doc, layout)
+    play(doc, layout, [0])
+    main.evalFinalStatic()
+    for match in layout.matches:
+        contents = entrantFormulas(doc, match)
+        if match.round < 2:
+            # the first round is complete, so it and the semi-finals it leads into are frozen
+            assert not any(isFormula(content) for content in contents)
+        else:
+            assert all(isFormula(content) for content in contents)
+    rows = rankingRows(doc, layout)
+    decided = {row: contents for row, contents in rows.items() if not isFormula(contents[0])}
+    # only the losers of the two fought matches of the first round are placed
+    assert sorted(rnd for _, _, rnd, _ in decided.values()) == ['8', '8']
+    assert all(rows[row] == before[row] for row in rows if row not in decided)
+
+
+def test_tied_or_blank_scores_decide_nothing():
+    doc, layout = startElimination(10, 8)
+    before_elimination = {match: entrantFormulas(doc, match) for match in layout.matches}
+    before_ranking = rankingRows(doc, layout)
+    # the first match is a tie and the second has only one score
+    play(doc, layout, [0], scores=lambda index: {0: (4, 4), 1: (5, None)}.get(index, (5, 3)))
+    main.evalFinalStatic()
+    # the first round is not complete, nothing is frozen
+    assert {match: entrantFormulas(doc, match) for match in layout.matches} == before_elimination
+    rows = rankingRows(doc, layout)
+    for row, (index, _, _) in layout.places.items():
+        if index in (2, 3):
+            assert not isFormula(rows[row][0])
+        else:
+            assert rows[row] == before_ranking[row]
+
+
+def test_running_twice_changes_nothing():
+    doc, layout = startElimination(10, 6)
+    play(doc, layout, [0, 1])
+    main.evalFinalStatic()
+    first = snapshot(doc)
+    main.evalFinalStatic()
+    assert snapshot(doc) == first
+
+    play(doc, layout, [2])
+    main.evalFinalStatic()
+    first = snapshot(doc)
+    main.evalFinalStatic()
+    assert snapshot(doc) == first
+    rows = rankingRows(doc, layout)
+    assert not any(isFormula(content) for contents in rows.values() for content in contents)
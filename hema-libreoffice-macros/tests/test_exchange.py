@@ -0,0 +1,88 @@
+# coding: utf-8
+import csv
+import json
+
+import pytest
+
+import constants
+import exchange
+import helpers
+import main
+from conftest import makeDocument
+
+
+def write(tmp_path, name, text, encoding='utf-8'):
+    path = tmp_path / name
+    path.write_text(text, encoding=encoding)
+    return str(path)
+
+
+def test_csv_with_aliases_and_bom(tmp_path):
+    path = write(tmp_path, 'p.csv', 'Fencer;School;Rating/rank;Checked in\nAnna;Club A;3;yes\n=cmd;Club B;;n\n'
+                                     '"Bob; Jr.";Club C;1,5;\n', encoding='utf-8-sig')
+    assert exchange.readParticipants(path) == [
+        ('Anna', 'Club A', 3.0, 'y'),
+        ('=cmd', 'Club B', '', 'n'),
+        ('Bob; Jr.', 'Club C', 1.5, 'n'),
+    ]
+
+
+def test_csv_with_missing_columns(tmp_path):
+    path = write(tmp_path, 'p.csv', 'Name,Notes\nAnna,late\n,no name\nBob,\n')
+    assert exchange.readParticipants(path) == [('Anna', '', '', 'y'), ('Bob', '', '', 'y')]
+
+
+def test_csv_without_header_is_rejected(tmp_path):
+    path = write(tmp_path, 'p.csv', 'Fencer 1,Club A,3,y\nFencer 2,Club B,4,y\n')
+    with pytest.raises(ValueError, match='fencer, participant'):
+        exchange.readParticipants(path)
+    path = write(tmp_path, 'q.csv', 'Nombre,Club\nAna,A\n')
+    with pytest.raises(ValueError, match='first row'):
+        exchange.readParticipants(path)
+
+
+def test_json(tmp_path):
+    path = write(tmp_path, 'p.json', json.dumps({'participants': [
+        {'Name': 'Z', 'Club': 'Q', 'Rating/rank': 7, 'Present?': True},
+        {'name': 'Y', 'present': False},
+        {'fighter': 'X', 'seed': '2', 'team': None},
+    ]}), encoding='utf-8-sig')
+    assert exchange.readParticipants(path) == [('Z', 'Q', 7.0, 'y'), ('Y', '', '', 'n'), ('X', '', 2.0, 'y')]
+
+
+def test_json_without_names_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        exchange.readParticipants(write(tmp_path, 'p.json', '{"people": []}'))
+    with pytest.raises(ValueError, match='no name'):
+        exchange.readParticipants(write(tmp_path, 'q.json', '[{"nombre": "Ana"}]'))
+
+
+def test_write_table(tmp_path):
+    rows = [(1.0, 'Anna', '', 2.5), (2.0, '', 'Club', -1.0)]
+    exchange.writeTable(str(tmp_path / 't.csv'), ['Rank', 'Name', 'Club', 'Score'], rows)
+    exchange.writeTable(str(tmp_path / 't.json'), ['Rank', 'Name', 'Club', 'Score'], rows)
+    with open(str(tmp_path / 't.csv'), newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [['Rank', 'Name', 'Club', 'Score'], ['1', 'Anna', '', '2.5'], ['2', '', 'Club', '-1']]
+    assert json.loads((tmp_path / 't.json').read_text()) == [
+        dict(Rank=1, Name='Anna', Club=None, Score=2.5), dict(Rank=2, Name=None, Club='Club', Score=-1)]
+
+
+def test_import_and_export_round_trip(tmp_path):
+    doc = makeDocument([('Old {}'.format(i), 'Club', i, 'y') for i in range(1, 9)])
+    path = write(tmp_path, 'p.csv', 'name,club,rating\n' + ''.join('Fencer {0},Club {1},{0}\n'.format(i, i % 3) for i in range(1, 7)))
+    assert helpers.importParticipants(doc, path) == 6
+    plist = doc.Sheets[constants.PARTICIPANT_LIST]
+    values = plist.getCellRangeByPosition(0, 1, 3, 8).getDataArray()
+    assert values[0] == ('Fencer 1', 'Club 1', 1.0, 'y')
+    assert values[6:] == (('', '', '', ''), ('', '', '', ''))
+    assert [p.name for p in helpers.loadSnapshot(doc).participants] == ['Fencer {}'.format(i) for i in range(1, 7)]
+
+    main.schedule()
+    paths = helpers.exportResults(doc, str(tmp_path / 'event'), '.json')
+    assert [p.rsplit('/', 1)[-1] for p in paths] == ['event - List of fights.json', 'event - Final ranking.json']
+    with open(paths[0], encoding='utf-8') as f:
+        fights = json.load(f)
+    assert len(fights) >= 15 and fights[0]['Phase'] == 'Group 1'
+    with open(paths[1], encoding='utf-8') as f:
+        ranking = json.load(f)
+    assert [row['Final rank'] for row in ranking] == list(range(1, 7))
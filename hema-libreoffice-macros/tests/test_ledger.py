@@ -0,0 +1,53 @@
+# coding: utf-8
+import constants
+import fakeoffice
+import helpers
+import main
+from conftest import makeDocument
+
+
+def rowText(sheet, row, num_cols):
+    return [sheet.cellFormula(col, row) for col in range(num_cols)]
+
+
+def test_ledger_writes_header_and_fights_in_one_block():
+    doc = fakeoffice.Document()
+    sheet = doc.Sheets[0]
+    ledger = helpers.FightLedger(sheet)
+    ledger.add('Group 1', '=$A$1', '=$A$2', "$'Group 1'.C3", "$'Group 1'.D3")
+    ledger.add('Group 2', '=$A$3', '=$A$4', "$'Group 2'.C3", "$'Group 2'.D3")
+    assert doc.calls['CellRange.setFormulaArray'] == 0
+    ledger.flush()
+    assert doc.calls['CellRange.setFormulaArray'] == 1
+    assert rowText(sheet, 0, 8) == ['Phase', 'Fighter 1', 'Fighter 2', 'Fighter 1 score', 'Fighter 2 score', 'Result', '', '']
+    assert rowText(sheet, 1, 6) == ['Group 1', '=$A$1', '=$A$2', "=IF(ISBLANK($'Group 1'.C3); \"\"; $'Group 1'.C3)",
+                                    "=IF(ISBLANK($'Group 1'.D3); \"\"; $'Group 1'.D3)",
+                                    "=IF($'Group 1'.C3 < $'Group 1'.D3; \"LOSS\"; \"WIN\")"]
+    assert rowText(sheet, 2, 1) == ['Group 2']
+    assert ledger.next_row == 3
+
+
+def test_ledger_lists_rings_and_slots_counted_from_one():
+    doc = fakeoffice.Document()
+    sheet = doc.Sheets[0]
+    ledger = helpers.FightLedger(sheet)
+    ledger.add('Group 1', '=$A$1', '=$A$2', 'C3', 'D3', ring=0, slot=0)
+    ledger.add('Group 2', '=$A$3', '=$A$4', 'C3', 'D3', ring=1, slot=0)
+    ledger.add('Group 1', '=$A$5', '=$A$6', 'C4', 'D4', ring=0, slot=1)
+    ledger.flush()
+    assert doc.calls['CellRange.setFormulaArray'] == 1
+    assert rowText(sheet, 0, 8)[6:] == ['Ring', 'Slot']
+    assert [(sheet.cellValue(6, row), sheet.cellValue(7, row)) for row in range(1, 4)] == [(1, 1), (2, 1), (1, 2)]
+
+
+def test_schedule_lists_every_group_bout_once():
+    participants = [('Fencer {}'.format(i), '', i, 'y') for i in range(1, 11)]
+    doc = makeDocument(participants, max_group_size=5, rings=2)
+    main.schedule()
+    fights = doc.Sheets[constants.LIST_OF_FIGHTS]
+    assert rowText(fights, 0, 8)[6:] == ['Ring', 'Slot']
+    rows = range(1, 1 + 2 * 10)
+    assert [fights.cellValue(0, row) for row in rows].count('Group 1') == 10
+    assert [fights.cellValue(0, row) for row in rows].count('Group 2') == 10
+    slots = [(fights.cellValue(6, row), fights.cellValue(7, row)) for row in rows]
+    assert len(set(slots)) == len(slots)
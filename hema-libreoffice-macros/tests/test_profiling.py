@@ -0,0 +1,51 @@
+# coding: utf-8
+import json
+
+import constants
+import main
+import profiling
+from conftest import makeDocument
+
+PARTICIPANTS = [('Fencer {}'.format(i), 'Club {}'.format(i % 4), i, 'y') for i in range(1, 21)]
+
+
+def diagnostics(doc):
+    sheet = doc.Sheets[constants.DIAGNOSTICS]
+    rows = sheet.getCellRangeByPosition(0, 0, 2, 200).getDataArray()
+    return sheet, {row[0]: row for row in rows if row[0]}
+
+
+def test_schedule_writes_diagnostics_when_enabled_in_settings(monkeypatch):
+    monkeypatch.delenv(profiling.LOG_ENV, raising=False)
+    doc = makeDocument(PARTICIPANTS, profile=1)
+    main.schedule()
+    sheet, rows = diagnostics(doc)
+    assert not sheet.IsVisible
+    assert rows['Macro'][1] == 'schedule'
+    for phase in ('group sheets', 'bracket', 'list of fights', 'recalculation', 'Total'):
+        assert phase in rows
+    assert rows['Total'][2] > 0
+    assert rows['setFormulaArray'][2] > 0
+    # the diagnostics do not disturb the sheets when the tournament is generated again
+    main.schedule()
+    assert doc.Sheets.getElementNames().count(constants.DIAGNOSTICS) == 1
+
+
+def test_schedule_appends_to_the_log(monkeypatch, tmp_path):
+    log = tmp_path / 'profile.jsonl'
+    monkeypatch.setenv(profiling.LOG_ENV, str(log))
+    doc = makeDocument(PARTICIPANTS)
+    main.schedule()
+    main.evalGroups()
+    reports = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [report['macro'] for report in reports] == ['schedule', 'evalGroups']
+    assert reports[0]['calls'] == sum(reports[0]['methods'].values())
+    assert constants.DIAGNOSTICS not in doc.Sheets
+
+
+def test_nothing_is_profiled_by_default(monkeypatch):
+    monkeypatch.delenv(profiling.LOG_ENV, raising=False)
+    doc = makeDocument(PARTICIPANTS)
+    main.schedule()
+    assert constants.DIAGNOSTICS not in doc.Sheets
+    assert profiling._active is None
@@ -0,0 +1,66 @@
+# coding: utf-8
+import functools
+import random
+
+import ranking
+
+# V/M, D-R, D, R, RND of the group results, as sorted by sortGroupRanking
+GROUP_FIELDS = [(2, False), (3, False), (4, False), (5, True), (6, False)]
+
+
+def sortLikeCalc(rows, fields):
+    """Sorts the way sortGroupRanking used to: one stable sheet sort per field, least significant first."""
+    order = list(range(len(rows)))
+    for col, ascending in reversed(fields):
+        order.sort(key=functools.cmp_to_key(lambda i, j: ranking.compareCells(rows[i][col], rows[j][col], ascending)))
+    return order
+
+
+def test_compare_numbers_before_text_and_empty_last():
+    values = ['b', '', 2.0, 'A', -1.0, '', 10.0]
+    ascending = sorted(values, key=functools.cmp_to_key(lambda a, b: ranking.compareCells(a, b, True)))
+    descending = sorted(values, key=functools.cmp_to_key(lambda a, b: ranking.compareCells(a, b, False)))
+    assert ascending == [-1.0, 2.0, 10.0, 'A', 'b', '', '']
+    assert descending == ['b', 'A', 10.0, 2.0, -1.0, '', '']
+
+
+def test_compare_text_ignores_case():
+    assert ranking.compareCells('abc', 'ABC', True) == 0
+    assert ranking.compareCells('a', 'B', True) == -1
+    assert ranking.compareCells('a', 'B', False) == 1
+
+
+def test_rank_rows_descending_and_ascending_keys():
+    rows = [
+        ('x', 0.5, 3.0, 10.0, 7.0),
+        ('y', 0.5, 3.0, 10.0, 5.0),
+        ('z', 1.0, -2.0, 4.0, 6.0),
+    ]
+    order, ties = ranking.rankRows(rows, [(1, False), (2, False), (3, False), (4, True)])
+    assert order == [2, 1, 0]
+    assert ties == []
+
+
+def test_rank_rows_groups_ties_and_keeps_their_order():
+    rows = [(1.0, 'a'), (2.0, 'b'), (1.0, 'c'), (1.0, 'd'), (3.0, 'e'), (3.0, 'f')]
+    order, ties = ranking.rankRows(rows, [(0, False)])
+    assert order == [4, 5, 1, 0, 2, 3]
+    assert ties == [[0, 1], [3, 5]]
+
+
+def test_rank_rows_puts_empty_rows_last():
+    rows = [('', ''), (0.0, 1.0), ('', 2.0), (0.0, '')]
+    order, ties = ranking.rankRows(rows, [(0, False), (1, True)])
+    assert order == [1, 3, 2, 0]
+    assert ties == []
+
+
+def test_rank_rows_matches_successive_sheet_sorts():
+    rng = random.Random(7)
+    choices = [0.0, 0.25, 0.5, 1.0, -3.0, 2.0, '', 'n/a']
+    for _ in range(200):
+        rows = [tuple(['name', 'club'] + [rng.choice(choices) for _ in range(5)]) for _ in range(rng.randint(0, 12))]
+        order, ties = ranking.rankRows(rows, GROUP_FIELDS)
+        assert order == sortLikeCalc(rows, GROUP_FIELDS)
+        equal = [pos for pos in range(1, len(order)) if rows[order[pos - 1]][2:] == rows[order[pos]][2:]]
+        assert [pos for a, b in ties for pos in range(a + 1, b + 1)] == equal
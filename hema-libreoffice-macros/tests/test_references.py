@@ -0,0 +1,53 @@
+# coding: utf-8
+import pytest
+
+import references
+
+TABLE = (0, 5)
+
+
+@pytest.mark.parametrize('col, row, expected', [
+    (0, 0, 'A1'),
+    (25, 1, 'Z2'),
+    (26, 2, 'AA3'),
+    (51, 9, 'AZ10'),
+    (52, 0, 'BA1'),
+    (701, 0, 'ZZ1'),
+    (702, 0, 'AAA1'),
+    (16383, 1048575, 'XFD1048576'),
+])
+def test_address(col, row, expected):
+    assert references.address(col, row) == expected
+
+
+def test_qualified_and_participant_references():
+    assert references.qualified('Group 1', 27, 6) == "$'Group 1'.AB7"
+    assert references.participantName(4) == "$'Participant list'.A5"
+    assert references.participantClub(4) == "$'Participant list'.B5"
+
+
+def test_group_formulas_of_three():
+    bouts = ((0, 1, 10, 0), (2, 0, 13, 0), (1, 2, 10, 2))
+    formulas = references.groupFormulas(3, TABLE, bouts)
+    assert formulas.ratio == ('=SUMPRODUCT(C7:E7 > TRANSPOSE(C7:C9)) / 2',
+                              '=SUMPRODUCT(C8:E8 > TRANSPOSE(D7:D9)) / 2',
+                              '=SUMPRODUCT(C9:E9 > TRANSPOSE(E7:E9)) / 2')
+    assert formulas.dealt == ('=SUM(C7:E7)', '=SUM(C8:E8)', '=SUM(C9:E9)')
+    assert formulas.received == ('=SUM(C7:C9)', '=SUM(D7:D9)', '=SUM(E7:E9)')
+    assert formulas.results == (('F7', 'G7', 'H7'), ('F8', 'G8', 'H8'), ('F9', 'G9', 'H9'))
+    assert formulas.scores == (('M1', 'M2'), ('P1', 'P2'), ('M3', 'M4'))
+    assert formulas.bindings[1] == ('=IF(ISBLANK(P1); ""; P1)', '=IF(ISBLANK(P2); ""; P2)')
+
+
+def test_group_formulas_of_five():
+    bouts = ((0, 1, 12, 0), (2, 3, 15, 0), (4, 0, 12, 2), (2, 1, 15, 2), (3, 4, 12, 4),
+             (0, 2, 15, 4), (1, 3, 12, 6), (4, 2, 15, 6), (3, 0, 12, 8), (1, 4, 15, 8))
+    formulas = references.groupFormulas(5, TABLE, bouts)
+    assert formulas.ratio[0] == '=SUMPRODUCT(C7:G7 > TRANSPOSE(C7:C11)) / 4'
+    assert formulas.ratio[4] == '=SUMPRODUCT(C11:G11 > TRANSPOSE(G7:G11)) / 4'
+    assert formulas.dealt[3] == '=SUM(C10:G10)'
+    assert formulas.received[3] == '=SUM(F7:F11)'
+    assert formulas.results[4] == ('H11', 'I11', 'J11')
+    assert len(formulas.bindings) == len(formulas.scores) == 10
+    assert formulas.scores[-1] == ('R9', 'R10')
+    assert formulas.bindings[-1] == ('=IF(ISBLANK(R9); ""; R9)', '=IF(ISBLANK(R10); ""; R10)')
@@ -0,0 +1,38 @@
+# coding: utf-8
+import constants
+import helpers
+import main
+from conftest import makeDocument
+
+
+def setPresent(doc, row, present):
+    doc.Sheets[constants.PARTICIPANT_LIST].getCellByPosition(3, row).setString('y' if present else 'n')
+
+
+def meanRating(doc, rows):
+    ratings = doc.Sheets[constants.PARTICIPANT_LIST].getCellRangeByPosition(2, 0, 2, 20).getDataArray()
+    return sum(ratings[row][0] for row in rows) / len(rows)
+
+
+def test_late_arrivals_join_groups_by_rating():
+    # ranks 1 to 14 in rows 1 to 14, each from a different club; the first and the last arrive late
+    participants = [('Fencer {}'.format(rank), 'Club {}'.format(rank), rank, 'n' if rank in (1, 14) else 'y')
+                    for rank in range(1, 15)]
+    doc = makeDocument(participants, max_group_size=7)
+    main.schedule()
+    groups = helpers._readGroups(doc)
+    assert sorted(len(rows) for rows in groups) == [6, 6]
+
+    # the weakest of each group leaves, so that both are equally small but not equally strong
+    for rows in groups:
+        setPresent(doc, max(rows), False)
+    setPresent(doc, 1, True)
+    setPresent(doc, 14, True)
+    left = [[row for row in rows if row != max(rows)] for rows in groups]
+    weaker = max(range(2), key=lambda i: meanRating(doc, left[i]))
+    assert meanRating(doc, left[0]) != meanRating(doc, left[1])
+
+    assert helpers.updateTournament(doc)
+    groups = helpers._readGroups(doc)
+    assert 1 in groups[weaker]
+    assert 14 in groups[1 - weaker]
@@ -0,0 +1,63 @@
+# coding: utf-8
+import random
+
+import pytest
+
+import constants
+import helpers
+import main
+import results
+from conftest import makeDocument
+
+
+def randomMatrices(seed, missing=0.0):
+    rng = random.Random(seed)
+    matrices = []
+    for _ in range(30):
+        size = rng.randint(1, 9)
+        matrices.append([[None if i == j or rng.random() < missing else float(rng.randint(0, 5)) for j in range(size)]
+                         for i in range(size)])
+    return matrices
+
+
+def test_group_results():
+    matrix = [[None, 5.0, 2.0], [3.0, None, 5.0], [5.0, 4.0, None]]
+    assert results._groupResultsPython(matrix) == [(0.5, 7.0, 8.0), (0.5, 8.0, 9.0), (0.5, 9.0, 7.0)]
+
+
+def test_missing_scores_are_no_victories():
+    matrix = [[None, None], [3.0, None]]
+    assert results._groupResultsPython(matrix) == [(0.0, 0.0, 3.0), (0.0, 3.0, 0.0)]
+    assert results.incompleteGroups([matrix, [[None, 1.0], [0.0, None]], [[None]]]) == [0]
+
+
+@pytest.mark.parametrize('missing', [0.0, 0.2])
+def test_numpy_and_python_agree(missing):
+    pytest.importorskip('numpy')
+    matrices = randomMatrices(3, missing)
+    numpy_results = results._groupResultsNumpy(matrices)
+    python_results = [results._groupResultsPython(matrix) for matrix in matrices]
+    assert len(numpy_results) == len(python_results)
+    for got, expected in zip(numpy_results, python_results):
+        assert got == pytest.approx(expected)
+
+
+def test_static_results_reject_unfinished_groups():
+    participants = [('Fencer {}'.format(i), 'Club {}'.format(i), i, 'y') for i in range(1, 11)]
+    doc = makeDocument(participants, max_group_size=5)
+    main.schedule()
+    for i, rows in enumerate(helpers._readGroups(doc)):
+        sheet = doc.Sheets['Group {}'.format(i + 1)]
+        for j, (_, _, col, row) in enumerate(helpers._groupBouts(len(rows))):
+            if i == 1 and j == 0:
+                continue
+            sheet.getCellRangeByPosition(col + 2, row, col + 2, row + 1).setDataArray(((5,), (j % 5,)))
+    sheet = doc.Sheets[constants.GROUPS_RESULTS]
+    before = sheet.getCellRangeByPosition(3, 1, 6, 10).getFormulaArray()
+    assert helpers.writeGroupResults(doc) == ['Group 2']
+    assert sheet.getCellRangeByPosition(3, 1, 6, 10).getFormulaArray() == before
+
+    _, _, col, row = helpers._groupBouts(5)[0]
+    doc.Sheets['Group 2'].getCellRangeByPosition(col + 2, row, col + 2, row + 1).setDataArray(((5,), (1,)))
+    assert helpers.writeGroupResults(doc) == []
+    assert sheet.getCellRangeByPosition(3, 1, 6, 10).getFormulaArray() != before
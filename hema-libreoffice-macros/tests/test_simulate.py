@@ -0,0 +1,29 @@
+# coding: utf-8
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import simulate
+
+
+def test_tournaments_rank_every_participant_once():
+    model = simulate.Model(23)
+    ranking = simulate.simulateTournaments(np.random.default_rng(1), model, 5, 8, 40)
+    assert ranking.shape == (40, 23)
+    assert (np.sort(ranking, axis=1) == np.arange(23)).all()
+
+
+def test_chunks_stay_under_the_element_budget():
+    for participants, max_group_size in [(10, 5), (200, 8), (2000, 15)]:
+        model = simulate.Model(participants)
+        _, pairs, _ = simulate._groupLayout(participants, max_group_size)
+        size = simulate.chunkSize(model, max_group_size)
+        assert size >= 1
+        assert size == 1 or size * len(pairs) * (2 * model.touches - 1) <= simulate.CHUNK_ELEMENTS
+
+
+def test_sweep_smoke():
+    results = simulate.sweep(simulate.Model(20), [5], [0.5, 64], 30, workers=1)
+    assert results[0]['simulations'] == 30
+    assert 0 <= results[0]['top8'] <= 1
+    assert 'error' in results[1]